@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Pack pipeline benchmarks at 1x / 10x / 100x corpus scale.
+
+Usage:
+  python benchmark.py [--packs mixed_chat,mini_code] [--scales 1,10,100] [--out bench_results.json]
+                      [--baseline old.json] [--tolerance 0.25] [--no-check]
+
+Each (pack, scale) runs in a fresh child process over a scaled copy of the
+pack's shards: ``scale`` hard-linked copies of every file in a temporary
+directory outside the repo, removed afterwards. The child imports the
+pack's own ``solutions.py``, points its ``ROOT`` at the copy and times
+``dag.run_pack`` on it, so what is measured is exactly what the pack ships.
+The per-stage numbers are the run's profile (see ``profiler``): seconds,
+rows/s and MB/s for the loader stages (discover / decode / normalize ...),
+every graph node and the plot report, plus the run's total and its RSS
+high-water mark (the child's finished pools included). Results go to one
+JSON file that serves as the next run's ``--baseline``: a stage whose rows/s
+drops, or a run whose RSS grows, by more than ``--tolerance`` is flagged.
+
+Unless ``--no-check``, every pack in PACKS_SUMMARY.json is also run through
+its solutions.py and graded against its summary entry; a diff that the
+baseline did not have is flagged too, so a speedup cannot quietly change an
+answer.
+"""
+import argparse, contextlib, importlib, io, json, os, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+from edaingaround.dag import TEMPLATE, run_pack
+from edaingaround.loader import JSON_PATTERNS, default_workers, discover_files
+from edaingaround.profiler import PROFILE_ENV, PROFILE_NAME
+
+SCALES = (1, 10, 100)
+# packs with a solutions.py graph to benchmark
+PACKS = ("mixed_chat", "instructions", "mini_code", "pack_code_ast_pro", "pack_anomaly_surge", "pack_schema_zoo")
+# stages shorter than this (s) are too noisy to flag
+MIN_SECONDS = 0.05
+
+
+def _scaled(src, files, scale, dest):
+    # ``scale`` copies of every shard, hard-linked where the filesystem allows, and the output contract
+    for k in range(scale):
+        for fp in files:
+            out = dest / f"x{k:03d}" / fp.relative_to(src)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(fp, out)
+            except OSError:
+                shutil.copyfile(fp, out)
+    if (src / TEMPLATE).exists(): shutil.copyfile(src / TEMPLATE, dest / TEMPLATE)
+    return dest
+
+
+def _solutions(name):
+    # by its import name, so the pool workers can unpickle what the pack defines (observers ...)
+    return importlib.import_module(f"{name}.solutions")
+
+
+def run_one(name, scale):
+    """Profile of the pack's ``run_pack`` over its shards copied ``scale`` times (run in its own process)."""
+    src = ROOT / name
+    files = discover_files(src, JSON_PATTERNS)
+    nbytes = sum(fp.stat().st_size for fp in files) * scale
+    if os.environ.get(PROFILE_ENV, "on").lower() != "memory": os.environ[PROFILE_ENV] = "on"
+    tree = Path(tempfile.mkdtemp(prefix=f"eda-bench-{name}-{scale}x-"))
+    try:
+        _scaled(src, files, scale, tree)
+        mod = _solutions(name)
+        mod.ROOT = tree  # the graph's nodes read the pack root at call time
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_pack(mod.graph, tree, argv=[])
+        seconds = time.perf_counter() - t0
+        profile = json.loads((tree / PROFILE_NAME).read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+    stages = {k: {"seconds": s["wall_s"], "rows_per_s": s["rows_per_s"], "mb_per_s": s["mb_per_s"]}
+              for k, s in profile["stages"].items()}
+    rows = max((s["rows"] for s in profile["stages"].values()), default=0)
+    return {"pack": name, "scale": scale, "rows": rows, "mb": round(nbytes / 1e6, 2), "seconds": round(seconds, 4),
+            "rows_per_s": round(rows / max(seconds, 1e-9), 1), "rss_hwm_mb": profile["rss_hwm_mb"],
+            "stages": stages}
+
+
+def check_summary(workers):
+    """Run every PACKS_SUMMARY pack's solutions.py and grade it against its summary entry."""
+    from universal_grader import run_and_grade
+    summary = json.loads((ROOT / "PACKS_SUMMARY.json").read_text(encoding="utf-8"))
+    out = {}
+    for d in sorted(p.parent for p in ROOT.glob("*/answers.json")):
+        name = json.loads((d / "answers.json").read_text(encoding="utf-8")).get("pack", d.name)
+        if name in summary and (d / "solutions.py").exists():
+            r = run_and_grade(d, workers, answers=summary[name])
+            out[name] = {"status": r["status"], "diffs": r["diffs"]}
+    return out
+
+
+def regressions(new, old, tolerance):
+    """Flags for stages slower / runs bigger than the baseline beyond ``tolerance``, and for new answer diffs."""
+    flags = []
+    for key, run in new["runs"].items():
+        prev = old.get("runs", {}).get(key, {})
+        for stage, s in run.get("stages", {}).items():
+            p = prev.get("stages", {}).get(stage)
+            if not p or max(s["seconds"], p["seconds"]) < MIN_SECONDS: continue
+            if s["rows_per_s"] < p["rows_per_s"] * (1 - tolerance):
+                flags.append(f"SLOWER {key} {stage}: {p['rows_per_s']} -> {s['rows_per_s']} rows/s")
+        if prev.get("rss_hwm_mb") and run.get("rss_hwm_mb", 0) > prev["rss_hwm_mb"] * (1 + tolerance):
+            flags.append(f"MEMORY {key}: {prev['rss_hwm_mb']} -> {run['rss_hwm_mb']} MB")
+    for name, c in new.get("check", {}).items():
+        before = set(old.get("check", {}).get(name, {}).get("diffs", []))
+        flags += [f"ANSWER {name}: {d}" for d in c["diffs"] if d not in before]
+    return flags
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--one":
+        print(json.dumps(run_one(sys.argv[2], int(sys.argv[3]))))
+        return
+    ap = argparse.ArgumentParser(description="Benchmark the pack pipelines at several corpus scales.")
+    ap.add_argument("--packs", default=",".join(PACKS))
+    ap.add_argument("--scales", default=",".join(map(str, SCALES)))
+    ap.add_argument("--out", default=str(ROOT / "bench_results.json"))
+    ap.add_argument("--baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--no-check", action="store_true")
+    args = ap.parse_args()
+    out = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+           "workers": default_workers(), "runs": {}}
+    for name in args.packs.split(","):
+        for scale in map(int, args.scales.split(",")):
+            proc = subprocess.run([sys.executable, __file__, "--one", name, str(scale)],
+                                  capture_output=True, text=True)
+            key = f"{name}@{scale}x"
+            if proc.returncode != 0:
+                out["runs"][key] = {"error": proc.stderr[-2000:]}
+                print(f"ERROR {key}\n{proc.stderr[-2000:]}")
+                continue
+            run = out["runs"][key] = json.loads(proc.stdout.strip().splitlines()[-1])
+            slowest = sorted(run["stages"].items(), key=lambda kv: -kv[1]["seconds"])[:4]
+            print(f"{key:28} {run['rows']:>9} rows {run['seconds']:.2f}s {run['rss_hwm_mb']:.0f}MB  " + "  ".join(
+                f"{st} {s['seconds']:.2f}s" for st, s in slowest))
+    if not args.no_check:
+        out["check"] = check_summary(default_workers())
+        for name, c in out["check"].items():
+            print(f"{c['status']:5} {name} vs PACKS_SUMMARY" + "".join(f"\n      {d}" for d in c["diffs"]))
+    flags = []
+    if args.baseline:
+        old = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        flags = out["regressions"] = regressions(out, old, args.tolerance)
+        print("\n".join(flags) if flags else f"no regressions vs {args.baseline}")
+    Path(args.out).write_text(json.dumps(out, indent=2), encoding="utf-8")
+    sys.exit(1 if flags else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared building blocks for the EDA packs (loading, normalizing, metrics)."""
@@ -0,0 +1,247 @@
+"""Persistent columnar cache of normalized pack data.
+
+The normalized columns of a pack (``normalize.COLUMNS`` plus any requested
+``extra`` keys, and the ``_digest`` column with ``digest``) are kept in one ``.npz`` under ``<pack>/.eda_cache/`` next to
+a JSON manifest holding, per file, its size, mtime, content hash, row range
+and error tally. Both are written to a temporary file and renamed into
+place, columns first. The manifest also records the size and mtime of the
+columns file it was written with, so after a crash between the two renames
+a stale manifest does not match the new columns and is ignored. Mergeable
+``observers`` (``quantiles`` summaries) are filled per file in the same
+workers and kept in the ``.npz`` as one ``dump`` per file, so ``observed``
+is always the merge over every file, decoded this run or not. A warm run is one ``stat`` per file plus one ``np.load``;
+when files change only those files are decoded again and the unchanged
+rows are spliced over from the previous arrays. A file whose mtime moved but
+whose content hash did not is treated as unchanged. Changed files are
+normalized in the loader's workers (``loader.iter_batches``), and the
+columns are stored as they arrive: ``source`` / ``lang`` / ``category``
+dictionary-encoded, the rest as string buffers. ``batch`` returns them as
+the same ``RecordBatch`` ``loader.load_batch`` builds.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .columns import DICT_COLUMNS, DictColumn, RecordBatch, StrColumn
+from .dedup import DIGEST_KEY
+from .jsonstream import RECORD_PATHS
+from .loader import DECODER_VERSION, discover_files, iter_batches
+from .normalize import STR_COLUMNS
+from .profiler import current
+
+CACHE_VERSION = 3
+
+
+class _PerFile:
+    # an observer split by the records' ``_file``: one fresh copy of ``proto`` per file
+    def __init__(self, proto):
+        self.proto = proto; self.files = {}
+
+    def fresh(self):
+        return _PerFile(self.proto)
+
+    def update(self, rec):
+        obs = self.files.get(rec["_file"])
+        if obs is None: obs = self.files[rec["_file"]] = self.proto.fresh()
+        obs.update(rec)
+
+    def merge(self, other):
+        for name, obs in other.files.items():
+            if name in self.files: self.files[name].merge(obs)
+            else: self.files[name] = obs
+        return self
+
+
+def content_hash(fp, bufsize=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(fp, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class PackCache:
+    """Normalized columns of the pack under ``root``, decoded at most once per file version.
+
+    ``observers`` are summaries with ``fresh`` / ``update`` / ``merge`` /
+    ``dump`` / ``restore`` / ``spec``; after ``load`` ``observed`` holds one
+    merged copy of each over the whole pack.
+    """
+
+    def __init__(self, root, pattern=None, cache_dir=None, record_path=RECORD_PATHS, extra=(), digest=False,
+                 observers=()):
+        self.root = Path(root)
+        self.pattern = pattern
+        self.record_path = record_path
+        self.extra = tuple(extra)
+        self.digest = digest
+        self.observers = tuple(observers); self.observed = []
+        # plain array columns (besides ``_file``), with their dtypes
+        self.arrays = {"_row": np.int64, **({DIGEST_KEY: np.uint64} if digest else {})}
+        # round-trip through JSON so tuples compare equal to what the manifest stored
+        self.config = json.loads(json.dumps({"version": [CACHE_VERSION, DECODER_VERSION], "pattern": pattern,
+                                             "record_path": record_path, "extra": self.extra, "digest": digest,
+                                             **({"observers": [obs.spec for obs in self.observers]}
+                                                if self.observers else {})}))
+        tag = hashlib.blake2b(json.dumps(self.config, sort_keys=True).encode(), digest_size=6).hexdigest()
+        self.dir = Path(cache_dir) if cache_dir else self.root / ".eda_cache"
+        self.manifest_path = self.dir / f"manifest-{tag}.json"
+        self.columns_path = self.dir / f"columns-{tag}.npz"
+        self.files = []; self.errors = {}; self.file_errors = []
+        self.stats = {"reused": 0, "decoded": 0}
+
+    def _read_manifest(self):
+        try:
+            man = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if man.get("config") != self.config or man.get("columns") != self._stamp():
+            return {}
+        return man["files"]
+
+    def _stamp(self):
+        # identifies the columns file a manifest belongs to
+        try:
+            st = self.columns_path.stat()
+        except OSError:
+            return None
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def _columns(self, arrays):
+        cols = {c: (DictColumn if c in DICT_COLUMNS else StrColumn).from_arrays(arrays, c)
+                for c in STR_COLUMNS + self.extra}
+        for c in ("_file", *self.arrays): cols[c] = arrays[c]
+        return cols
+
+    def load(self, workers=None):
+        """Columns as ``{name: StrColumn | DictColumn | ndarray}``; ``_file`` holds indexes into ``self.files``."""
+        prof = current()
+        old = self._read_manifest()
+        with prof.stage("discover"):
+            files = discover_files(self.root, self.pattern)
+            entries, stale = {}, []
+            for fp in files:
+                name = fp.relative_to(self.root).as_posix()
+                st = fp.stat()
+                ent = old.get(name)
+                if ent and ent["size"] == st.st_size and ent["mtime_ns"] != st.st_mtime_ns:
+                    if content_hash(fp) == ent["hash"]:
+                        ent = dict(ent, mtime_ns=st.st_mtime_ns)
+                    else:
+                        ent = None
+                if ent and ent["size"] == st.st_size and ent["mtime_ns"] == st.st_mtime_ns:
+                    entries[name] = ent
+                else:
+                    stale.append(fp)
+        self.files = [fp.relative_to(self.root).as_posix() for fp in files]
+        if not stale and list(old) == self.files and all(entries[n] is old[n] for n in self.files):
+            with prof.stage("cache_read") as span, np.load(self.columns_path) as z:
+                cols = self._columns({k: z[k] for k in z.files})
+                states = [z[f"_obs{j}"] for j in range(len(self.observers))]
+                span.rows = len(cols["_row"]); span.nbytes = self.columns_path.stat().st_size
+            self.stats = {"reused": len(files), "decoded": 0}
+            self._tally(entries)
+            self._observe(states, entries)
+            return cols
+
+        prev = None
+        if entries:
+            with np.load(self.columns_path) as z:
+                prev = self._columns({k: z[k] for k in z.files})
+                prev_states = [z[f"_obs{j}"] for j in range(len(self.observers))]
+        fresh = {}
+        per_file = [_PerFile(obs) for obs in self.observers]
+        for batch in iter_batches(stale, self.root, self.extra, workers, record_path=self.record_path,
+                                  digest=self.digest, observers=per_file):
+            # the batch's rows are in file order: cut it into one view per file
+            bounds = np.concatenate([[0], np.cumsum(batch.file_rows())])
+            for name, errs, a, b in zip(batch.files, batch.errors, bounds[:-1], bounds[1:]):
+                fresh[name] = {c: col[a:b] if isinstance(col, np.ndarray) else col.slice(a, b)
+                               for c, col in batch.columns.items() if c != "_file"}
+                fp = self.root / name; st = fp.stat()
+                entries[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": content_hash(fp),
+                                 "rows": int(b - a), "errors": errs}
+
+        parts, start = [], 0
+        dumps = [[] for _ in self.observers]; ends = [0] * len(self.observers)
+        for i, name in enumerate(self.files):
+            ent = entries[name]
+            if name in fresh:
+                part = fresh[name]
+                states = [p.files[name].dump() if name in p.files else p.proto.fresh().dump() for p in per_file]
+            else:
+                a, b = ent["start"], ent["stop"]
+                part = {c: prev[c].slice(a, b) for c in STR_COLUMNS + self.extra}
+                part.update((c, prev[c][a:b]) for c in self.arrays)
+                states = [s[x:y] for s, (x, y) in zip(prev_states, ent.get("obs", ()))]
+            part["_file"] = np.full(ent["rows"], i, np.int32)
+            ent["start"], ent["stop"] = start, start + ent["rows"]
+            start += ent["rows"]
+            ent["obs"] = []
+            for j, s in enumerate(states):
+                dumps[j].append(s); ent["obs"].append([ends[j], ends[j] + len(s)]); ends[j] += len(s)
+            parts.append(part)
+        names = STR_COLUMNS + self.extra
+        if parts:
+            cols = {c: type(parts[0][c]).concat(p[c] for p in parts) for c in names}
+        else:
+            cols = {c: (DictColumn if c in DICT_COLUMNS else StrColumn).from_list([]) for c in names}
+        cols["_file"] = np.concatenate([p["_file"] for p in parts]) if parts else np.zeros(0, np.int32)
+        for c, dtype in self.arrays.items():
+            cols[c] = np.concatenate([p[c] for p in parts]) if parts else np.zeros(0, dtype)
+        states = [np.concatenate(d) if d else np.zeros(0) for d in dumps]
+        with prof.stage("cache_write", rows=len(cols["_row"])):
+            self._write(cols, entries, states)
+        self.stats = {"reused": len(files) - len(stale), "decoded": len(stale)}
+        self._tally(entries)
+        self._observe(states, entries)
+        return cols
+
+    def _observe(self, states, entries):
+        # each observer merged over the per-file dumps
+        self.observed = []
+        for j, (obs, state) in enumerate(zip(self.observers, states)):
+            obs = obs.fresh()
+            for name in self.files:
+                a, b = entries[name]["obs"][j]; obs.restore(state[a:b])
+            self.observed.append(obs)
+
+    def _write(self, cols, entries, states):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        arrays = {c: cols[c] for c in ("_file", *self.arrays)}
+        arrays.update((f"_obs{j}", s) for j, s in enumerate(states))
+        for c in STR_COLUMNS + self.extra:
+            arrays.update(cols[c].to_arrays(c))
+        tmp = self.columns_path.with_suffix(".tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, self.columns_path)
+        man = {"config": self.config, "columns": self._stamp(), "files": {n: entries[n] for n in self.files}}
+        tmp = self.manifest_path.with_suffix(".tmp.json")
+        tmp.write_text(json.dumps(man), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def _tally(self, entries):
+        self.file_errors = [entries[n]["errors"] for n in self.files]
+        self.errors = {}
+        for errs in self.file_errors:
+            for k, v in errs.items():
+                self.errors[k] = self.errors.get(k, 0) + v
+
+    def batch(self, workers=None):
+        """The cached columns as a ``RecordBatch`` with per-file error tallies (see ``loader.load_batch``)."""
+        cols = self.load(workers)
+        return RecordBatch(cols, self.files, self.file_errors)
+
+    def to_frame(self, cols=None, workers=None):
+        """The cached columns as a DataFrame (``_file`` as a categorical of file names, see ``RecordBatch``)."""
+        cols = self.load(workers) if cols is None else cols
+        with current().stage("to_frame", rows=len(cols["_row"])):
+            return RecordBatch(cols, self.files).to_pandas()
+
+
+def load_frame(root, pattern=None, **kw):
+    """One-shot ``PackCache(root, pattern, **kw).to_frame()``."""
+    return PackCache(root, pattern, **kw).to_frame()
@@ -0,0 +1,84 @@
+"""Call-level metrics for JS/Java-like code from a linear tokenizer, no parser.
+
+``clike_metrics`` walks a snippet once with a single token regex. Comments
+and string / template literals are consumed whole, so nothing inside them is
+seen, and so are stray ``\\n``-style escapes (double-escaped dumps leave them
+outside literals). Identifiers, a few keywords and brackets drive a small
+state machine with a paren stack. It returns ``py_metrics``' shape (``funcs``,
+``branches`` ``if/for/while/try``, lower-cased call-site ``calls``, the
+callee's last name as ``py_metrics`` takes an attribute's) plus
+``long_lines``.
+
+A call is ``name(`` that is not a keyword (``if (``), not a declaration
+(``function f(``, ``void main(``: a name directly before the name), and
+whose ``)`` is not followed by ``{`` (a method definition).
+``function``, ``=>`` and ``->`` count as functions too. Regex literals are
+not recognised; a ``/.../`` containing quotes or parens can throw off the
+counts for the rest of that snippet.
+"""
+import re
+from functools import partial
+
+from .loader import map_chunks
+
+_TOKEN = re.compile(r"""
+    (?P<skip>//[^\n]*|/\*.*?(?:\*/|\Z)
+      |"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?|`(?:[^`\\]|\\.)*`?
+      |\d[\w.]*|\\[nrt])
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<arrow>=>|->)
+  | (?P<punct>\S)
+""", re.S | re.X)
+BRANCHES = frozenset({"if", "for", "while", "try"})
+NOT_CALLS = frozenset({"if", "for", "while", "switch", "catch", "function", "return", "typeof", "with",
+                       "synchronized", "do", "else"})
+# names that may directly precede a call without making it a declaration
+CALL_PREFIXES = frozenset({"new", "return", "typeof", "await", "throw", "else", "yield", "case", "in", "of",
+                           "delete", "instanceof", "void", "do"})
+
+
+def clike_metrics(code, long_line=200):
+    """``{"funcs", "branches", "calls", "long_lines"}`` for a JS/Java-like snippet."""
+    funcs = branches = 0; calls = []
+    stack = []  # per open paren: the candidate call's name, or None
+    closed = None  # a call candidate whose ")" was the last token
+    prev = prev2 = ""
+    for m in _TOKEN.finditer(code or ""):
+        kind = m.lastgroup
+        if kind == "skip": continue
+        tok = m.group()
+        if closed is not None:
+            if tok == "{": funcs += 1
+            else: calls.append(closed)
+            closed = None
+        if kind == "name":
+            if tok in BRANCHES: branches += 1
+            elif tok == "function": funcs += 1
+        elif kind == "arrow":
+            funcs += 1
+        elif tok == "(":
+            call = None
+            if prev and (prev[0].isalpha() or prev[0] in "_$") and prev not in NOT_CALLS:
+                decl = prev2 and (prev2[0].isalpha() or prev2[0] in "_$") and prev2 not in CALL_PREFIXES
+                if decl: funcs += prev2 != "function"
+                else: call = prev.lower()
+            stack.append(call)
+        elif tok == ")":
+            closed = stack.pop() if stack else None
+        prev2, prev = prev, tok
+    if closed is not None: calls.append(closed)
+    long_lines = sum(len(line) > long_line for line in (code or "").splitlines())
+    return {"funcs": funcs, "branches": branches, "calls": calls, "long_lines": long_lines}
+
+
+def _metrics_chunk(codes, long_line=200):
+    return [clike_metrics(c, long_line) for c in codes]
+
+
+def clike_metrics_batch(codes, long_line=200, workers=None, chunk=2048):
+    """``clike_metrics`` for each snippet; distinct snippets only, in chunks on a process pool."""
+    codes = ["" if c is None else c for c in codes]
+    distinct = list(dict.fromkeys(codes))
+    parts = map_chunks(partial(_metrics_chunk, long_line=long_line), distinct, chunk, workers)
+    found = dict(zip(distinct, (r for part in parts for r in part)))
+    return [found[c] for c in codes]
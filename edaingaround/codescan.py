@@ -0,0 +1,90 @@
+"""Every per-snippet code metric from one scan of each snippet and at most one parse.
+
+``CodeAnalyzer.analyze`` walks each distinct snippet once with a
+``scan.Scanner`` whose detectors are the substring patterns (``DANGER`` by
+default, matched literally as ``str.contains(..., regex=False)`` does) and a
+``long_line`` detector (a line, as ``str.splitlines`` splits them, longer
+than ``long_line`` characters). Python rows are parsed in the same worker
+through ``pyast.py_metrics``, sharing ``AstAnalyzer``'s memo and cache, so a
+snippet seen before is never parsed again. Each row comes back as one
+``CODE_DTYPE`` record (detector bitmask, parse outcome, AST counters and
+the structural ``shape`` hash) with the full ``py_metrics`` (call names,
+function shapes) in a parallel list; another pattern is another bit, not
+another pass.
+"""
+import re
+from functools import partial
+
+import numpy as np
+
+from .loader import default_workers, map_chunks
+from .pyast import AstAnalyzer, code_digest, py_metrics
+from .scan import Scanner
+
+DANGER = ("eval", "exec", "open(", "subprocess", "pickle.loads", "yaml.load(")
+LONG_LINE = "long_line"
+LINE_BREAKS = r"\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"  # what str.splitlines splits on
+# parsed: -1 not python, 0 did not parse, 1 parsed
+CODE_DTYPE = np.dtype([("mask", np.uint64), ("parsed", np.int8), ("funcs", np.int32),
+                       ("branches", np.int32), ("calls", np.int32), ("shape", np.uint64)])
+
+
+def long_line_pattern(n):
+    """A line of more than ``n`` characters; only tried at line starts."""
+    return rf"(?:\A|(?<=[{LINE_BREAKS}]))[^{LINE_BREAKS}]{{{n + 1}}}"
+
+
+def _analyze_chunk(scanner, items):
+    return [(scanner.mask(code), py_metrics(code) if parse else None) for code, parse in items]
+
+
+class CodeAnalyzer:
+    """Code metrics per row; ``patterns`` are literal substrings, each one bit of ``mask``."""
+
+    def __init__(self, patterns=DANGER, long_line=200, py_langs=("py",), cache_dir=None, workers=None,
+                 chunk=256):
+        self.labels = list(dict.fromkeys(patterns)) + [LONG_LINE]
+        detectors = {f"p{i}": re.escape(p) for i, p in enumerate(self.labels[:-1])}
+        detectors[LONG_LINE] = long_line_pattern(long_line)
+        self.scanner = Scanner(detectors)
+        self.py_langs = set(py_langs)
+        self.ast = AstAnalyzer(cache_dir=cache_dir, workers=1)
+        self.workers = workers or default_workers()
+        self.chunk = chunk
+        self.stats = {"snippets": 0, "distinct": 0, "parsed": 0}
+
+    def analyze(self, codes, langs=None):
+        """``(rows, metrics)``: a ``CODE_DTYPE`` array and each row's ``py_metrics`` (None unless parsed)."""
+        codes = ["" if c is None else c for c in codes]
+        langs = [None] * len(codes) if langs is None else list(langs)
+        digests = [code_digest(c) for c in codes]
+        first = {}
+        for i, d in enumerate(digests): first.setdefault(d, i)
+        want_py = {d for d, lang in zip(digests, langs) if lang in self.py_langs}
+        items = [(codes[i], d in want_py and d not in self.ast.memo) for d, i in first.items()]
+        work = partial(_analyze_chunk, self.scanner)
+        results = [r for part in map_chunks(work, items, self.chunk, self.workers) for r in part]
+        masks = {}; fresh = {}
+        for d, (_, parse), (mask, metrics) in zip(first, items, results):
+            masks[d] = mask
+            if parse: fresh[d] = metrics
+        if fresh: self.ast.remember(fresh)
+        rows = np.zeros(len(codes), CODE_DTYPE); metrics = [None] * len(codes)
+        rows["mask"] = np.fromiter((masks[d] for d in digests), np.uint64, len(codes))
+        rows["parsed"] = -1
+        for i, (d, lang) in enumerate(zip(digests, langs)):
+            if lang not in self.py_langs: continue
+            m = self.ast.memo[d]
+            if m is None: rows["parsed"][i] = 0; continue
+            rows[i] = (masks[d], 1, m["funcs"], m["branches"], len(m["calls"]), int(m["shape"], 16))
+            metrics[i] = m
+        self.stats = {"snippets": len(codes), "distinct": len(first), "parsed": len(fresh)}
+        return rows, metrics
+
+    def hits(self, rows, label):
+        """Boolean column for one pattern (or ``LONG_LINE``)."""
+        return self.scanner.hits(rows["mask"], self.scanner.names[self.labels.index(label)])
+
+    def counts(self, rows):
+        """``{label: rows hit}`` for every pattern and ``LONG_LINE``."""
+        return {label: int(self.hits(rows, label).sum()) for label in self.labels}
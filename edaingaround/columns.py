@@ -0,0 +1,217 @@
+"""Column containers shared by the cache and the loader.
+
+``StrColumn`` packs strings into one UTF-8 buffer with int64 offsets (Arrow's
+``large_string`` layout); ``DictColumn`` dictionary-encodes low-cardinality
+strings (``source``, ``lang``, ``category``) as int32 codes; ``_file`` /
+``_row`` and fingerprints are plain integer arrays. A ``RecordBatch`` holds
+equal-length columns for a run of records, built by ``BatchBuilder`` in the
+loader's workers, so records never reach the caller as dicts. ``to_pandas``
+hands the buffers to pandas without copying when pyarrow is installed, and
+with a single decode otherwise.
+"""
+from array import array
+
+import numpy as np
+
+# dictionary-encoded wherever they appear in a batch
+DICT_COLUMNS = ("source", "lang", "category")
+
+
+class StrColumn:
+    """UTF-8 strings packed in one byte buffer with int64 offsets; ``valid`` is False for None."""
+    __slots__ = ("data", "offsets", "valid")
+
+    def __init__(self, data, offsets, valid):
+        self.data = data; self.offsets = offsets; self.valid = valid
+
+    @classmethod
+    def from_list(cls, values):
+        enc = [b"" if v is None else v.encode("utf-8", "surrogatepass") for v in values]
+        offsets = np.zeros(len(enc) + 1, np.int64)
+        np.cumsum(np.fromiter(map(len, enc), np.int64, len(enc)), out=offsets[1:])
+        data = np.frombuffer(b"".join(enc), np.uint8).copy()
+        valid = np.fromiter((v is not None for v in values), bool, len(values))
+        return cls(data, offsets, valid)
+
+    @classmethod
+    def concat(cls, cols):
+        cols = list(cols)
+        if not cols: return cls.from_list([])
+        starts = np.cumsum([0] + [int(c.offsets[-1] - c.offsets[0]) for c in cols[:-1]])
+        offsets = np.concatenate([[0]] + [c.offsets[1:] - c.offsets[0] + s for c, s in zip(cols, starts)])
+        data = np.concatenate([c.data[c.offsets[0]:c.offsets[-1]] for c in cols])
+        return cls(data, offsets.astype(np.int64), np.concatenate([c.valid for c in cols]))
+
+    def __len__(self):
+        return len(self.valid)
+
+    def slice(self, start, stop):
+        """Rows ``start:stop`` as a view (offsets are left un-rebased)."""
+        return StrColumn(self.data, self.offsets[start:stop + 1], self.valid[start:stop])
+
+    def lengths(self):
+        """Byte length of every value, as an int64 array."""
+        return np.diff(self.offsets)
+
+    def tolist(self):
+        buf = self.data.tobytes(); off = self.offsets.tolist()
+        return [buf[a:b].decode("utf-8", "surrogatepass") if ok else None
+                for a, b, ok in zip(off, off[1:], self.valid.tolist())]
+
+    def to_pandas(self):
+        """A pandas ``str`` Series over the buffers (pyarrow), else from one decode of them."""
+        import pandas as pd
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return pd.Series(self.tolist())
+        bitmap = pa.py_buffer(np.packbits(self.valid, bitorder="little"))
+        arr = pa.LargeStringArray.from_buffers(len(self), pa.py_buffer(self.offsets), pa.py_buffer(self.data),
+                                               bitmap)
+        dtype = pd.StringDtype("pyarrow", na_value=np.nan)
+        return pd.Series(pd.arrays.ArrowStringArray(arr, dtype=dtype), copy=False)
+
+    def to_arrays(self, name):
+        return {f"{name}.data": self.data, f"{name}.offsets": self.offsets, f"{name}.valid": self.valid}
+
+    @classmethod
+    def from_arrays(cls, arrays, name):
+        return cls(arrays[f"{name}.data"], arrays[f"{name}.offsets"], arrays[f"{name}.valid"])
+
+
+class DictColumn:
+    """Strings as int32 ``codes`` into ``categories`` (distinct values in first-seen order); -1 is None."""
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, codes, categories):
+        self.codes = codes; self.categories = categories
+
+    @classmethod
+    def from_list(cls, values):
+        index = {}
+        codes = np.fromiter((-1 if v is None else index.setdefault(v, len(index)) for v in values),
+                            np.int32, len(values))
+        return cls(codes, StrColumn.from_list(list(index)))
+
+    @classmethod
+    def concat(cls, cols):
+        cols = list(cols)
+        index = {}; parts = []
+        for c in cols:
+            # old code -> merged code, with -1 (None) mapping to the appended last slot
+            lut = np.array([index.setdefault(v, len(index)) for v in c.categories.tolist()] + [-1], np.int32)
+            parts.append(lut[c.codes])
+        codes = np.concatenate(parts) if parts else np.zeros(0, np.int32)
+        return cls(codes, StrColumn.from_list(list(index)))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def slice(self, start, stop):
+        return DictColumn(self.codes[start:stop], self.categories)
+
+    def counts(self):
+        """Rows per category, in category order (None left out)."""
+        return np.bincount(self.codes[self.codes >= 0], minlength=len(self.categories))
+
+    def tolist(self):
+        cats = self.categories.tolist() + [None]
+        return [cats[c] for c in self.codes.tolist()]
+
+    def to_pandas(self):
+        """A categorical Series over the codes."""
+        import pandas as pd
+        return pd.Series(pd.Categorical.from_codes(self.codes, categories=self.categories.tolist()), copy=False)
+
+    def to_arrays(self, name):
+        return {f"{name}.codes": self.codes, **self.categories.to_arrays(f"{name}.categories")}
+
+    @classmethod
+    def from_arrays(cls, arrays, name):
+        return cls(arrays[f"{name}.codes"], StrColumn.from_arrays(arrays, f"{name}.categories"))
+
+
+def _concat(cols):
+    cols = list(cols)
+    return np.concatenate(cols) if isinstance(cols[0], np.ndarray) else type(cols[0]).concat(cols)
+
+
+class RecordBatch:
+    """Equal-length named columns; ``_file`` indexes ``files``, whose error tallies are in ``errors``."""
+    __slots__ = ("columns", "files", "errors")
+
+    def __init__(self, columns, files=(), errors=()):
+        self.columns = columns; self.files = list(files); self.errors = list(errors)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [b for b in batches if b.columns]
+        if not batches: return cls({})
+        cols = {}
+        for name in batches[0].columns:
+            parts = [b.columns[name] for b in batches]
+            if name == "_file":
+                shifts = np.cumsum([0] + [len(b.files) for b in batches[:-1]])
+                parts = [p + np.int32(s) for p, s in zip(parts, shifts)]
+            cols[name] = _concat(parts)
+        return cls(cols, [f for b in batches for f in b.files], [e for b in batches for e in b.errors])
+
+    def __len__(self):
+        return len(self.columns["_row"]) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def file_rows(self):
+        """Rows per entry of ``files``."""
+        return np.bincount(self.columns["_file"], minlength=len(self.files)) if self.columns else np.zeros(0, int)
+
+    def to_pandas(self):
+        """A DataFrame over the columns (``_file`` as a categorical of file names)."""
+        import pandas as pd
+        data = {}
+        for name, col in self.columns.items():
+            if name == "_file":
+                data[name] = pd.Categorical.from_codes(col, categories=self.files) if self.files else col
+            else:
+                data[name] = col if isinstance(col, np.ndarray) else col.to_pandas()
+        return pd.DataFrame(data, copy=False)
+
+
+_INT_TYPES = {"int32": ("i", np.int32), "int64": ("q", np.int64), "uint64": ("Q", np.uint64)}
+
+
+class BatchBuilder:
+    """Appends row values column by column; ``build`` freezes them into a ``RecordBatch``.
+
+    ``schema`` maps column names to ``"str"``, ``"dict"`` or an integer type
+    (``"int32"``, ``"int64"``, ``"uint64"``). Integers go straight into typed
+    arrays; strings are held until ``build`` packs them, so a builder should
+    cover a bounded run of records (one loader chunk).
+    """
+
+    def __init__(self, schema):
+        self.schema = dict(schema)
+        self._reset()
+
+    def _reset(self):
+        self.values = {name: array(_INT_TYPES[kind][0]) if kind in _INT_TYPES else []
+                       for name, kind in self.schema.items()}
+
+    def add(self, row):
+        for name, vals in self.values.items():
+            vals.append(row[name])
+
+    def build(self, files=(), errors=()):
+        """The rows added so far as a batch; the builder starts over empty."""
+        cols = {}
+        for name, kind in self.schema.items():
+            vals = self.values[name]
+            if kind in _INT_TYPES: cols[name] = np.array(vals, _INT_TYPES[kind][1])
+            elif kind == "dict": cols[name] = DictColumn.from_list(vals)
+            else: cols[name] = StrColumn.from_list(vals)
+        self._reset()
+        return RecordBatch(cols, files, errors)
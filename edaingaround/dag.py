@@ -0,0 +1,133 @@
+"""Lazy metric graph: each pack registers named nodes, and a run computes only what was asked for.
+
+A node is a function whose parameter names are the nodes it reads, e.g.
+``def lengths(frame)`` depends on ``frame`` (parameters with defaults are
+not dependencies). Nodes registered with ``metric`` are result keys; those
+registered with ``node`` are shared intermediates (the loaded rows, text
+lengths, digests, token counts, the parsed AST, a plot report).
+``run(keys)`` walks back from the requested keys, so only their ancestors
+are computed, and each of those runs exactly once. Nodes whose inputs are
+ready run together on a thread pool; the heavy kernels already hand their
+work to process pools, so threads are enough to overlap independent
+branches. Those pools come from ``loader.process_pool``, which starts them
+through a forkserver and never forks this threaded process. Nodes must not mutate their
+inputs.
+
+Every node runs as a stage of the active profiler (``cat`` ``metric`` or
+``node``). ``run_pack`` is the ``solutions.py`` entry point. The keys come
+from the command line (``python solutions.py rows exact_dup_rate``), else
+from the pack's ``result_template.json``, else they are every registered
+metric. The template is the pack's output contract: its keys come first, in
+its order, and the graph's other metrics follow it. It writes ``result.json`` and, unless profiling is off,
+``profile.json`` (see ``profiler``).
+"""
+import inspect
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .loader import default_workers
+from .profiler import PROFILE_NAME, Profiler, current
+
+TEMPLATE = "result_template.json"
+
+
+class Graph:
+    """Named nodes of one pack, computed on demand from their parameters' nodes."""
+
+    def __init__(self):
+        self.nodes = {}  # name -> (fn, dep names)
+        self.metrics = []
+
+    def node(self, fn=None, name=None):
+        """Register ``fn`` (decorator) as an intermediate named ``name`` or its own name."""
+        def register(fn):
+            key = name or fn.__name__
+            if key in self.nodes: raise ValueError(f"node {key!r} registered twice")
+            params = inspect.signature(fn).parameters.values()
+            self.nodes[key] = (fn, tuple(p.name for p in params if p.default is p.empty))
+            return fn
+        return register(fn) if fn is not None else register
+
+    def metric(self, fn=None, name=None):
+        """Register ``fn`` (decorator) as a result key."""
+        def register(fn):
+            self.node(fn, name)
+            self.metrics.append(name or fn.__name__)
+            return fn
+        return register(fn) if fn is not None else register
+
+    def fields(self, source, keys):
+        """Result keys ``keys`` taken from the dict computed by node ``source``."""
+        for key in keys:
+            if key in self.nodes: raise ValueError(f"node {key!r} registered twice")
+            self.nodes[key] = (lambda d, key=key: d[key], (source,))
+            self.metrics.append(key)
+
+    def plan(self, keys):
+        """The nodes ``keys`` need, dependencies first."""
+        order = []; state = {}
+        def visit(name, path):
+            if state.get(name) == "done": return
+            if name not in self.nodes:
+                raise KeyError(f"unknown metric {name!r}" + (f" (needed by {path[-1]!r})" if path else ""))
+            if state.get(name) == "open": raise ValueError("cycle: " + " -> ".join(path + [name]))
+            state[name] = "open"
+            for dep in self.nodes[name][1]: visit(dep, path + [name])
+            state[name] = "done"; order.append(name)
+        for key in keys: visit(key, [])
+        return order
+
+    def _call(self, name, values):
+        fn, deps = self.nodes[name]
+        with current().stage(name, cat="metric" if name in self.metrics else "node"):
+            return fn(*(values[d] for d in deps))
+
+    def run(self, keys=None, workers=None):
+        """``{key: value}`` for ``keys`` (default: every metric), computing only their ancestors."""
+        keys = list(self.metrics if keys is None else keys)
+        order = self.plan(keys)
+        values = {}
+        workers = workers or default_workers()
+        prof = current()
+        if workers <= 1:
+            for i, name in enumerate(order):
+                values[name] = self._call(name, values)
+                prof.progress("graph", i + 1, len(order), "nodes")
+            return {k: values[k] for k in keys}
+        pending = list(order); running = {}
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            while pending or running:
+                ready = [n for n in pending if all(d in values for d in self.nodes[n][1])]
+                for name in ready:
+                    pending.remove(name)
+                    running[ex.submit(self._call, name, values)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    values[running.pop(fut)] = fut.result()
+                prof.progress("graph", len(values), len(order), "nodes")
+        return {k: values[k] for k in keys}
+
+
+def requested_keys(root, argv=None, graph=None):
+    """Keys named on the command line, else those of ``root/result_template.json`` followed by
+    ``graph``'s other metrics, else None (all)."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv: return list(argv)
+    template = Path(root) / TEMPLATE
+    if template.exists():
+        keys = list(json.loads(template.read_text(encoding="utf-8")))
+        return keys + [k for k in graph.metrics if k not in keys] if graph else keys
+    return None
+
+
+def run_pack(graph, root, argv=None, workers=None):
+    """Compute the requested keys of ``graph``, write ``root/result.json`` (and the profile) and print it."""
+    prof = Profiler.from_env()
+    with prof.activate():
+        out = graph.run(requested_keys(root, argv, graph), workers)
+    (Path(root)/"result.json").write_text(json.dumps(out, indent=2), encoding="utf-8")
+    if prof.enabled: prof.write(Path(root)/PROFILE_NAME)
+    print(json.dumps(out, indent=2))
+    return out
@@ -0,0 +1,167 @@
+"""Exact dedup on fixed-width digests: sort-and-scan, spilling sorted runs past a memory budget.
+
+Each row costs one 64- or 128-bit blake2b digest plus a 2-byte group code
+(e.g. ``source``). Digests are fed the text pieces one at a time
+(``text_digest``), so a chat record's turns are never joined into a new
+string. The loader can compute them in its workers instead (``digest=True``
+adds each record's ``record_digest`` as the ``_digest`` column), and
+``add_digests`` takes that column as is. Rows are buffered in NumPy arrays; when the buffer outgrows
+``memory_budget`` it is sorted and written out as a run, and the runs are
+merged block by block at the end. Counting only needs distinct keys, so the
+scan never has to remember which row came first.
+"""
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from .normalize import text_parts
+
+# loader column holding ``record_digest`` (see ``loader.batch_schema``)
+DIGEST_KEY = "_digest"
+_GROUP = np.int16
+_NO_GROUP = -1
+
+
+def _digest_dtype(size):
+    return np.dtype(">u8") if size == 8 else np.dtype(f"S{size}")
+
+
+def text_digest(parts, size=8, sep="\n"):
+    """blake2b of ``sep.join(parts)``, fed piece by piece; ``size`` bytes."""
+    h = hashlib.blake2b(digest_size=size)
+    sep = sep.encode("utf-8")
+    for i, part in enumerate(parts):
+        if i: h.update(sep)
+        h.update(part.encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+
+def record_digest(rec):
+    """8-byte ``text_digest`` of the record's ``normalize.text_parts``, as an int."""
+    return int.from_bytes(text_digest(text_parts(rec)), "big")
+
+
+class ExactDedup:
+    """Counts rows and exact duplicates, overall and within each group.
+
+    ``add`` takes one row's text pieces and group; ``add_digests`` takes
+    precomputed digest / group-code arrays (codes into ``names``, such as a
+    ``DictColumn``'s codes and categories). ``result()`` returns
+    ``{"rows", "dups", "groups": {group: (rows, dups)}}``; a row is a dup
+    if an equal text came before it (within its group, for the group
+    figures). Rows whose group is None count only overall.
+    """
+
+    def __init__(self, digest_size=8, memory_budget=1 << 28, spill_dir=None, block=1 << 16):
+        self.size = digest_size
+        self.dtype = _digest_dtype(digest_size)
+        self.capacity = max(memory_budget // (self.dtype.itemsize + _GROUP().itemsize), 1)
+        self.spill_dir = spill_dir
+        self.block = block
+        self.codes = {}
+        self._d = []; self._g = []; self._pending = 0
+        self._buf_d = []; self._buf_g = []; self._buffered = 0
+        self._runs = []; self._tmp = None
+
+    def add(self, parts, group=None):
+        code = _NO_GROUP if group is None else self.codes.setdefault(group, len(self.codes))
+        self._d.append(text_digest(parts, self.size)); self._g.append(code)
+        if len(self._d) >= self.block: self._flush_pending()
+
+    def add_digests(self, digests, groups, names=None):
+        self._flush_pending()
+        if names is not None:
+            # codes into ``names`` (-1: no group) -> ours, new groups numbered in first-seen row order
+            groups = np.asarray(groups)
+            seen, first = np.unique(groups[groups >= 0], return_index=True)
+            lut = np.full(len(names) + 1, _NO_GROUP, _GROUP)
+            for c in seen[np.argsort(first)]: lut[c] = self.codes.setdefault(names[c], len(self.codes))
+            groups = lut[groups]
+        self._buf_d.append(np.asarray(digests).astype(self.dtype, copy=False))
+        self._buf_g.append(np.asarray(groups, _GROUP))
+        self._buffered += len(self._buf_d[-1])
+        if self._buffered >= self.capacity: self._spill()
+
+    def _flush_pending(self):
+        if not self._d: return
+        d = np.frombuffer(b"".join(self._d), self.dtype)
+        g = np.array(self._g, _GROUP)
+        self._d = []; self._g = []
+        self.add_digests(d, g)
+
+    def _sorted_buffer(self):
+        d = np.concatenate(self._buf_d) if self._buf_d else np.zeros(0, self.dtype)
+        g = np.concatenate(self._buf_g) if self._buf_g else np.zeros(0, _GROUP)
+        self._buf_d = []; self._buf_g = []; self._buffered = 0
+        order = np.lexsort((g, d))
+        return d[order], g[order]
+
+    def _spill(self):
+        d, g = self._sorted_buffer()
+        if self._tmp is None:
+            self._tmp = Path(tempfile.mkdtemp(prefix="dedup-", dir=self.spill_dir))
+        n = len(self._runs)
+        np.save(self._tmp / f"run{n}.d.npy", d); np.save(self._tmp / f"run{n}.g.npy", g)
+        self._runs.append(n)
+
+    def _batches(self):
+        # sorted (digest, group) batches in globally non-decreasing digest order
+        if not self._runs:
+            yield self._sorted_buffer(); return
+        if self._buffered: self._spill()
+        runs = [(np.load(self._tmp / f"run{n}.d.npy", mmap_mode="r"),
+                 np.load(self._tmp / f"run{n}.g.npy", mmap_mode="r")) for n in self._runs]
+        pos = [0] * len(runs)
+        while True:
+            live = [i for i, (d, _) in enumerate(runs) if pos[i] < len(d)]
+            if not live: return
+            # everything <= the smallest block end can be emitted; later entries are >= it
+            cut = min(runs[i][0][min(pos[i] + self.block, len(runs[i][0])) - 1] for i in live)
+            ds, gs = [], []
+            for i in live:
+                d, g = runs[i]
+                stop = pos[i] + int(np.searchsorted(d[pos[i]:pos[i] + self.block], cut, side="right"))
+                ds.append(np.asarray(d[pos[i]:stop])); gs.append(np.asarray(g[pos[i]:stop]))
+                pos[i] = stop
+            d, g = np.concatenate(ds), np.concatenate(gs)
+            order = np.lexsort((g, d))
+            yield d[order], g[order]
+
+    def result(self):
+        self._flush_pending()
+        rows = distinct = 0
+        g_rows = np.zeros(len(self.codes), np.int64); g_distinct = np.zeros(len(self.codes), np.int64)
+        last_d, last_gs = None, set()
+        try:
+            for d, g in self._batches():
+                if not len(d): continue
+                rows += len(d)
+                new_d = np.ones(len(d), bool); new_d[1:] = d[1:] != d[:-1]
+                new_key = new_d.copy(); new_key[1:] |= g[1:] != g[:-1]
+                # keys equal to the previous batch's last digest were already seen
+                carried = d == last_d if last_d is not None else np.zeros(len(d), bool)
+                new_d &= ~carried
+                new_key &= ~(carried & np.isin(g, list(last_gs)))
+                distinct += int(new_d.sum())
+                grouped = g != _NO_GROUP
+                g_rows += np.bincount(g[grouped], minlength=len(self.codes))
+                g_distinct += np.bincount(g[grouped & new_key], minlength=len(self.codes))
+                tail = d == d[-1]
+                last_gs = (last_gs if d[-1] == last_d else set()) | set(g[tail].tolist())
+                last_d = d[-1]
+        finally:
+            if self._tmp is not None:
+                shutil.rmtree(self._tmp, ignore_errors=True)
+                self._tmp = None; self._runs = []
+        names = {c: name for name, c in self.codes.items()}
+        groups = {names[c]: (int(g_rows[c]), int(g_rows[c] - g_distinct[c])) for c in range(len(self.codes))}
+        return {"rows": rows, "dups": rows - distinct, "groups": groups}
+
+
+def dup_rates(res):
+    """``(exact_dup_rate, {group: dup_rate})`` from an ``ExactDedup.result()``."""
+    rate = res["dups"] / res["rows"] if res["rows"] else 0.0
+    return rate, {k: (dups / n if n else 0.0) for k, (n, dups) in res["groups"].items()}
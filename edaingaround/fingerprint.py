@@ -0,0 +1,62 @@
+"""Canonical payload fingerprints and the id-collision group-by built on them.
+
+A record's payload is everything but its ``_``-prefixed provenance keys,
+with null-valued keys dropped at every dict level (so ``"score": null``
+and a missing ``score`` hash the same), serialized with sorted keys and
+fixed separators. The loader can stamp the 8-byte blake2b of that on each
+record as ``_fp`` while it parses (``iter_pack(..., fingerprint=True)``),
+and ``id_collisions`` then only groups fixed-width integers.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+FP_KEY = "_fp"
+
+
+def _strip(obj):
+    if isinstance(obj, dict):
+        return {k: _strip(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, list):
+        return [_strip(v) for v in obj]
+    return obj
+
+
+def canonical(rec):
+    """Canonical JSON text of ``rec``'s payload."""
+    payload = {k: _strip(v) for k, v in rec.items() if not str(k).startswith("_") and v is not None}
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def payload_fingerprint(rec):
+    """64-bit fingerprint of ``canonical(rec)`` as an int."""
+    h = hashlib.blake2b(canonical(rec).encode("utf-8", "surrogatepass"), digest_size=8)
+    return int.from_bytes(h.digest(), "big")
+
+
+def id_collisions(ids, fps):
+    """Group fingerprints by id.
+
+    Returns ``{"unique_ids", "colliding_ids", "conflicts"}`` where
+    ``conflicts`` maps every id seen with more than one distinct payload to
+    its sorted fingerprints (hex). Missing ids are left out, as pandas'
+    ``nunique`` does.
+    """
+    import pandas as pd
+    codes, uniques = pd.factorize(pd.Series(ids, dtype=object), use_na_sentinel=True)
+    fps = np.asarray(fps, np.uint64)
+    keep = codes >= 0
+    codes, fps = codes[keep], fps[keep]
+    order = np.lexsort((fps, codes))
+    codes, fps = codes[order], fps[order]
+    new = np.ones(len(codes), bool)
+    new[1:] = (codes[1:] != codes[:-1]) | (fps[1:] != fps[:-1])
+    codes, fps = codes[new], fps[new]
+    distinct = np.bincount(codes, minlength=len(uniques))
+    multi = distinct[codes] > 1
+    codes, fps = codes[multi], fps[multi]
+    cuts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    conflicts = {uniques[grp[0]]: [f"{int(v):016x}" for v in grp_fps]
+                 for grp, grp_fps in zip(np.split(codes, cuts), np.split(fps, cuts)) if len(grp)}
+    return {"unique_ids": len(uniques), "colliding_ids": len(conflicts), "conflicts": conflicts}
@@ -0,0 +1,205 @@
+"""Incremental decoding of big JSON documents.
+
+``iter_records`` walks a top-level array, or the members of a top-level
+object, one value at a time with ``json.JSONDecoder.raw_decode`` over a
+sliding buffer, so memory stays at roughly one record plus one read chunk
+however large the file is. Record paths use a tiny dotted syntax:
+``"[*]"`` is every element of the top-level array, ``"results[*]"`` every
+element of the ``results`` member, ``"data.items[*]"`` nests further.
+
+A decode error only reads further when it sits at the end of the buffer (a
+string, number, literal or escape cut by the read); anything else is raised
+at once. Given ``on_error``, a malformed array element is reported and
+skipped: the scan resumes after its matching close bracket, at the next
+``,`` or at the array's ``]``.
+"""
+import json
+import re
+
+RECORD_PATHS = ("[*]", "results[*]")
+_WS = " \t\r\n\ufeff"
+_decoder = json.JSONDecoder()
+# what may follow a decode error's position when the read cut a token short
+_PARTIAL = re.compile(r"(?:[\w.+-]*|\\u[0-9a-fA-F]{0,3})[ \t\r\n]*")
+# skipping a bad element: strings whole, brackets and commas; a lone quote is a string the buffer cuts
+_SKIP = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{},]|"')
+
+
+def parse_path(path):
+    """``"data.items[*]"`` -> ``("data", "items", "*")``."""
+    steps = []
+    for part in path.split("."):
+        m = re.fullmatch(r"([^\[\]]*)((?:\[\*\])*)", part)
+        if m is None:
+            raise ValueError(f"bad record path: {path!r}")
+        if m.group(1): steps.append(m.group(1))
+        steps.extend("*" * (len(m.group(2)) // 3))
+    return tuple(steps)
+
+
+class _Reader:
+    def __init__(self, f, chunk_size, on_error=None):
+        self.f = f; self.chunk = chunk_size; self.on_error = on_error
+        self.buf = ""; self.pos = 0; self.eof = False
+
+    def _fill(self, n=None):
+        if self.eof: return False
+        data = self.f.read(n or self.chunk)
+        if not data:
+            self.eof = True
+            return False
+        # drop what has been consumed so the buffer never grows past one value + one chunk
+        self.buf = self.buf[self.pos:] + data; self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf): return self.buf[self.pos]
+            if not self._fill(): return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise json.JSONDecodeError(f"Expecting {ch!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        n = self.chunk
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if not self._cut(e) or not self._fill(n): raise
+                n *= 2
+                continue
+            # a number or literal cut at the buffer edge still decodes; read on to be sure
+            if end == len(self.buf) and self._fill(n):
+                continue
+            self.pos = end
+            return obj
+
+    def _cut(self, err):
+        # the error is the buffer's edge, not bad JSON: reading on may complete the value
+        return err.msg.startswith("Unterminated string") or _PARTIAL.fullmatch(self.buf, err.pos) is not None
+
+    def skip(self):
+        """Move past the element at ``pos`` to the ``,`` / ``]`` after it; False if the input ends first."""
+        depth = 0
+        while True:
+            for m in _SKIP.finditer(self.buf, self.pos):
+                c = m.group()
+                if c == '"':  # a string the buffer cuts: read on from it
+                    self.pos = m.start(); break
+                if c in "[{": depth += 1
+                elif c in "]}":
+                    if depth: depth -= 1
+                    elif c == "]": self.pos = m.start(); return True
+                elif not depth:
+                    self.pos = m.start(); return True
+            else:
+                self.pos = len(self.buf)
+            if not self._fill(): return False
+
+
+def _items(r, paths):
+    # ``r`` is at a value; yield what the remaining ``paths`` select inside it
+    if any(not p for p in paths):
+        yield r.value(); return
+    c = r.peek()
+    if c == "[" and any(p[0] == "*" for p in paths):
+        sub = [p[1:] for p in paths if p[0] == "*"]
+        r.pos += 1
+        if r.peek() == "]":
+            r.pos += 1; return
+        leaf = r.on_error is not None and any(not p for p in sub)
+        while True:
+            if leaf:
+                try:
+                    obj = r.value()
+                except json.JSONDecodeError as e:
+                    r.on_error(e)
+                    if not r.skip(): return
+                else:
+                    yield obj
+            else:
+                yield from _items(r, sub)
+            c = r.peek()
+            r.pos += 1
+            if c == "]": return
+            if c != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", r.buf, r.pos - 1)
+    elif c == "{":
+        yield from _members(r, paths, None, [])
+    else:
+        r.value()
+
+
+def _members(r, paths, extra, matched):
+    # walk an object; members no path selects are kept in ``extra`` (if given)
+    r.expect("{")
+    if r.peek() == "}":
+        r.pos += 1; return
+    while True:
+        key = r.value()
+        r.expect(":")
+        sub = [p[1:] for p in paths if p[0] == key]
+        if sub:
+            matched.append(key)
+            yield from _items(r, sub)
+        elif extra is not None:
+            extra[key] = r.value()
+        else:
+            r.value()
+        c = r.peek()
+        r.pos += 1
+        if c == "}": return
+        if c != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", r.buf, r.pos - 1)
+
+
+def _select(v, paths):
+    # ``_items`` over a decoded value
+    if any(not p for p in paths):
+        yield v; return
+    if isinstance(v, list) and any(p[0] == "*" for p in paths):
+        sub = [p[1:] for p in paths if p[0] == "*"]
+        for x in v: yield from _select(x, sub)
+    elif isinstance(v, dict):
+        for k, x in v.items():
+            sub = [p[1:] for p in paths if p[0] == k]
+            if sub: yield from _select(x, sub)
+
+
+def records_of(doc, record_path=RECORD_PATHS):
+    """The records ``iter_records`` yields for a document already decoded to ``doc``."""
+    paths = [parse_path(p) for p in ((record_path,) if isinstance(record_path, str) else record_path)]
+    if isinstance(doc, list):
+        return _select(doc, [p for p in paths if p and p[0] == "*"] or [("*",)])
+    if isinstance(doc, dict):
+        top = [p for p in paths if p and p[0] != "*"]
+        if any(p[0] in doc for p in top): return _select(doc, top)
+    return iter((doc,))
+
+
+def iter_records(f, record_path=RECORD_PATHS, chunk_size=1 << 16, on_error=None):
+    """Yield records from a text stream holding one JSON document.
+
+    A top-level array yields its elements. A top-level object yields the
+    values its ``record_path`` entries select; an object that none of them
+    match is itself the single record. ``on_error(err)`` is called for each
+    malformed record element, which is skipped; other errors are raised.
+    """
+    paths = [parse_path(p) for p in ((record_path,) if isinstance(record_path, str) else record_path)]
+    r = _Reader(f, chunk_size, on_error)
+    c = r.peek()
+    if c == "[":
+        yield from _items(r, [p for p in paths if p and p[0] == "*"] or [("*",)])
+    elif c == "{":
+        extra, matched = {}, []
+        yield from _members(r, [p for p in paths if p and p[0] != "*"], extra, matched)
+        if not matched:
+            yield extra
+    elif c:
+        yield r.value()
@@ -0,0 +1,548 @@
+"""Shared pack loader.
+
+Every pack is ~1000 small JSON / JSONL / .gz shards. ``iter_pack`` fans the
+files out over a process pool (a bounded number of chunks in flight), and
+yields the records back in sorted-file order with ``_file`` / ``_row``
+provenance attached, so every pack sees the same record stream.
+``load_batch`` runs the same pool but normalizes in the workers and sends
+back typed column batches (``columns.RecordBatch``) instead of dicts. Each
+chunk comes back with its worker's timings, which are reported into the
+active profiler as the ``decompress`` and ``decode`` stages (see
+``profiler``).
+
+A JSONL file too big for one worker is split into newline-aligned
+``Piece``s. A plain file is cut at byte offsets, and each worker reads its
+own range. A gzip stream is inflated block by block on a reader thread in
+this process, and each block is shipped to a worker while the next one
+inflates. Either way the pieces come back in order and are joined into one
+file again, with ``_row`` counting on across the pieces, so a single huge
+file keeps every worker busy and still yields the same rows.
+"""
+import io
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from itertools import chain, islice
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .columns import DICT_COLUMNS, BatchBuilder, RecordBatch
+from .dedup import DIGEST_KEY, record_digest
+from .fingerprint import FP_KEY, payload_fingerprint
+from .jsonstream import RECORD_PATHS
+from .normalize import STR_COLUMNS, normalize_record
+from .profiler import PROFILE_NAME, current
+from .sniff import EMPTY, JSONL, OBJECT, Source
+from .tolerant import decode_document, decode_line, decode_parsed
+
+JSON_PATTERNS = ("*.json", "*.jsonl", "*.json.gz", "*.jsonl.gz")
+# pack bookkeeping files that live next to the shards but are not data
+SKIP_NAMES = {"answers.json", "result.json", "result_template.json", PROFILE_NAME}
+# bump whenever decoding changes what a file yields (persistent caches key on it)
+DECODER_VERSION = 6
+# JSONL files bigger than this on disk are decoded in pieces of about PIECE_BYTES (uncompressed)
+SPLIT_BYTES = 64 << 20
+SPLIT_GZ_BYTES = 8 << 20
+PIECE_BYTES = 16 << 20
+
+
+# the batch grader splits its worker budget across concurrent packs through this
+WORKERS_ENV = "EDA_WORKERS"
+
+
+def default_workers():
+    """``$EDA_WORKERS`` when set, else the CPU count."""
+    env = os.environ.get(WORKERS_ENV)
+    return max(int(env), 1) if env else os.cpu_count() or 1
+
+
+# guards forkserver start-up (its preload list is process-wide) and submission; never held across a yield
+_POOL_LOCK = threading.Lock()
+
+# the modules whose kernels run in the workers: the forkserver imports them once, so each worker starts
+# with them loaded instead of importing them again to unpickle its first task
+_WORKER_MODULES = tuple(f"{__package__}.{m}" for m in (
+    "loader", "normalize", "cache", "quantiles", "profile", "scan", "spam", "clike", "codescan", "pyast",
+    "synth"))
+
+
+def _pool_context():
+    if "forkserver" not in mp.get_all_start_methods(): return mp.get_context("spawn")
+    ctx = mp.get_context("forkserver")
+    # workers re-run the main script, which then finds these already imported
+    ctx.set_forkserver_preload(["__main__", *_WORKER_MODULES])
+    return ctx
+
+
+class _Pool:
+    # a ``ProcessPoolExecutor`` whose submissions (which start the forkserver and the workers) take the lock
+    def __init__(self, ex):
+        self._ex = ex
+
+    def submit(self, fn, *args):
+        with _POOL_LOCK: return self._ex.submit(fn, *args)
+
+    def map(self, fn, items):
+        futs = [self.submit(fn, x) for x in items]
+        return (f.result() for f in futs)
+
+
+@contextmanager
+def process_pool(workers):
+    """The process pool every kernel fans its chunks out on.
+
+    The metric graph runs nodes on threads, and several nodes open pools, so
+    pools start through a forkserver (spawn where there is none) rather than
+    forking a process with live threads. The pool's ``submit`` and ``map``
+    serialize on a process-wide lock, held only while a task is handed over,
+    so a consumer that stops iterating early never blocks other pools. On
+    exit, tasks not yet started are cancelled.
+    """
+    with _POOL_LOCK: ex = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+    try:
+        yield _Pool(ex)
+    finally:
+        ex.shutdown(cancel_futures=True)
+
+
+def map_chunks(fn, items, chunk, workers=None, min_parallel=2):
+    """``[fn(part), ...]`` over ``items`` cut into ``chunk``-sized parts, in order.
+
+    The parts go to a process pool of ``workers`` (default ``default_workers()``),
+    or run here when that is 1 or there are fewer than ``min_parallel`` parts.
+    ``fn`` must be picklable (a module-level function, a ``partial`` of one, or
+    a bound method of a picklable object).
+    """
+    return list(imap_chunks(fn, items, chunk, workers, min_parallel))
+
+
+def imap_chunks(fn, items, chunk, workers=None, min_parallel=2):
+    """``map_chunks`` as an iterator: each part's result is yielded, in order, once it is ready.
+
+    The caller can fold results in as they come instead of holding them all.
+    """
+    items = list(items)
+    parts = [items[i:i + chunk] for i in range(0, len(items), chunk)]
+    workers = workers or default_workers()
+    if workers <= 1 or len(parts) < min_parallel:
+        yield from map(fn, parts); return
+    with process_pool(workers) as ex:
+        yield from ex.map(fn, parts)
+
+
+def discover_files(root, pattern=None):
+    """Sorted data files under ``root`` whose names match ``pattern`` (a glob or tuple of globs).
+
+    Dot-directories (``.eda_cache``, ``.git`` ...) are not searched: caches
+    and scratch copies live there, and their shards are not the pack's.
+    """
+    root = Path(root)
+    pats = (pattern,) if isinstance(pattern, str) else (pattern or JSON_PATTERNS)
+    found = []
+    for top, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        found += [Path(top, n) for n in names
+                  if n not in SKIP_NAMES and any(fnmatchcase(n, pat) for pat in pats)]
+    return sorted(found, key=lambda fp: fp.relative_to(root).as_posix())
+
+
+def read_records(fp, errors, record_path=RECORD_PATHS, timing=None):
+    """Yield the dict records of one file; problems are tallied in ``errors``.
+
+    The file is sniffed once (``sniff.Source``) and goes straight to the
+    tolerant document decoder or line decoder, or, if sniffing already
+    parsed the whole document, to its records. An object document whose
+    first record does not decode is read again line by line: it is JSONL
+    whose first line merely looked open. A gzip stream that breaks off
+    keeps the records before the break and counts once as ``truncated``. See ``tolerant`` for the error
+    taxonomy. Gzip inflate seconds and compressed bytes are added into
+    ``timing`` when given.
+    """
+    with Source(fp) as src:
+        kind = src.info.kind
+        if kind == EMPTY: return
+        if kind == JSONL:
+            yield from _line_records(src, errors, timing); return
+        doc_errors = {}
+        if src.document is not None:
+            recs = decode_parsed(src.document, src.head, doc_errors, record_path)
+        else:
+            recs = decode_document(src.text(), doc_errors, record_path)
+        head = list(islice(recs, 1))
+        if kind == OBJECT and not head and doc_errors:
+            _timed(src, timing)
+            with Source(fp) as again:
+                yield from _line_records(again, errors, timing)
+            return
+        if src.info.bom: errors["bom"] = errors.get("bom", 0) + 1
+        for obj in chain(head, recs):
+            if isinstance(obj, dict): yield obj
+        # the record the break cut short is the truncation already
+        if src.truncated and not doc_errors.get("truncated"): doc_errors["truncated"] = 1
+        _merge_errors(errors, doc_errors)
+        _timed(src, timing)
+
+
+def _line_records(src, errors, timing):
+    yield from _decode_lines(src.lines(), errors, lambda: src.truncated)
+    _timed(src, timing)
+
+
+def _decode_lines(lines, errors, cut):
+    # dict records of byte lines; once ``cut()`` says the stream broke off, its unfinished last
+    # line is kept if it decodes and the break counts once as truncated
+    for line in lines:
+        if line.strip():
+            obj = decode_line(line, {} if not line.endswith(b"\n") and cut() else errors)
+            if isinstance(obj, dict): yield obj
+    if cut(): errors["truncated"] = errors.get("truncated", 0) + 1
+
+
+def _timed(src, timing):
+    if timing is not None and src.info.gzip:
+        timing["inflate"] += src.inflate_seconds; timing["gz_bytes"] += os.path.getsize(src.path)
+
+
+def _with_provenance(recs, name, fingerprint):
+    rows = []
+    for i, rec in enumerate(recs):
+        if fingerprint: rec[FP_KEY] = payload_fingerprint(rec)
+        rec["_file"] = name; rec["_row"] = i
+        rows.append(rec)
+    return rows
+
+
+def load_file(fp, root, record_path=RECORD_PATHS, fingerprint=False, timing=None):
+    """All records of ``fp`` with provenance (and ``_fp`` if ``fingerprint``), plus that file's error tally."""
+    fp = Path(fp)
+    errors = {}
+    rows = _with_provenance(read_records(fp, errors, record_path, timing), fp.relative_to(root).as_posix(),
+                            fingerprint)
+    return rows, errors
+
+
+class Piece(NamedTuple):
+    """Whole lines of one big JSONL file: bytes ``start:stop`` of a plain file, or inflated ``data`` (gzip).
+
+    For gzip ``start`` / ``stop`` are compressed offsets, so ``stop - start``
+    is always the piece's share of the file on disk. ``truncated`` marks the
+    last piece of a gzip stream that broke off.
+    """
+    path: Path
+    start: int
+    stop: int
+    last: bool
+    data: Optional[bytes] = None
+    truncated: bool = False
+
+
+def load_piece(piece, root, fingerprint=False):
+    """``(rows, errors)`` of one ``Piece``, ``_row`` counted from 0 within it."""
+    data = piece.data
+    if data is None:
+        with open(piece.path, "rb") as f:
+            f.seek(piece.start); data = f.read(piece.stop - piece.start)
+    errors = {}
+    rows = _with_provenance(_decode_lines(io.BytesIO(data), errors, lambda: piece.truncated),
+                            Path(piece.path).relative_to(root).as_posix(), fingerprint)
+    return rows, errors
+
+
+def _split(fp, piece_bytes):
+    # the pieces of a big JSONL file, or the file itself if it is not JSONL; the gzip
+    # stream is inflated here, one piece ahead of the worker that decodes it
+    with Source(fp) as src:
+        if src.info.kind != JSONL:
+            yield [fp]; return
+        if not src.info.gzip:
+            cuts = src.cuts(piece_bytes)
+            for a, b in zip(cuts, cuts[1:]):
+                yield Piece(fp, a, b, b == cuts[-1])
+            return
+        prev = None
+        for data, offset in src.blocks(piece_bytes):
+            if prev is not None: yield prev
+            prev = Piece(fp, prev.stop if prev else 0, offset, False, data)
+        yield (prev or Piece(fp, 0, 0, False, b""))._replace(last=True, truncated=src.truncated)
+        current().add("decompress", src.inflate_seconds, src.inflate_seconds, nbytes=os.path.getsize(fp))
+
+
+def _chunks(files, chunk_files):
+    # work units in file order: runs of up to ``chunk_files`` small files, and the pieces of big ones
+    run = []
+    for fp in files:
+        size = os.path.getsize(fp)
+        if size > SPLIT_BYTES or size > SPLIT_GZ_BYTES and str(fp).endswith(".gz"):
+            if run: yield run; run = []
+            yield from _split(fp, PIECE_BYTES)
+            continue
+        run.append(fp)
+        if len(run) == chunk_files: yield run; run = []
+    if run: yield run
+
+
+def _disk_bytes(chunk):
+    return chunk.stop - chunk.start if isinstance(chunk, Piece) else sum(os.path.getsize(fp) for fp in chunk)
+
+
+def _loads(chunk, root, record_path, fingerprint, timing):
+    if isinstance(chunk, Piece): return [load_piece(chunk, root, fingerprint)]
+    return [load_file(fp, root, record_path, fingerprint, timing) for fp in chunk]
+
+
+def batch_schema(extra=(), fingerprint=False, digest=False):
+    """Column kinds of a loader batch: the normalized columns, raw ``extra`` keys as strings, provenance,
+    ``_fp``, ``_digest``."""
+    schema = {c: "dict" if c in DICT_COLUMNS else "str" for c in STR_COLUMNS + tuple(extra)}
+    schema.update(_file="int32", _row="int64")
+    if fingerprint: schema[FP_KEY] = "uint64"
+    if digest: schema[DIGEST_KEY] = "uint64"
+    return schema
+
+
+def _clock():
+    return {"inflate": 0.0, "gz_bytes": 0, "normalize": 0.0, "pid": os.getpid(), "start": time.time(),
+            "w0": time.perf_counter(), "c0": time.process_time()}
+
+
+def _stop(timing, chunk, rows):
+    timing.update(wall=time.perf_counter() - timing.pop("w0"), cpu=time.process_time() - timing.pop("c0"),
+                  rows=rows, bytes=_disk_bytes(chunk))
+    return timing
+
+
+# chunk workers (a chunk is a list of files or one ``Piece``): ``parts`` are fresh copies of the
+# caller's observers, filled here and sent back, together with the chunk's timing
+def _load_chunk(chunk, root, record_path, fingerprint=False, parts=()):
+    timing = _clock()
+    done = _loads(chunk, root, record_path, fingerprint, timing)
+    for rows, _ in done:
+        for rec in rows:
+            for part in parts: part.update(rec)
+    return done, parts, _stop(timing, chunk, sum(len(rows) for rows, _ in done))
+
+
+def _batch_chunk(chunk, root, record_path, fingerprint=False, extra=(), digest=False, parts=()):
+    # one file's dicts at a time, straight into the builder; only columns go back to the caller
+    timing = _clock()
+    builder = BatchBuilder(batch_schema(extra, fingerprint, digest))
+    names, errors = [], []
+    for k, (rows, errs) in enumerate(_loads(chunk, root, record_path, fingerprint, timing)):
+        t0 = time.perf_counter()
+        for rec in rows:
+            for part in parts: part.update(rec)
+            row = normalize_record(rec)
+            row["_file"] = k
+            for c in extra: row[c] = None if rec.get(c) is None else str(rec[c])
+            if fingerprint: row[FP_KEY] = rec[FP_KEY]
+            if digest: row[DIGEST_KEY] = record_digest(rec)
+            builder.add(row)
+        timing["normalize"] += time.perf_counter() - t0
+        names.append(_name(chunk, k, root)); errors.append(errs)
+    batch = builder.build(names, errors)
+    return batch, parts, _stop(timing, chunk, len(batch))
+
+
+def _name(chunk, k, root):
+    return Path(chunk.path if isinstance(chunk, Piece) else chunk[k]).relative_to(root).as_posix()
+
+
+def _report_chunk(prof, t):
+    if not prof.enabled: return
+    prof.add("decompress", t["inflate"], t["inflate"], nbytes=t["gz_bytes"])
+    if t["normalize"]: prof.add("normalize", t["normalize"], t["normalize"], t["rows"])
+    rest = t["inflate"] + t["normalize"]
+    prof.add("decode", t["wall"] - rest, t["cpu"] - rest, t["rows"], t["bytes"])
+    prof.span("load_chunk", t["start"], t["wall"], cat="worker", pid=t["pid"], tid=t["pid"], rows=t["rows"],
+              bytes=t["bytes"], inflate_s=round(t["inflate"], 4))
+
+
+def _fresh(observers):
+    return [obs.fresh() for obs in observers]
+
+
+def _merge_parts(observers, parts):
+    for obs, part in zip(observers, parts):
+        obs.merge(part)
+
+
+def _merge_errors(into, errs):
+    if into is None: return
+    for k, v in errs.items():
+        into[k] = into.get(k, 0) + v
+
+
+def _prefetch(items, depth=2):
+    # ``items`` drawn on a thread, up to ``depth`` ahead (zlib drops the GIL while it inflates)
+    q = queue.Queue(depth); stop = threading.Event(); end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1); return True
+            except queue.Full:
+                pass
+        return False
+
+    def pump():
+        try:
+            for item in items:
+                if not put((item, None)): return
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+
+    threading.Thread(target=pump, daemon=True).start()
+    try:
+        while True:
+            item, err = q.get()
+            if item is end:
+                if err is not None: raise err
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def _run_chunks(work, files, args, workers, max_inflight, chunk_files, observers):
+    # ``work(chunk, *args, parts)`` for each chunk of ``files``, on the pool; yields ``(piece, payload)``
+    # in order, ``piece`` being the chunk's ``Piece`` (without its data) or None for a run of files
+    chunks = _chunks(files, chunk_files)
+    head = list(islice(chunks, 2)); chunks = chain(head, chunks)
+    workers = workers or default_workers()
+    prof = current()
+    total = sum(os.path.getsize(fp) for fp in files) if prof.progress_stream else 0
+    seen = 0
+
+    def finish(result):
+        nonlocal seen
+        payload, parts, timing = result
+        _report_chunk(prof, timing)
+        seen += timing["bytes"]; prof.progress("load", seen, total, "MB", 1e6)
+        _merge_parts(observers, parts)
+        return payload
+
+    def key(chunk):
+        return chunk._replace(data=None) if isinstance(chunk, Piece) else None
+
+    if workers <= 1 or len(head) <= 1:
+        for chunk in chunks:
+            yield key(chunk), finish(work(chunk, *args, _fresh(observers)))
+        return
+    max_inflight = max_inflight or 2 * workers
+    todo = _prefetch(chunks)
+    with process_pool(workers) as ex:
+        def submit(chunk):
+            return key(chunk), ex.submit(work, chunk, *args, _fresh(observers))
+        pending = deque(submit(chunk) for _, chunk in zip(range(max_inflight), todo))
+        while pending:
+            piece, fut = pending.popleft()
+            result = fut.result()
+            nxt = next(todo, None)
+            if nxt is not None: pending.append(submit(nxt))
+            yield piece, finish(result)
+
+
+def _join_rows(pieces):
+    # one file's ``(rows, errors)`` from its pieces', ``_row`` counting on across them
+    rows, errors = [], {}
+    for part, errs in pieces:
+        if rows:
+            for rec in part: rec["_row"] += len(rows)
+        rows += part; _merge_errors(errors, errs)
+    return rows, errors
+
+
+def _join_batches(batches):
+    # one file's batch from its pieces' batches (see ``_join_rows``)
+    batch = RecordBatch.concat(batches)
+    sizes = np.array([len(b) for b in batches], np.int64)
+    cols = dict(batch.columns, _file=np.zeros(len(batch), np.int32),
+                _row=batch["_row"] + np.repeat(np.cumsum(sizes) - sizes, sizes))
+    errors = {}
+    for errs in batch.errors: _merge_errors(errors, errs)
+    return RecordBatch(cols, batch.files[:1], [errors])
+
+
+def iter_loaded(files, root, workers=None, max_inflight=None, chunk_files=16, record_path=RECORD_PATHS,
+                fingerprint=False, observers=()):
+    """Yield ``(rows, errors)`` for each of ``files``, in order.
+
+    Files are handed to ``workers`` processes ``chunk_files`` at a time with at
+    most ``max_inflight`` chunks outstanding, so memory stays bounded however
+    far ahead the pool gets. A big JSONL file goes out as pieces instead (see
+    ``Piece``), each its own chunk.
+
+    ``observers`` are mergeable accumulators (``fresh()``, ``update(rec)``,
+    ``merge(other)``, e.g. ``profile.SchemaProfile``): every chunk updates
+    fresh copies in its worker and they are merged back, in file order,
+    before the chunk's rows are yielded.
+    """
+    pieces = []
+    for piece, done in _run_chunks(_load_chunk, files, (Path(root), record_path, fingerprint), workers,
+                                   max_inflight, chunk_files, observers):
+        if piece is None:
+            yield from done; continue
+        pieces += done
+        if piece.last:
+            yield _join_rows(pieces); pieces = []
+
+
+def iter_batches(files, root, extra=(), workers=None, max_inflight=None, chunk_files=16, record_path=RECORD_PATHS,
+                 fingerprint=False, observers=(), digest=False):
+    """Yield one ``RecordBatch`` per chunk of ``files`` (per big file split into pieces), in order.
+
+    The workers normalize each record and append it to typed column
+    builders, so only packed columns cross the process boundary. Raw
+    ``extra`` keys are kept as strings, ``source`` / ``lang`` / ``category``
+    dictionary-encoded. With ``digest`` the workers also hash each
+    record's text pieces into ``_digest`` (``dedup.record_digest``), so
+    exact dedup never touches the joined text. Columns are those of
+    ``batch_schema``. Knobs and ``observers`` as for ``iter_loaded``.
+    """
+    pieces = []
+    for piece, batch in _run_chunks(_batch_chunk, files, (Path(root), record_path, fingerprint, tuple(extra), digest),
+                                    workers, max_inflight, chunk_files, observers):
+        if piece is None:
+            yield batch; continue
+        pieces.append(batch)
+        if piece.last:
+            yield _join_batches(pieces); pieces = []
+
+
+def iter_pack(root, pattern=None, workers=None, max_inflight=None, chunk_files=16, errors=None,
+              record_path=RECORD_PATHS, fingerprint=False, observers=()):
+    """Yield every record of the pack under ``root`` in deterministic order.
+
+    See ``iter_loaded`` for the pool knobs. Per-kind error counts are added
+    into ``errors``; ``record_path`` says where records live inside array /
+    object documents (see ``jsonstream.iter_records``). With ``fingerprint``
+    each record also gets its canonical payload hash as ``_fp`` (see
+    ``fingerprint``), computed in the workers; ``observers`` are fed every
+    record the same way (see ``iter_loaded``).
+    """
+    with current().stage("discover"):
+        files = discover_files(root, pattern)
+    for rows, errs in iter_loaded(files, root, workers, max_inflight, chunk_files, record_path, fingerprint,
+                                  observers):
+        _merge_errors(errors, errs)
+        yield from rows
+
+
+def load_batch(root, pattern=None, extra=(), workers=None, max_inflight=None, chunk_files=16, errors=None,
+               record_path=RECORD_PATHS, fingerprint=False, observers=(), digest=False):
+    """The whole pack under ``root`` as one ``RecordBatch`` (see ``iter_batches`` / ``iter_pack``)."""
+    with current().stage("discover"):
+        files = discover_files(root, pattern)
+    batch = RecordBatch.concat(iter_batches(files, root, extra, workers, max_inflight, chunk_files, record_path,
+                                            fingerprint, observers, digest))
+    for errs in batch.errors: _merge_errors(errors, errs)
+    return batch
@@ -0,0 +1,189 @@
+"""Near-duplicate clustering: k-word-shingle MinHash, banded LSH, union-find.
+
+Shingles follow ``mixed_chat/practice_dedup.py``: lower-cased whitespace
+words, every run of ``k`` of them (texts shorter than ``k`` words have
+none and never match). Signatures are computed for whole batches of texts
+at once with NumPy, LSH buckets come from sorting one key per band, and
+every pair sharing a bucket whose estimated Jaccard clears ``threshold`` is
+merged with a vectorized union-find. Texts with identical signatures (exact
+copies, mostly) are merged up front and only one of them goes into the
+buckets, so a run of copies costs one union each, not a pair per two of
+them. Cost is linear in the number of texts times bands plus the pairs the
+buckets hold; nothing compares all pairs.
+"""
+import zlib
+from itertools import chain
+
+import numpy as np
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def _mix(cols, seed):
+    # fold a (n, m) uint array into one uint64 key per row
+    rng = np.random.default_rng(seed)
+    mult = rng.integers(1, 2**63, size=cols.shape[1], dtype=np.uint64) | np.uint64(1)
+    with np.errstate(over="ignore"):
+        return (cols.astype(np.uint64) * mult).sum(axis=1, dtype=np.uint64)
+
+
+def _words(text):
+    return text.lower().split() if isinstance(text, str) else []
+
+
+def _shingles(words, k):
+    # ``words``: one word list per text; hash each distinct word once, then combine runs of k
+    lens = np.fromiter(map(len, words), np.int64, len(words))
+    flat_words = list(chain.from_iterable(words))
+    vocab = dict.fromkeys(flat_words)
+    for w in vocab:
+        vocab[w] = zlib.crc32(w.encode("utf-8", "surrogatepass"))
+    flat = np.fromiter(map(vocab.__getitem__, flat_words), np.uint64, len(flat_words))
+    n_sh = np.maximum(lens - k + 1, 0)
+    offsets = np.zeros(len(words) + 1, np.int64)
+    np.cumsum(n_sh, out=offsets[1:])
+    if not offsets[-1]:
+        return np.zeros(0, np.uint32), offsets
+    # shingle s of text t starts at word (first word of t) + (s - first shingle of t)
+    starts = np.repeat(np.cumsum(lens) - lens - offsets[:-1], n_sh) + np.arange(offsets[-1])
+    h = _mix(flat[starts[:, None] + np.arange(k)], seed=k)
+    return ((h ^ (h >> np.uint64(32))) & _MASK32).astype(np.uint32), offsets
+
+
+def shingle_hashes(texts, k=3):
+    """32-bit hashes of every k-word shingle, concatenated, plus per-text offsets."""
+    return _shingles([_words(t) for t in texts], k)
+
+
+class MinHasher:
+    """``num_perm`` multiply-shift hash functions over 32-bit shingle hashes."""
+
+    def __init__(self, num_perm=128, k=3, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm; self.k = k
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, texts, batch_shingles=1 << 16):
+        """``(len(texts), num_perm)`` uint32 signatures; texts without shingles are all-ones."""
+        texts = list(texts)
+        sigs = np.full((len(texts), self.num_perm), _EMPTY, np.uint32)
+        start, batch, budget = 0, [], 0
+        for n, text in enumerate(texts, 1):
+            batch.append(_words(text))
+            budget += max(len(batch[-1]) - self.k + 1, 0)
+            if budget >= batch_shingles or n == len(texts):
+                self._fill(sigs, start, batch)
+                start, batch, budget = n, [], 0
+        return sigs
+
+    def _fill(self, sigs, start, words):
+        sh, off = _shingles(words, self.k)
+        if not len(sh): return
+        hv = np.multiply(self.a[:, None], sh.astype(np.uint64)[None, :])
+        hv += self.b[:, None]
+        has = np.flatnonzero(off[1:] > off[:-1])
+        # multiply-shift keeps the high word, and the shift is monotone, so take minima first
+        sigs[start + has] = (np.minimum.reduceat(hv, off[has], axis=1) >> np.uint64(32)).T
+
+
+def lsh_params(threshold, num_perm):
+    """``(bands, rows)`` with ``bands * rows <= num_perm`` whose S-curve midpoint is nearest ``threshold``."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        mid = (1.0 / bands) ** (1.0 / rows)
+        if best is None or abs(mid - threshold) < best[0]:
+            best = (abs(mid - threshold), bands, rows)
+    return best[1], best[2]
+
+
+def _run_pairs(keys):
+    # every pair of positions (into ``keys`` sorted) within each run of equal keys
+    n = len(keys)
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    sizes = np.diff(np.concatenate([starts, [n]]))
+    # the member at rank r of a run of s pairs up with the s - r - 1 after it
+    after = np.repeat(starts + sizes, sizes) - np.arange(n) - 1
+    i = np.repeat(np.arange(n), after)
+    return i, i + 1 + np.arange(len(i)) - np.repeat(np.cumsum(after) - after, after)
+
+
+def candidate_pairs(sigs, bands, rows):
+    """Every index pair ``i < j`` sharing a bucket in at least one band."""
+    live = np.flatnonzero(sigs[:, 0] != _EMPTY) if len(sigs) else np.zeros(0, np.int64)
+    found = []
+    for b in range(bands):
+        keys = _mix(sigs[live, b * rows:(b + 1) * rows], seed=1000 + b)
+        order = np.argsort(keys, kind="stable")
+        pi, pj = _run_pairs(keys[order])
+        i, j = live[order[pi]], live[order[pj]]
+        found.append(np.minimum(i, j) * len(sigs) + np.maximum(i, j))
+    pairs = np.unique(np.concatenate(found)) if found else np.zeros(0, np.int64)
+    return pairs // max(len(sigs), 1), pairs % max(len(sigs), 1)
+
+
+class UnionFind:
+    """Array-backed union-find; ``union_pairs`` links a whole batch of pairs at once."""
+
+    def __init__(self, n):
+        self.parent = np.arange(n, dtype=np.int64)
+
+    def find_all(self):
+        p = self.parent
+        while True:
+            q = p[p]
+            if np.array_equal(q, p): return p
+            p = q
+
+    def union_pairs(self, i, j):
+        # hook the larger root under the smaller one, then jump pointers, until stable
+        while len(i):
+            p = self.parent = self.find_all()
+            ri, rj = p[i], p[j]
+            keep = ri != rj
+            if not keep.any(): return
+            i, j, ri, rj = i[keep], j[keep], ri[keep], rj[keep]
+            np.minimum.at(p, np.maximum(ri, rj), np.minimum(ri, rj))
+
+    def labels(self):
+        self.parent = self.find_all()
+        return self.parent
+
+
+def near_dup_clusters(texts, threshold=0.7, k=3, num_perm=128, bands=None, rows=None, seed=1):
+    """Cluster label per text (the smallest member index); singletons label themselves."""
+    texts = list(texts)
+    if bands is None or rows is None:
+        bands, rows = lsh_params(threshold, num_perm)
+    sigs = MinHasher(num_perm, k, seed).signatures(texts)
+    uf = UnionFind(len(texts))
+    # identical signatures: merged here, and only the first of each goes into the buckets
+    _, first, inverse = np.unique(_mix(sigs, seed=999), return_index=True, return_inverse=True)
+    live = first[inverse.ravel()] != np.arange(len(texts))
+    live &= sigs[:, 0] != _EMPTY
+    uf.union_pairs(np.flatnonzero(live), first[inverse.ravel()][live])
+    i, j = candidate_pairs(sigs[first], bands, rows)
+    i, j = first[i], first[j]
+    est = np.zeros(len(i))
+    for s in range(0, len(i), 1 << 16):
+        est[s:s + (1 << 16)] = (sigs[i[s:s + (1 << 16)]] == sigs[j[s:s + (1 << 16)]]).mean(axis=1)
+    ok = est >= threshold
+    uf.union_pairs(i[ok], j[ok])
+    return uf.labels()
+
+
+def dup_rate(labels):
+    """Share of texts that are not the first member of their cluster."""
+    labels = np.asarray(labels)
+    return float((labels != np.arange(len(labels))).mean()) if len(labels) else 0.0
+
+
+def clusters(labels):
+    """Groups of indexes (size > 1) sharing a label, largest first."""
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    cuts = np.flatnonzero(np.diff(labels[order])) + 1
+    groups = [g for g in np.split(order, cuts) if len(g) > 1]
+    return sorted((g.tolist() for g in groups), key=len, reverse=True)
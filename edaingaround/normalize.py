@@ -0,0 +1,59 @@
+"""Normalize raw pack records into the shared ``{id, source, prompt, response, text, ts}`` shape."""
+
+STR_COLUMNS = ("id", "source", "prompt", "response", "text", "ts")
+COLUMNS = STR_COLUMNS + ("_file", "_row")
+
+
+def _str(v):
+    return v if isinstance(v, str) else ("" if v is None else str(v))
+
+
+def _turn(msgs, role, last=False):
+    seq = reversed(msgs) if last else msgs
+    return next((_str(m.get("content", "")) for m in seq if isinstance(m, dict) and m.get("role") == role), "")
+
+
+def text_parts(rec):
+    """The pieces whose ``"\\n"``-join is the main ``text`` (user and assistant turns for chat records)."""
+    msgs = rec.get("messages")
+    if isinstance(msgs, list):
+        return _turn(msgs, "user"), _turn(msgs, "assistant", last=True)
+    if isinstance(rec.get("text"), str):
+        return (rec["text"],)
+    return (_str(rec.get("response", rec.get("code"))) or _str(rec.get("prompt", rec.get("instruction"))),)
+
+
+def text_length(rec):
+    """``len`` of the record's normalized ``text``, without building it."""
+    parts = text_parts(rec)
+    return sum(map(len, parts)) + len(parts) - 1
+
+
+def normalize_record(rec):
+    """Main-text columns for one record.
+
+    Chat records take the first user turn and the last assistant turn, with
+    ``text`` = user + "\\n" + assistant; flat records use ``prompt`` /
+    ``instruction`` and ``response`` / ``code``, and ``text`` falls back to
+    response, then prompt, when the record has no ``text`` string of its own.
+    """
+    msgs = rec.get("messages")
+    if isinstance(msgs, list):
+        prompt = _turn(msgs, "user"); response = _turn(msgs, "assistant", last=True)
+        text = prompt + "\n" + response
+    else:
+        prompt = _str(rec.get("prompt", rec.get("instruction")))
+        response = _str(rec.get("response", rec.get("code")))
+        text = rec["text"] if isinstance(rec.get("text"), str) else (response or prompt)
+    rid = rec.get("id")
+    ts = rec.get("timestamp", rec.get("ts"))
+    return {
+        "id": None if rid is None else _str(rid),
+        "source": None if rec.get("source") is None else _str(rec["source"]),
+        "prompt": prompt,
+        "response": response,
+        "text": text,
+        "ts": None if ts is None else _str(ts),
+        "_file": rec.get("_file"),
+        "_row": rec.get("_row"),
+    }
@@ -0,0 +1,95 @@
+"""Pack charts from NumPy pre-aggregates, collected into one report per pack.
+
+Figures only ever receive aggregates: ``histogram`` bins the values with
+``np.histogram`` and plots the bin counts, ``bar`` plots at most ``top``
+categories. A figure's size and render time are therefore fixed, whether
+the pack has 3k rows or 30M. ``Report`` writes all of a pack's figures
+into ``report.html``, which loads one ``plotly.min.js`` sitting next to it
+(plotly's ``include_plotlyjs="directory"`` layout, and the file is only
+written when missing). Figures added under a name are also written as
+their own small page against the same asset, so the packs' required
+artifacts (``length_hist.html``, ...) still exist.
+"""
+import html
+from pathlib import Path
+
+import numpy as np
+import plotly.graph_objects as go
+
+from .profiler import current
+
+ASSET = "plotly.min.js"
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title><script src="{asset}"></script></head>
+<body>
+{body}
+</body></html>
+"""
+
+
+def histogram(values, bins=60, title=None, x_title=None, range=None):
+    """Histogram figure from ``np.histogram`` counts (NaNs dropped)."""
+    xs = np.asarray(values, np.float64).ravel()
+    xs = xs[~np.isnan(xs)]
+    counts, edges = np.histogram(xs, bins=bins, range=range)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                           marker_line_width=0, hovertemplate="%{x}: %{y}<extra></extra>"))
+    fig.update_layout(title=title, bargap=0, xaxis_title=x_title, yaxis_title="count")
+    return fig
+
+
+def bar(counts, title=None, x_title=None, y_title="count", top=50, hover=None):
+    """Bar figure of a ``{label: value}`` mapping or Series, first ``top`` items in order.
+
+    ``hover`` is an optional ``(name, {label: value})`` shown on hover.
+    """
+    items = list(dict(counts).items())[:top]
+    labels = [str(k) for k, _ in items]
+    trace = go.Bar(x=labels, y=[v for _, v in items])
+    if hover is not None:
+        name, extra = hover
+        trace.customdata = [dict(extra).get(k) for k, _ in items]
+        trace.hovertemplate = f"%{{x}}: %{{y}}<br>{name}: %{{customdata}}<extra></extra>"
+    fig = go.Figure(trace)
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title)
+    return fig
+
+
+class Report:
+    """A pack's figures, written as one page (plus a page per named figure) sharing one plotly.js."""
+
+    def __init__(self, out_dir, title="EDA report"):
+        self.out_dir = Path(out_dir)
+        self.title = title
+        self.figures = []
+        self.artifacts = []
+
+    def add(self, fig, name=None):
+        self.figures.append((name, fig))
+        return fig
+
+    def _asset(self):
+        path = self.out_dir / ASSET
+        if not path.exists():
+            from plotly.offline import get_plotlyjs
+            path.write_text(get_plotlyjs(), encoding="utf-8")
+
+    def _page(self, title, figs):
+        body = "\n".join(fig.to_html(full_html=False, include_plotlyjs=False) for fig in figs)
+        return _PAGE.format(title=html.escape(title or ""), asset=ASSET, body=body)
+
+    def save(self, filename="report.html"):
+        """Write the report and the named pages; returns the report's path."""
+        with current().stage("plot", cat="plot") as span:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            self._asset()
+            self.artifacts = []
+            for name, fig in self.figures:
+                if name is None: continue
+                page = self.out_dir / name
+                page.write_text(self._page(fig.layout.title.text, [fig]), encoding="utf-8")
+                self.artifacts.append(name); span.nbytes += page.stat().st_size
+            path = self.out_dir / filename
+            path.write_text(self._page(self.title, [fig for _, fig in self.figures]), encoding="utf-8")
+            span.nbytes += path.stat().st_size
+        return path
@@ -0,0 +1,74 @@
+"""Streaming, mergeable schema profile: presence and JSON types per nested path.
+
+Paths name dict keys with ``.`` and list items with ``[]``: a record
+``{"meta": [{"k": "tag"}]}`` touches ``meta``, ``meta[]`` and ``meta[].k``.
+Presence counts records (a path seen twice in one record counts once);
+types are JSON type names as they were in the file, not as pandas coerced
+them. ``_``-prefixed provenance keys are skipped. Profiles built over
+different slices of a pack ``merge`` into exactly the whole-pack profile,
+so ``iter_pack(..., observers=(profile,))`` can build them in the workers.
+"""
+
+JSON_TYPES = {dict: "object", list: "array", str: "string", bool: "boolean",
+              int: "integer", float: "number", type(None): "null"}
+
+
+def json_type(v):
+    return JSON_TYPES.get(type(v), type(v).__name__)
+
+
+class SchemaProfile:
+    """Per-path presence counts and JSON-type sets over the records it has seen."""
+
+    def __init__(self):
+        self.rows = 0
+        self.presence = {}
+        self.types = {}
+
+    def fresh(self):
+        return SchemaProfile()
+
+    def _visit(self, path, v, seen):
+        seen[path] = None
+        self.types.setdefault(path, set()).add(json_type(v))
+        if isinstance(v, dict):
+            for k, sub in v.items():
+                self._visit(f"{path}.{k}", sub, seen)
+        elif isinstance(v, list):
+            for item in v:
+                self._visit(path + "[]", item, seen)
+
+    def update(self, rec):
+        self.rows += 1
+        seen = {}  # insertion-ordered, so ties in ``top_present`` follow first sight
+        for k, v in rec.items():
+            if not str(k).startswith("_"):
+                self._visit(str(k), v, seen)
+        for p in seen:
+            self.presence[p] = self.presence.get(p, 0) + 1
+
+    def merge(self, other):
+        self.rows += other.rows
+        for p, n in other.presence.items():
+            self.presence[p] = self.presence.get(p, 0) + n
+        for p, ts in other.types.items():
+            self.types.setdefault(p, set()).update(ts)
+        return self
+
+    def paths(self, nested=True, items=False):
+        """Known paths; ``nested=False`` keeps top-level keys only, ``items`` keeps ``[]`` paths."""
+        return [p for p in self.presence
+                if (nested or "." not in p and "[]" not in p) and (items or "[]" not in p)]
+
+    def top_present(self, n=None, **kw):
+        """``{path: records}`` by descending presence (ties by path order of first sight)."""
+        ranked = sorted(self.paths(**kw), key=lambda p: -self.presence[p])
+        return {p: self.presence[p] for p in ranked[:n]}
+
+    def multi_type(self, ignore_null=True, **kw):
+        """Paths seen with more than one JSON type (``null`` aside, unless ``ignore_null`` is off)."""
+        out = []
+        for p in self.paths(**kw):
+            ts = self.types[p] - {"null"} if ignore_null else self.types[p]
+            if len(ts) > 1: out.append(p)
+        return out
@@ -0,0 +1,173 @@
+"""Stage profiler: time, CPU, throughput and memory per pipeline stage, plus a Chrome trace.
+
+Instrumented code reports into ``current()``, the active ``Profiler``, or a
+disabled one when none is active, so callers never check. ``with
+current().stage("normalize", rows=n) as span:`` times a block (``span.rows``
+/ ``span.nbytes`` may be filled in inside it). ``add`` records totals
+measured elsewhere; the loader's worker processes time their own chunks and
+send the numbers back. Per stage it sums wall seconds, CPU seconds (this
+process, plus pool children reaped during the stage), rows, bytes and calls.
+``summary`` derives rows/s and MB/s. A stage without rows of its own is
+counted against the most rows any stage saw, so a metric's rows/s means
+pack rows per second.
+
+A stage costs a few clock reads and a dict update, so profiling stays on:
+``dag.run_pack`` writes ``profile.json`` next to ``result.json``. It is a
+Chrome trace (open it in chrome://tracing or Perfetto), with the summary
+under ``stages``. ``EDA_PROFILE=off`` turns it off. ``EDA_PROFILE=memory``
+also runs tracemalloc and records each stage's Python heap peak; that slows
+allocation-heavy stages several times, so it is opt-in. The RSS high-water
+mark is always recorded. Live progress (done / total, rate, ETA) goes to
+stderr when stderr is a terminal.
+"""
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_ENV = "EDA_PROFILE"
+PROFILE_NAME = "profile.json"
+
+
+def rss_hwm_mb():
+    """RSS high-water mark of this process or any reaped child, in MB."""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _cpu():
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + ru.ru_utime + ru.ru_stime
+
+
+class Span:
+    __slots__ = ("rows", "nbytes", "peak")
+
+    def __init__(self, rows=0, nbytes=0):
+        self.rows = rows; self.nbytes = nbytes; self.peak = None
+
+
+class Profiler:
+    """Per-stage totals and trace events of one run; see the module docstring."""
+
+    def __init__(self, enabled=True, memory=False, progress=None, interval=0.5):
+        self.enabled = enabled
+        self.memory = memory
+        self.progress_stream = progress
+        self.interval = interval
+        self.t0 = time.time()
+        self.totals = {}
+        self.events = []
+        self.rows = 0
+        self._open = []; self._lock = threading.Lock(); self._shown = {}
+
+    @classmethod
+    def from_env(cls):
+        mode = os.environ.get(PROFILE_ENV, "on").lower()
+        return cls(enabled=mode not in ("0", "off", "false", "no"), memory=mode == "memory",
+                   progress=sys.stderr if sys.stderr.isatty() else None)
+
+    @contextmanager
+    def activate(self):
+        """Make this the profiler ``current()`` returns (in every thread) for the block."""
+        global _active
+        prev, _active = _active, self
+        try:
+            yield self
+        finally:
+            _active = prev
+
+    @contextmanager
+    def stage(self, name, rows=0, nbytes=0, cat="stage"):
+        span = Span(rows, nbytes)
+        if not self.enabled:
+            yield span; return
+        if self.memory: self._mem_enter(span)
+        start = time.time(); w0 = time.perf_counter(); c0 = _cpu()
+        try:
+            yield span
+        finally:
+            wall = time.perf_counter() - w0; cpu = _cpu() - c0
+            if self.memory: self._mem_exit(span)
+            self.add(name, wall, cpu, span.rows, span.nbytes, span.peak)
+            self.span(name, start, wall, cat=cat, rows=span.rows, bytes=span.nbytes)
+
+    def add(self, name, wall, cpu=0.0, rows=0, nbytes=0, peak=None):
+        """Add one call's numbers to stage ``name``'s totals."""
+        if not self.enabled: return
+        with self._lock:
+            t = self.totals.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "bytes": 0,
+                                              "peak": None})
+            t["calls"] += 1; t["wall_s"] += wall; t["cpu_s"] += cpu; t["rows"] += rows; t["bytes"] += nbytes
+            if peak is not None: t["peak"] = max(t["peak"] or 0, peak)
+            self.rows = max(self.rows, t["rows"])
+
+    def span(self, name, start, wall, cat="stage", pid=None, tid=None, **args):
+        """A complete trace event (``start`` is ``time.time()``, so worker processes' spans line up)."""
+        if not self.enabled: return
+        with self._lock:
+            self.events.append({"name": name, "cat": cat, "ph": "X", "ts": round((start - self.t0) * 1e6),
+                                "dur": round(wall * 1e6), "pid": pid or os.getpid(),
+                                "tid": tid or threading.get_native_id(), "args": args})
+
+    def _fold(self):
+        # the heap peak since the last reset counts for every stage open now
+        peak = tracemalloc.get_traced_memory()[1]
+        for s in self._open: s.peak = max(s.peak or 0, peak)
+
+    def _mem_enter(self, span):
+        with self._lock:
+            if not tracemalloc.is_tracing(): tracemalloc.start()
+            self._fold(); tracemalloc.reset_peak()
+            self._open.append(span)
+
+    def _mem_exit(self, span):
+        with self._lock:
+            self._fold(); self._open.remove(span)
+
+    def progress(self, name, done, total, unit="", scale=1):
+        """A live ``done / total, rate, ETA`` line on the progress stream, at most every ``interval`` s."""
+        if self.progress_stream is None or not self.enabled: return
+        now = time.perf_counter()
+        first, last = self._shown.get(name, (now, 0.0))
+        if done < total and now - last < self.interval: return
+        self._shown[name] = (first, now)
+        rate = done / max(now - first, 1e-9)
+        eta = f"ETA {(total - done) / rate:.0f}s" if rate and done < total else "done"
+        self.progress_stream.write(f"\r{name}: {done / scale:.1f}/{total / scale:.1f} {unit}"
+                                   f"  {rate / scale:.1f} {unit}/s  {eta}\033[K")
+        if done >= total: self.progress_stream.write("\n")
+        self.progress_stream.flush()
+
+    def summary(self):
+        """``{stage: {calls, wall_s, cpu_s, rows, rows_per_s, mb, mb_per_s, peak_mb}}`` in first-seen order."""
+        out = {}
+        for name, t in self.totals.items():
+            wall = max(t["wall_s"], 1e-9); rows = t["rows"] or self.rows
+            out[name] = {"calls": t["calls"], "wall_s": round(t["wall_s"], 4), "cpu_s": round(t["cpu_s"], 4),
+                         "rows": rows, "rows_per_s": round(rows / wall, 1), "mb": round(t["bytes"] / 1e6, 3),
+                         "mb_per_s": round(t["bytes"] / 1e6 / wall, 2),
+                         "peak_mb": None if t["peak"] is None else round(t["peak"] / 1e6, 2)}
+        return out
+
+    def write(self, path):
+        """Write the Chrome trace with the summary alongside; returns ``path``."""
+        doc = {"traceEvents": self.events, "displayTimeUnit": "ms", "stages": self.summary(),
+               "wall_s": round(time.time() - self.t0, 4), "rss_hwm_mb": rss_hwm_mb()}
+        Path(path).write_text(json.dumps(doc), encoding="utf-8")
+        return path
+
+
+_NULL = Profiler(enabled=False)
+_active = None
+
+
+def current():
+    """The active profiler, or a disabled one."""
+    return _active or _NULL
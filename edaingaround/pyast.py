@@ -0,0 +1,141 @@
+"""Python AST metrics per snippet, deduplicated, cached and parsed on a process pool.
+
+``py_metrics`` is the code packs' analysis (``funcs``, ``branches`` and the
+lower-cased ``calls``; ``None`` when the snippet does not parse).
+``AstAnalyzer.analyze`` digests every snippet, parses each distinct one at
+most once, and only those not already in the persistent cache
+(``<cache_dir>/pyast-<python>-v<format>.json``; the key includes the
+interpreter's major/minor version because what parses depends on the
+grammar). Misses are sent to worker processes in chunks.
+
+The same parse also yields structural fingerprints: ``shape`` for the whole
+snippet and ``func_shapes`` for each function, hashed bottom-up over the
+tree with every identifier and literal value replaced by its type, so
+renamed copies (``def f384(a): while a<5: break`` and ``def g(x): while
+x<7: break``) hash alike. ``shape_clusters`` groups them with one dict pass
+instead of comparing pairs.
+"""
+import ast
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from .loader import default_workers, map_chunks
+
+PY_TAG = f"py{sys.version_info[0]}{sys.version_info[1]}"
+CACHE_FORMAT = 2  # bump when py_metrics' output changes
+
+
+class _Counter(ast.NodeVisitor):
+    def __init__(self):
+        self.fn = 0; self.br = 0; self.calls = []
+
+    def visit_FunctionDef(self, n):
+        self.fn += 1; self.generic_visit(n)
+
+    def visit_AsyncFunctionDef(self, n):
+        self.fn += 1; self.generic_visit(n)
+
+    def visit_If(self, n): self.br += 1; self.generic_visit(n)
+    def visit_For(self, n): self.br += 1; self.generic_visit(n)
+    def visit_While(self, n): self.br += 1; self.generic_visit(n)
+    def visit_Try(self, n): self.br += 1; self.generic_visit(n)
+
+    def visit_Call(self, n):
+        name = None
+        if isinstance(n.func, ast.Name): name = n.func.id
+        elif isinstance(n.func, ast.Attribute): name = n.func.attr
+        self.calls.append((name or "").lower())
+        self.generic_visit(n)
+
+
+def _shape(node, funcs):
+    # 8-byte digest of the subtree: node types and field layout, scalars reduced to their type name
+    h = hashlib.blake2b(type(node).__name__.encode(), digest_size=8)
+    for _, value in ast.iter_fields(node):
+        for v in value if isinstance(value, list) else (value,):
+            h.update(_shape(v, funcs) if isinstance(v, ast.AST) else type(v).__name__.encode() + b"|")
+        if isinstance(value, list): h.update(b"]")
+    d = h.digest()
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)): funcs.append(d.hex())
+    return d
+
+
+def py_metrics(code):
+    """``{"funcs", "branches", "calls", "shape", "func_shapes"}`` for a snippet, ``None`` if it does not parse."""
+    try:
+        tree = ast.parse(code)
+    except Exception:
+        return None
+    c = _Counter(); c.visit(tree)
+    funcs = []
+    shape = _shape(tree, funcs).hex()
+    return {"funcs": c.fn, "branches": c.br, "calls": c.calls, "shape": shape, "func_shapes": funcs}
+
+
+def shape_clusters(shapes):
+    """Positions sharing a structural hash, ``None`` skipped; groups of two or more, largest first."""
+    index = {}
+    for i, s in enumerate(shapes):
+        if s is not None: index.setdefault(s, []).append(i)
+    return sorted((g for g in index.values() if len(g) > 1), key=len, reverse=True)
+
+
+def structural_dup_rate(shapes):
+    """Share of (non-``None``) shapes that repeat an earlier one."""
+    shapes = [s for s in shapes if s is not None]
+    return (len(shapes) - len(set(shapes))) / len(shapes) if shapes else 0.0
+
+
+def code_digest(code):
+    return hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def _analyze_chunk(codes):
+    return [py_metrics(c) for c in codes]
+
+
+class AstAnalyzer:
+    """``py_metrics`` over a column of snippets; see the module docstring."""
+
+    def __init__(self, cache_dir=None, workers=None, chunk=64):
+        self.workers = workers or default_workers()
+        self.chunk = chunk
+        self.cache_path = Path(cache_dir) / f"pyast-{PY_TAG}-v{CACHE_FORMAT}.json" if cache_dir else None
+        self.memo = {}
+        self.stats = {"snippets": 0, "distinct": 0, "cached": 0, "parsed": 0}
+        if self.cache_path and self.cache_path.exists():
+            try:
+                self.memo = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            except ValueError:
+                self.memo = {}
+
+    def analyze(self, codes):
+        """``py_metrics`` of each snippet (None for None / unparsable), aligned with ``codes``."""
+        codes = ["" if c is None else c for c in codes]
+        digests = [code_digest(c) for c in codes]
+        todo = {}
+        for d, c in zip(digests, codes):
+            if d not in self.memo and d not in todo: todo[d] = c
+        distinct = len(set(digests))
+        if todo:
+            keys, srcs = list(todo), list(todo.values())
+            results = [m for part in map_chunks(_analyze_chunk, srcs, self.chunk, self.workers) for m in part]
+            self.remember(dict(zip(keys, results)))
+        self.stats = {"snippets": len(codes), "distinct": distinct, "cached": distinct - len(todo),
+                      "parsed": len(todo)}
+        return [self.memo[d] for d in digests]
+
+    def remember(self, metrics):
+        """Add ``{code_digest: py_metrics}`` results parsed elsewhere to the memo and the cache."""
+        self.memo.update(metrics)
+        self._save()
+
+    def _save(self):
+        if self.cache_path is None: return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.memo), encoding="utf-8")
+        os.replace(tmp, self.cache_path)
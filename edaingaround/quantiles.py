@@ -0,0 +1,216 @@
+"""Mergeable quantile summaries: a KLL sketch and an exact NumPy-selection mode.
+
+Both take values one at a time (``add``), in arrays (``extend``) or from
+records (``update`` with a picklable ``value`` callable, e.g.
+``normalize.text_length``), so either can be passed to
+``iter_pack(..., observers=...)`` or ``PackCache(..., observers=...)`` and
+built in the pool workers; ``merge`` combines partitions, and ``dump`` /
+``restore`` turn a summary into one float64 array and back (the cache keeps
+one per file). Both answer ``quantile(q)``, ``value_at(rank)`` and
+``top_mass(q)``, the share of the summed values carried by values at or
+above ``quantile(q)`` (``token_top5_share`` is ``top_mass(0.95)``).
+
+``KLLSketch`` keeps O(k) items (about 3k). A sketch that has seen at most k
+values has never compacted and answers exactly; past that its rank error
+is about ``rank_error(k)`` * n with 99% confidence (DataSketches' fit for
+KLL, ~1.3% at the default k=200). ``n`` and ``total`` are tracked
+exactly. ``top_mass`` is one minus the estimated mass below the cut over
+the exact total: every value down there is under the cut ``c``, so the
+share is off by at most ``rank_error(k) * n * c / total`` however heavy the
+tail is (``top_mass_error``; about 0.03 for Pareto(1.2) or (2.0) at k=200,
+measured 0.003 or less on 1M values). ``ExactQuantiles`` keeps every
+value in a float64 buffer and answers with ``np.partition`` selection,
+never a full sort.
+"""
+import math
+
+import numpy as np
+
+
+def rank_error(k):
+    """Normalized single-quantile rank error of a KLL sketch with parameter ``k`` (99% confidence)."""
+    return 2.296 / k ** 0.9723
+
+
+class _Summary:
+    def __init__(self, value=None):
+        self.value = value
+        self._pending = []
+
+    def update(self, rec):
+        v = self.value(rec) if self.value is not None else rec
+        if v is not None: self.add(v)
+
+    def add(self, v):
+        self._pending.append(v)
+        if len(self._pending) >= 4096: self._flush()
+
+    def _flush(self):
+        if self._pending:
+            xs = np.asarray(self._pending, np.float64); self._pending = []
+            self._extend(xs)
+
+    def extend(self, xs):
+        self._flush()
+        self._extend(np.asarray(xs, np.float64).ravel())
+        return self
+
+    @property
+    def spec(self):
+        """What the summary keeps, as JSON (caches key on it)."""
+        return [type(self).__name__, getattr(self.value, "__qualname__", None)]
+
+
+class ExactQuantiles(_Summary):
+    """Every value, answered by selection (``np.partition``) over one NumPy buffer."""
+
+    def __init__(self, value=None):
+        super().__init__(value)
+        self._chunks = []
+
+    def fresh(self):
+        return ExactQuantiles(self.value)
+
+    def _extend(self, xs):
+        if len(xs): self._chunks.append(xs)
+
+    def merge(self, other):
+        self._flush(); other._flush()
+        self._chunks.extend(other._chunks)
+        return self
+
+    def dump(self):
+        return self.values().copy()
+
+    def restore(self, state):
+        self._extend(np.asarray(state, np.float64)); return self
+
+    def values(self):
+        self._flush()
+        if len(self._chunks) != 1:
+            self._chunks = [np.concatenate(self._chunks) if self._chunks else np.zeros(0)]
+        return self._chunks[0]
+
+    @property
+    def n(self):
+        return len(self.values())
+
+    @property
+    def total(self):
+        return float(self.values().sum())
+
+    def value_at(self, rank):
+        """The ``rank``-th smallest value (0-based)."""
+        return float(np.partition(self.values(), rank)[rank])
+
+    def quantile(self, q):
+        """Linearly interpolated quantile, as ``np.percentile`` / pandas compute it."""
+        xs = self.values()
+        if not len(xs): return math.nan
+        pos = q * (len(xs) - 1)
+        lo, hi = math.floor(pos), math.ceil(pos)
+        part = np.partition(xs, [lo, hi])
+        return float(part[lo] + (part[hi] - part[lo]) * (pos - lo))
+
+    def top_mass(self, q):
+        xs = self.values()
+        total = xs.sum()
+        return float(xs[xs >= self.quantile(q)].sum() / total) if total else 0.0
+
+
+class KLLSketch(_Summary):
+    """KLL quantile sketch (Karnin, Lang & Liberty 2016) with compactor capacities shrinking by 2/3 per level."""
+
+    def __init__(self, k=200, value=None, seed=0):
+        super().__init__(value)
+        self.k = k; self.seed = seed
+        self._n = 0; self._total = 0.0
+        self.levels = [np.zeros(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def fresh(self):
+        return KLLSketch(self.k, self.value, self.seed)
+
+    @property
+    def n(self):
+        self._flush(); return self._n
+
+    @property
+    def total(self):
+        self._flush(); return self._total
+
+    @property
+    def spec(self):
+        return super().spec + [self.k]
+
+    def _capacity(self, h):
+        return max(math.ceil(self.k * (2 / 3) ** (len(self.levels) - h - 1)), 2)
+
+    def _compress(self):
+        while sum(map(len, self.levels)) > sum(self._capacity(h) for h in range(len(self.levels))):
+            h = next(h for h, buf in enumerate(self.levels) if len(buf) >= self._capacity(h))
+            if h + 1 == len(self.levels): self.levels.append(np.zeros(0))
+            buf = np.sort(self.levels[h])
+            odd = len(buf) % 2
+            # keep one item back when odd; every other item moves up with double weight
+            promoted = buf[:len(buf) - odd][self._rng.integers(2)::2]
+            self.levels[h] = buf[len(buf) - odd:]
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def _extend(self, xs):
+        if not len(xs): return
+        self._n += len(xs); self._total += float(xs.sum())
+        self.levels[0] = np.concatenate([self.levels[0], xs])
+        self._compress()
+
+    def merge(self, other):
+        self._flush(); other._flush()
+        while len(self.levels) < len(other.levels): self.levels.append(np.zeros(0))
+        for h, buf in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self._n += other._n; self._total += other._total
+        self._compress()
+        return self
+
+    def dump(self):
+        # [n, total, levels, size of each level, items level by level]
+        self._flush()
+        return np.concatenate([[self._n, self._total, len(self.levels)], list(map(len, self.levels)),
+                               *self.levels])
+
+    def restore(self, state):
+        n, total, depth = state[:3]; depth = int(depth)
+        cuts = np.cumsum(np.concatenate([[3 + depth], state[3:3 + depth]])).astype(np.int64)
+        other = self.fresh()
+        other._n, other._total = int(n), float(total)
+        other.levels = [np.asarray(state[a:b], np.float64) for a, b in zip(cuts, cuts[1:])]
+        return self.merge(other)
+
+    def _weighted(self):
+        self._flush()
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(buf), 2.0 ** h) for h, buf in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        items, weights = self._weighted()
+        if not len(items): return math.nan
+        cum = np.cumsum(weights)
+        return float(items[min(np.searchsorted(cum, q * cum[-1]), len(items) - 1)])
+
+    def value_at(self, rank):
+        """The item at estimated 0-based ``rank`` (exact while ``n <= k``)."""
+        items, weights = self._weighted()
+        return float(items[min(np.searchsorted(np.cumsum(weights), rank, side="right"), len(items) - 1)])
+
+    def top_mass(self, q):
+        # the mass below the cut is bounded by the cut, so estimate that and take it off the exact total
+        if not self.total: return 0.0
+        items, weights = self._weighted()
+        return float(1 - (items * weights)[items < self.quantile(q)].sum() / self.total)
+
+    def top_mass_error(self, q):
+        """Bound on how far ``top_mass(q)`` is from the exact share (99% confidence; 0 while exact)."""
+        if self.n <= self.k or not self.total: return 0.0
+        return rank_error(self.k) * self.n * abs(self.quantile(q)) / self.total
@@ -0,0 +1,116 @@
+"""One-pass multi-detector text scanner with per-row hit bitmasks.
+
+All detectors are compiled into a single alternation of named groups, and
+every phrase list goes into one shared trie-shaped alternative, so adding
+phrases or phrase detectors barely changes the cost of walking a text (52
+detectors scan mixed_chat in about twice the time of 4). When a detector hits it
+is dropped from the alternation (patterns for each remaining subset are
+compiled once and cached) and the search resumes at the same position, so
+the bits are exactly those of one ``re.search`` per detector, at a cost of
+at most one search per detector that hits.
+
+Detector patterns must use named, not numbered, groups and backreferences.
+"""
+import re
+
+import numpy as np
+
+from .loader import map_chunks
+
+# the mixed_chat notebook's PII patterns
+PII_EMAIL = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+PII_PHONE = r"\+?\d[\d\-\s]{7,}\d"
+AIISH_PHRASES = (
+    "as an ai language model", "as an ai model", "as a large language model", "as an ai assistant",
+    "i am an ai", "i'm an ai", "i do not have personal opinions", "i don't have personal opinions",
+    "i cannot browse the internet", "my knowledge cutoff", "as of my last knowledge update",
+)
+
+
+def repeat_run(n, name="rep"):
+    """The same word ``n`` or more times in a row (``name`` names the inner group)."""
+    return rf"\b(?P<{name}>\w+)(?:\s+(?P={name})\b){{{n - 1},}}"
+
+
+def _trie_pattern(phrases, marker=None):
+    # phrases: [(text, tag)]; ``marker(tag)`` is emitted where a tagged phrase ends
+    trie = {}
+    for ph, tag in phrases:
+        node = trie
+        for ch in ph.lower():
+            node = node.setdefault(ch, {})
+        node.setdefault("", []).append(tag)
+
+    def emit(node):
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        end = "".join(marker(tag) for tag in node.get("", ())) if marker else ""
+        if not alts: return end
+        body = alts[0] if len(alts) == 1 and "" not in node else "(?:" + "|".join(alts) + ")"
+        return end + body + "?" if "" in node else body
+
+    return r"(?i:\b" + emit(trie) + r"\b)"
+
+
+def phrase_pattern(phrases):
+    """One trie-factored, case-insensitive alternative for a phrase list; spaces match any whitespace."""
+    return _trie_pattern([(ph, None) for ph in phrases])
+
+
+class Scanner:
+    """``detectors``: ``{name: regex or list of phrases}`` (dict order is bit order, at most 64).
+
+    Phrase-list detectors all share one trie; the end of each phrase carries
+    an empty marker group naming its detector.
+    """
+
+    def __init__(self, detectors):
+        self.names = list(detectors)
+        if len(self.names) > 64: raise ValueError("at most 64 detectors")
+        self.patterns = {n: p for n, p in detectors.items() if isinstance(p, str)}
+        self.phrases = {n: tuple(p) for n, p in detectors.items() if not isinstance(p, str)}
+        self._compiled = {}
+
+    def _regex(self, remaining):
+        rx = self._compiled.get(remaining)
+        if rx is None:
+            live = [n for i, n in enumerate(self.names) if remaining >> i & 1]
+            alts = [f"(?P<{n}>{self.patterns[n]})" for n in live if n in self.patterns]
+            tagged = [(ph, n) for n in live if n in self.phrases for ph in self.phrases[n]]
+            markers = {}
+            if tagged:
+                def marker(n):
+                    markers[f"_ph{len(markers)}"] = n
+                    return f"(?P<_ph{len(markers) - 1}>)"
+                alts.append(_trie_pattern(tagged, marker))
+            rx = self._compiled[remaining] = (re.compile("|".join(alts)), markers)
+        return rx
+
+    def mask(self, text):
+        """Bitmask of the detectors that match anywhere in ``text``."""
+        if not text: return 0
+        full = (1 << len(self.names)) - 1
+        remaining, pos = full, 0
+        while remaining:
+            rx, markers = self._regex(remaining)
+            m = rx.search(text, pos)
+            if m is None: break
+            bit = 1 << self.names.index(markers.get(m.lastgroup, m.lastgroup))
+            remaining &= ~bit
+            pos = m.start()
+        return full & ~remaining
+
+    def _masks(self, texts):
+        return np.fromiter((self.mask(t) for t in texts), np.uint64, len(texts))
+
+    def scan(self, texts, workers=None, chunk=2048):
+        """Per-row bitmasks (uint64), chunks scanned in parallel."""
+        parts = map_chunks(self._masks, texts, chunk, workers)
+        return np.concatenate(parts) if parts else np.zeros(0, np.uint64)
+
+    def hits(self, masks, name):
+        """Boolean column for one detector."""
+        return (masks >> np.uint64(self.names.index(name)) & np.uint64(1)).astype(bool)
+
+    def totals(self, masks):
+        """``{name: rows hit}``."""
+        return {n: int(self.hits(masks, n).sum()) for n in self.names}
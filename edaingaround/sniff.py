@@ -0,0 +1,204 @@
+"""Classify a data file from its first bytes.
+
+Gzip is recognised by its magic number, not by ``.gz``; the layout comes
+from the first non-whitespace byte: ``[`` is an array document, ``{`` is
+JSONL unless its first line is left open (a pretty-printed or wrapped
+object such as ``{"results": [``) or is the whole file and wraps its
+records under a record-path key (a compact ``{"results": [...]}``). A
+``.jsonl`` / ``.jsonl.gz`` name is taken at its word: those files are
+always JSONL, so a first line cut short cannot turn one into a single bad
+document. Plain files are mapped with ``mmap``; a gzip stream is sniffed
+from a ``peek`` at its read buffer, so no byte is inflated twice, and a
+small wrapper document parsed while sniffing is kept (``document``) rather
+than decoded again. ``Source`` then hands the decoder the matching view. Gzip reads go through a timed block
+reader, so ``inflate_seconds`` says how much of a file's decode time went
+to decompression; a stream that breaks off (cut short or corrupt) just ends
+there, with ``truncated`` set, so every byte before the break is still
+read. ``cuts`` and ``blocks`` split a big JSONL file into
+newline-aligned pieces so the loader can decode one file on several
+workers.
+"""
+import gzip
+import io
+import json
+import mmap
+import re
+import time
+import zlib
+from typing import NamedTuple
+
+from .jsonstream import RECORD_PATHS, parse_path
+
+GZIP_MAGIC = b"\x1f\x8b"
+BOM = b"\xef\xbb\xbf"
+ARRAY, OBJECT, JSONL, EMPTY = "array", "object", "jsonl", "empty"
+_WS = b" \t\r\n"
+# what reading a cut-off or corrupt gzip stream raises
+STREAM_ERRORS = (EOFError, OSError, zlib.error)
+# members that hold the records of a wrapper object ("results" for "results[*]")
+WRAPPER_KEYS = tuple(p[0] for p in map(parse_path, RECORD_PATHS) if len(p) == 2 and p[0] != "*" and p[1] == "*")
+_WRAPPED = re.compile(b"|".join(rb'"%s"\s*:\s*\[' % re.escape(k.encode()) for k in WRAPPER_KEYS) or rb"(?!)")
+
+
+class Sniff(NamedTuple):
+    gzip: bool
+    kind: str
+    bom: bool
+
+
+def _wrapper(line, whole):
+    # a one-line wrapper object, checked by parsing when the head holds all of it: the parsed object,
+    # True for a match on the prefix alone, or None
+    if not whole: return _WRAPPED.search(line) is not None or None
+    try:
+        obj = json.loads(line)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) and any(isinstance(obj.get(k), list) for k in WRAPPER_KEYS) else None
+
+
+def _classify(head, eof):
+    # (kind, bom, the whole document when sniffing had to parse it)
+    bom = head.startswith(BOM)
+    body = head[3:] if bom else head
+    body = body.lstrip(_WS)
+    if not body: return EMPTY, bom, None
+    if body[:1] == b"[": return ARRAY, bom, None
+    if body[:1] != b"{": return JSONL, bom, None
+    nl = body.find(b"\n")
+    if nl < 0:
+        doc = _wrapper(body, eof)
+        return (OBJECT if doc else JSONL), bom, (doc if isinstance(doc, dict) else None)
+    first = body[:nl].rstrip(_WS)
+    if first.endswith((b"{", b"[", b",", b":")): return OBJECT, bom, None
+    doc = _wrapper(first, True) if eof and not body[nl:].strip(_WS) else None
+    return (OBJECT if doc else JSONL), bom, doc
+
+
+def classify(head, eof=False):
+    """``(kind, bom)`` for the first bytes of a decompressed stream (``eof``: ``head`` is all of it)."""
+    return _classify(head, eof)[:2]
+
+
+def is_jsonl_name(fp):
+    """True for ``*.jsonl`` and ``*.jsonl.gz``."""
+    name = str(fp).lower()
+    return name.endswith((".jsonl", ".jsonl.gz"))
+
+
+class _TimedReader(io.RawIOBase):
+    # raw reader over a gzip stream, one clock pair per block rather than per line; a broken
+    # stream reads as its end, and the error is kept in ``broken``
+    def __init__(self, f):
+        self.f = f; self.seconds = 0.0; self.broken = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.broken is not None: return 0
+        t0 = time.perf_counter()
+        try:
+            n = self.f.readinto(b)
+        except STREAM_ERRORS as e:
+            self.broken = e; n = 0
+        self.seconds += time.perf_counter() - t0
+        return n
+
+
+class Source:
+    """An opened data file: ``info`` plus byte lines or a text stream for the decoder.
+
+    ``document`` is the whole file, already decoded, when sniffing had to
+    parse it (a one-line wrapper object in the first ``head_size`` bytes);
+    ``head`` is the bytes it came from.
+    """
+
+    def __init__(self, fp, head_size=4096):
+        self.path = fp
+        self._f = open(fp, "rb")
+        self._mm = self._gz = self._inflated = self._timed = self._text = None
+        magic = self._f.read(2); self._f.seek(0)
+        if magic == GZIP_MAGIC:
+            self._gz = gzip.GzipFile(fileobj=self._f)
+            self._timed = _TimedReader(self._gz)
+            self._inflated = io.BufferedReader(self._timed, max(head_size, io.DEFAULT_BUFFER_SIZE))
+            # one raw read fills the buffer; the decoder starts from the same bytes
+            head = self._inflated.peek(head_size)[:head_size]
+            self.info = self._sniff(True, head, len(head) < head_size)
+        else:
+            size = self._f.seek(0, 2); self._f.seek(0)
+            if size:
+                self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            head = self._mm[:head_size] if self._mm is not None else b""
+            self.info = self._sniff(False, head, size <= head_size)
+
+    def _sniff(self, gz, head, eof):
+        kind, bom, doc = _classify(head, eof)
+        if kind != EMPTY and is_jsonl_name(self.path): kind, doc = JSONL, None
+        self.head, self.document = head, doc
+        return Sniff(gz, kind, bom)
+
+    def lines(self):
+        """Byte lines (newline kept), BOM and all, straight off the map or the gzip stream."""
+        if self._mm is not None:
+            return iter(self._mm.readline, b"")
+        return iter(self._inflated) if self._gz is not None else iter(())
+
+    def text(self):
+        """A UTF-8 text stream past any BOM, for the document decoder."""
+        raw = self._inflated if self._gz is not None else self._f
+        if self.info.bom: raw.read(len(BOM))
+        self._text = io.TextIOWrapper(raw, encoding="utf-8", errors="ignore")
+        return self._text
+
+    def cuts(self, size):
+        """Offsets ``[0, ..., file size]`` splitting a plain file just after a newline every ~``size`` bytes."""
+        end = len(self._mm) if self._mm is not None else 0
+        cuts = [0]
+        while end - cuts[-1] > size:
+            nl = self._mm.find(b"\n", cuts[-1] + size - 1)
+            if nl < 0 or nl + 1 >= end: break
+            cuts.append(nl + 1)
+        return cuts + [end]
+
+    def blocks(self, size):
+        """Yield ``(data, offset)`` off a gzip stream: ~``size`` inflated bytes of whole lines, compressed offset reached."""
+        carry = b""
+        while True:
+            block = self._inflated.read(size)
+            if not block: break
+            cut = block.rfind(b"\n") + 1
+            if not cut:
+                carry += block; continue
+            yield carry + memoryview(block)[:cut], self._f.tell()
+            carry = block[cut:]
+        if carry: yield carry, self._f.tell()
+
+    @property
+    def truncated(self):
+        """True once reading found the gzip stream cut short or corrupt."""
+        return self._timed is not None and self._timed.broken is not None
+
+    @property
+    def inflate_seconds(self):
+        """Seconds spent decompressing so far (0 for plain files)."""
+        return self._timed.seconds if self._timed is not None else 0.0
+
+    def close(self):
+        if self._text is not None: self._text.close()
+        if self._mm is not None: self._mm.close()
+        if self._gz is not None: self._inflated.close(); self._gz.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sniff(fp):
+    """``Sniff(gzip, kind, bom)`` for ``fp``."""
+    with Source(fp) as src:
+        return src.info
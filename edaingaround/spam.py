@@ -0,0 +1,97 @@
+"""Repetition-spam scores for whole text columns at once.
+
+``is_spam_batch`` makes exactly the decisions of ``is_spam`` in
+``mixed_chat/practice_dedup.py`` (too short or under 5 words: not spam;
+unique-word ratio < 0.3 or distinct-bigram ratio < 0.4: spam), but each
+text is only split; words are interned to integer ids once per batch and
+the distinct word / bigram counts per document come from one sort of packed
+int64 keys over the whole batch. Splitting and interning are most of the
+cost, so large columns are cut into chunks scored on a process pool.
+``repetition_scores`` also gives each text's longest run of one word
+(``max_run``: mixed_chat's ``spam_count`` is texts with a run of 11 or
+more) and, on request, a zlib compression ratio; neither is part of the
+``is_spam`` decision. ``score_batch`` is ``repetition_scores`` chunked over
+the pool, and ``spam_flags`` makes the decision from its scores.
+"""
+import zlib
+from itertools import chain
+
+import numpy as np
+
+from .loader import map_chunks
+
+MIN_CHARS = 20
+MIN_WORDS = 5
+UNIQUE_RATIO = 0.3
+BIGRAM_RATIO = 0.4
+
+
+def _distinct_per_doc(key, v, n_docs):
+    # distinct values of ``key`` = doc * v + value, counted per doc
+    if not len(key): return np.zeros(n_docs, np.int64)
+    k = np.sort(key)
+    new = np.ones(len(k), bool); new[1:] = k[1:] != k[:-1]
+    return np.bincount(k[new] // v, minlength=n_docs)
+
+
+def repetition_scores(texts, compression=False):
+    """Per-text arrays: ``chars``, ``words``, ``unique_ratio``, ``bigram_ratio``, ``max_run`` (and ``zlib_ratio``).
+
+    Ratios are NaN where undefined (no words / no bigrams); ``max_run`` is 0
+    for a text without words.
+    """
+    texts = ["" if t is None else t for t in texts]
+    n = len(texts)
+    words = [t.lower().split() for t in texts]
+    lens = np.fromiter(map(len, words), np.int64, n)
+    flat = list(chain.from_iterable(words))
+    vocab = {w: i for i, w in enumerate(dict.fromkeys(flat))}
+    ids = np.fromiter(map(vocab.__getitem__, flat), np.int64, len(flat))
+    doc = np.repeat(np.arange(n), lens)
+    v = max(len(vocab), 1)
+    uniq = _distinct_per_doc(doc * v + ids, v, n)
+    pair = doc[1:] == doc[:-1]  # bigram i spans words i, i+1 of the same doc
+    bdoc = doc[:-1][pair]
+    bigram = ids[:-1][pair] * v + ids[1:][pair]
+    if v * v * max(n, 1) >= 2 ** 63:  # intern the bigrams first so doc * id stays in int64
+        bigram = np.unique(bigram, return_inverse=True)[1].ravel()
+        v = max(int(bigram.max()) + 1, 1) if len(bigram) else 1
+    else:
+        v = v * v
+    big = _distinct_per_doc(bdoc * v + bigram, v, n)
+    # runs of one word: a new run starts wherever the id or the doc changes
+    starts = np.flatnonzero(np.concatenate([[True], (ids[1:] != ids[:-1]) | ~pair])) if len(ids) else ids
+    runs = np.diff(np.append(starts, len(ids)))
+    max_run = np.zeros(n, np.int64)
+    np.maximum.at(max_run, doc[starts], runs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {"chars": np.fromiter(map(len, texts), np.int64, n), "words": lens,
+               "unique_ratio": np.where(lens > 0, uniq / lens, np.nan),
+               "bigram_ratio": np.where(lens > 1, big / (lens - 1), np.nan), "max_run": max_run}
+    if compression:
+        raw = [t.encode("utf-8", "surrogatepass") for t in texts]
+        out["zlib_ratio"] = np.fromiter((len(zlib.compress(b)) / len(b) if b else np.nan for b in raw), np.float64, n)
+    return out
+
+
+def spam_flags(s):
+    """``is_spam`` per text from ``repetition_scores`` output."""
+    eligible = (s["chars"] >= MIN_CHARS) & (s["words"] >= MIN_WORDS)
+    return eligible & ((s["unique_ratio"] < UNIQUE_RATIO) | (s["bigram_ratio"] < BIGRAM_RATIO))
+
+
+def _flags(texts):
+    return spam_flags(repetition_scores(texts))
+
+
+def score_batch(texts, workers=None, chunk=50_000):
+    """``repetition_scores`` of a whole column, chunks scored in parallel."""
+    parts = map_chunks(repetition_scores, texts, chunk, workers)
+    if not parts: return repetition_scores([])
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def is_spam_batch(texts, workers=None, chunk=50_000):
+    """Boolean spam flag per text, identical to ``practice_dedup.is_spam``; chunks run in parallel."""
+    parts = map_chunks(_flags, texts, chunk, workers)
+    return np.concatenate(parts) if parts else np.zeros(0, bool)
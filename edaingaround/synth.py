@@ -0,0 +1,443 @@
+"""Seeded synthetic pack corpora of any size, with the answers.json to match.
+
+``generate(kind, out, files, rows, seed)`` writes a pack-shaped tree and the
+answers its solutions.py should reproduce. Kinds: ``chat`` (mixed_chat:
+nested ``messages`` and flat prompt/response records, exact duplicates,
+AI-ish boilerplate, PII, repetition spam), ``instructions`` (instructions:
+categorised, rated instruction/response pairs with reused responses, empty
+high-rated responses and a long tail of long ones), ``code`` (code_mini:
+py / cpp / js snippets from a few templates, some unparsable, risky or
+with lines over 200 characters), ``anomaly`` (pack_anomaly_surge: JSONL
+lines with BOMs, raw control bytes, truncations and malformed JSON,
+ratings in mixed types) and ``schema`` (pack_schema_zoo: five record
+shapes, ``meta`` tags as a dict or as a ``k``/``v`` list, reused ids). The
+first three are the PACKS_SUMMARY.json mix; the rates follow those packs.
+
+Shards are JSON arrays, JSONL and pretty-printed ``{"results": [...]}``
+documents (in each kind's own proportions), some gzipped. File ``i`` is generated from its own
+``random.Random(f"{seed}:{kind}:{i}")`` stream (duplicates come from a pool
+whose items are seeded by index) and is written straight to disk by a pool
+worker, record by record, so the output is byte-identical for any worker
+count. Each worker folds its files' tallies (counts, pool ids used, a
+histogram of text lengths) into one, and those are merged in file order as
+they arrive, so memory does not grow with the row count (only with the
+duplicate pools). The answers come from the tallies by construction, not
+by reading the corpus back.
+Token answers are left out: they depend on the tokenizer.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .loader import imap_chunks
+from .profile import SchemaProfile
+from .scan import AIISH_PHRASES
+from .sniff import BOM
+from .tolerant import ERROR_KINDS
+
+WORDS = ("the quick brown fox jumps over lazy dog please help explain how to configure install linux "
+         "windows ubuntu data api function example guide step use thanks").split()
+GREEK = "alpha beta gamma delta epsilon zeta eta theta iota kappa".split()
+ZOO_WORDS = "reward policy agent config env obs action step reset done info buffer grad loss kl".split()
+TAGS = ("ppo training privacy docker kubernetes token rlhf dpo gpu eval safety latency "
+        "tokenizer dataset infra").split()
+SOURCES = ("web_forum", "support_tickets", "synthetic_assistant", "kb_import")
+ZOO_SOURCES = ("partner_feed", "legacy_csv_ingest", "helpdesk_export", "crawler")
+SPAM_WORDS = ("buy", "free", "click", "winner", "cheap")
+EPOCH = datetime(2024, 1, 1)
+_CONTROLS = bytes(c for c in range(1, 32) if c not in (9, 10, 13))
+PREFIX = {"chat": "chat", "instructions": "instr", "code": "code", "anomaly": "an", "schema": "schema"}
+# (jsonl, array) shares of the shards; the rest are {"results": [...]} documents
+LAYOUTS = {"chat": (0.5, 0.3), "instructions": (0.72, 0.28), "code": (0.72, 0.28), "anomaly": (0.85, 0.1),
+           "schema": (0.5, 0.3)}
+
+
+def _marker(n, kind):
+    # a digit-free word unique to ``n``, so no detector can fire on it
+    s = ""
+    while True:
+        n, r = divmod(n, 26); s += chr(97 + r)
+        if not n: return f"#{kind}{s}"
+
+
+def _words(rng, vocab, lo, hi):
+    return " ".join(rng.choices(vocab, k=rng.randint(lo, hi)))
+
+
+def _ts(rng):
+    return (EPOCH + timedelta(minutes=rng.randrange(366 * 24 * 60))).isoformat()
+
+
+def _pair_hash(prompt, response):
+    return hashlib.blake2b(f"{prompt}\n{response}".encode(), digest_size=16).hexdigest()
+
+
+# ---- chat ------------------------------------------------------------------------------------------------
+
+CHAT_RATES = {"email": 0.015, "phone": 0.017, "aiish": 0.027, "spam": 0.01}
+
+
+def _chat_content(rng, marker):
+    """(body fields, detector flags) for one conversation."""
+    user = _words(rng, WORDS, 4, 14); assistant = _words(rng, WORDS, 20, 120)
+    flags = {k: rng.random() < p for k, p in CHAT_RATES.items()}
+    if flags["aiish"]: assistant = rng.choice(AIISH_PHRASES).capitalize() + ", " + assistant
+    if flags["email"]: assistant += f" contact {rng.choice(WORDS)}.{rng.choice(WORDS)}@example.com"
+    if flags["phone"]: assistant += f" call +1 {rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}"
+    if flags["spam"]: assistant += " " + " ".join([rng.choice(SPAM_WORDS)] * rng.randint(11, 20))
+    if rng.random() < 0.55:
+        body = {"messages": [{"role": "system", "content": "You are a helpful assistant."},
+                             {"role": "user", "content": f"{user} {marker}"},
+                             {"role": "assistant", "content": assistant}]}
+    else:
+        body = {"prompt": user, "response": f"{assistant} {marker}"}
+    return body, flags
+
+
+def _chat_records(rng, i, start, n, seed, opts, t):
+    pool = max(1, int(opts["total_rows"] * opts["dup_share"] / 2))
+    for r in range(n):
+        src = rng.choice(SOURCES)
+        if rng.random() < opts["dup_share"]:
+            j = rng.randrange(pool)
+            body, flags = _chat_content(random.Random(f"{seed}:pool:{j}"), _marker(j, "p"))
+            t["pool"].add(j); t["pool_src"].add((j, src))
+        else:
+            body, flags = _chat_content(rng, _marker(start + r, "u"))
+            t["unique"][src] += 1
+        t["rows"] += 1; t["sources"][src] += 1
+        for k, hit in flags.items(): t[k] += hit
+        yield {"id": f"c{i}_{r}", "source": src, "lang": rng.choice(("en", "es", "fr")), **body,
+               "timestamp": _ts(rng), "rating": rng.randint(1, 5)}
+
+
+def _chat_tally():
+    return {"rows": 0, "files": 0, "sources": Counter(), "unique": Counter(), "pool": set(), "pool_src": set(),
+            **dict.fromkeys(CHAT_RATES, 0)}
+
+
+def _chat_answers(t):
+    rows = t["rows"]
+    distinct = sum(t["unique"].values()) + len(t["pool"])
+    per_src = Counter(s for _, s in t["pool_src"])
+    by_source = {s: round((n - t["unique"][s] - per_src[s]) / n, 4) for s, n in t["sources"].items()}
+    return {"pack": "mixed_chat", "rows": rows, "files": t["files"],
+            "exact_dup_rate": round((rows - distinct) / rows, 4) if rows else 0.0,
+            "dup_rate_by_source": by_source,
+            "pii_email_count": t["email"], "pii_phone_count": t["phone"],
+            "aiish_count": t["aiish"], "spam_count": t["spam"],
+            "source_file_counts": dict(t["sources"])}
+
+
+# ---- instructions ----------------------------------------------------------------------------------------
+
+INSTR_SOURCES = ("synth_prompted", "curated", "wiki_how")
+CATEGORIES = ("writing", "math", "coding", "science", "health", "finance", "history", "misc")
+RATING_WEIGHTS = (0.18, 0.18, 0.18, 0.18, 0.28)  # ratings 1..5
+# responses reused under another instruction; empty responses (label noise, rated 4 or 5); long answers
+INSTR_RATES = {"reuse": 0.13, "empty": 0.0144, "long": 0.03, "long_low": 0.05}
+
+
+def _response(rng):
+    # a few hundred characters, with a long tail that leans towards rating 1
+    rating = rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+    long = rng.random() < INSTR_RATES["long_low" if rating == 1 else "long"]
+    return _words(rng, WORDS, 300, 1200) if long else _words(rng, WORDS, 30, 160), rating
+
+
+def _instruction_records(rng, i, start, n, seed, opts, t):
+    pool = max(1, int(opts["total_rows"] * INSTR_RATES["reuse"] / 2))
+    for r in range(n):
+        instruction = f"{_words(rng, WORDS, 11, 13)} {_marker(start + r, 'u')}"
+        if rng.random() < INSTR_RATES["empty"]:
+            response, rating = "", rng.choices((4, 5), (0.14, 0.86))[0]
+            t["empty_high"] += 1
+        elif rng.random() < INSTR_RATES["reuse"]:
+            response, rating = _response(random.Random(f"{seed}:pool:{rng.randrange(pool)}"))
+        else:
+            response, rating = _response(rng)
+        category = rng.choice(CATEGORIES)
+        t["rows"] += 1; t["categories"][category] += 1
+        t["rated"][rating] += 1; t["length"][rating] += len(response)
+        # every instruction carries its own marker, so no (instruction, response) pair repeats
+        yield {"id": f"i{i}_{r}", "source": rng.choice(INSTR_SOURCES), "category": category,
+               "instruction": instruction, "response": response, "rating": rating,
+               "_pair_hash": _pair_hash(instruction, response)}
+
+
+def _instruction_tally():
+    return {"rows": 0, "files": 0, "categories": Counter(), "rated": Counter(), "length": Counter(), "empty_high": 0}
+
+
+def _instruction_answers(t):
+    return {"pack": "instructions", "rows": t["rows"], "exact_dup_rate": 0.0,
+            "category_counts": {c: t["categories"][c] for c in CATEGORIES if t["categories"][c]},
+            "avg_response_length_by_rating": {str(k): round(t["length"][k] / t["rated"][k], 2)
+                                              for k in range(1, 6) if t["rated"][k]},
+            "empty_high_rating_count": t["empty_high"]}
+
+
+# ---- code ------------------------------------------------------------------------------------------------
+
+CODE_SOURCES = ("github_snippet", "synthetic_codegen", "doc_example")
+RISKY = ("eval(", "exec(", "open(")
+# (lang, share, template, parses); "{}" is filled with a run of one letter so the line passes 200 characters
+SNIPPETS = (
+    ("py", 0.470, "def add(a,b):\n    return a + b\n", True),
+    ("py", 0.064, "x={}", True),
+    ("py", 0.051, "def broken(:\n    return 1\n", False),
+    ("py", 0.030, "def run(x):\n    return eval(str(x))\n", True),
+    ("cpp", 0.182, "int add(int a,int b){{return a+b;}}", None),
+    ("cpp", 0.026, "int x=0; // {}", None),
+    ("js", 0.138, "function add(a,b){{return a+b;}}", None),
+    ("js", 0.019, "eval('2+2');function add(a,b){{return a+b;}}", None),
+    ("js", 0.020, "x={}", None),
+)
+
+
+def _code_records(rng, i, start, n, seed, opts, t):
+    weights = [w for _, w, _, _ in SNIPPETS]
+    for r in range(n):
+        lang, _, template, parses = rng.choices(SNIPPETS, weights)[0]
+        code = template.format("abc"[("py", "js", "cpp").index(lang)] * rng.randint(255, 290))
+        prompt = f"{_words(rng, WORDS, 6, 9)} {_marker(start + r, 'u')}"
+        t["rows"] += 1
+        if parses is not None: t["py"] += 1; t["py_parsed"] += parses
+        t["risky"] += any(p in code for p in RISKY)
+        t["long_line"] += any(len(line) > 200 for line in code.splitlines())
+        yield {"id": f"code_{i}_{r}", "source": rng.choice(CODE_SOURCES), "lang": lang, "prompt": prompt,
+               "response": code, "_pair_hash": _pair_hash(prompt, code)}
+
+
+def _code_tally():
+    return {"rows": 0, "files": 0, "py": 0, "py_parsed": 0, "risky": 0, "long_line": 0}
+
+
+def _code_answers(t):
+    # every prompt carries its own marker, so no (prompt, response) pair repeats
+    return {"pack": "code_mini", "rows": t["rows"], "exact_dup_rate": 0.0,
+            "py_parse_rate": round(t["py_parsed"] / max(1, t["py"]), 4),
+            "eval_exec_open_count": t["risky"], "longline_over_200_count": t["long_line"]}
+
+
+# ---- anomaly ---------------------------------------------------------------------------------------------
+
+ANOMALY_RATES = (("bom", 0.04), ("control_char", 0.015), ("truncated", 0.05), ("jsonerror", 0.05))
+
+
+def _rating(rng):
+    # (value as written, the 1..5 int a tolerant reader recovers or None)
+    x = rng.random(); k = rng.randint(1, 5)
+    if x < 0.70: return k, k
+    if x < 0.80: return str(k), k
+    if x < 0.85: return float(k), k
+    if x < 0.90: return rng.choice((0, 6, 9)), None
+    if x < 0.95: return rng.choice(("n/a", "", "five")), None
+    return None, None
+
+
+def _anomaly_records(rng, i, start, n, seed, opts, t):
+    for r in range(n):
+        text = ("", "   ")[rng.random() < 0.5] if rng.random() < 0.01 else \
+            _words(rng, GREEK, 1, min(int(rng.paretovariate(1.2) * 12), 1500))
+        rating, valid = _rating(rng)
+        yield {"id": f"a{i}_{r}", "text": text, "rating": rating, "timestamp": _ts(rng)}, text, valid
+
+
+def _anomaly_lines(rng, records, jsonl, t):
+    # renders records, breaking some JSONL lines; tallies what a tolerant reader will see
+    for rec, text, valid in records:
+        line = json.dumps(rec).encode()
+        kind = None
+        if jsonl:
+            x = rng.random()
+            for name, p in ANOMALY_RATES:
+                if x < p: kind = name; break
+                x -= p
+        if kind is not None: t["errors"][kind] += 1
+        if kind in ("truncated", "jsonerror"):
+            at = line.index(b'"text": "') + 9
+            line = line[:at + rng.randint(0, len(text))] if kind == "truncated" else line[:-1] + b",}"
+            yield line
+            continue
+        if kind == "bom": line = BOM + line
+        elif kind == "control_char":
+            at = line.index(b'"text": "') + 9 + rng.randint(0, len(text))
+            line = line[:at] + bytes([rng.choice(_CONTROLS)]) + line[at:]
+        t["rows"] += 1
+        t["lengths"][len(text)] += 1
+        t["empty"] += not text.strip()
+        if valid is not None: t["ratings"][valid] += 1
+        yield line
+
+
+def _anomaly_tally():
+    # lengths: {text length: rows}
+    return {"rows": 0, "files": 0, "errors": Counter(), "ratings": Counter(), "lengths": Counter(), "empty": 0}
+
+
+def _nearest_rank(hist, rank):
+    # the ``rank``-th smallest (0-based) value of a {value: count} histogram
+    seen = 0
+    for v in sorted(hist):
+        seen += hist[v]
+        if seen > rank: return v
+
+
+def _anomaly_answers(t):
+    rank = int(0.95 * t["rows"]) - 1
+    return {"pack": "anomaly_surge", "rows_parsed": t["rows"],
+            "error_counts": {k: t["errors"][k] for k in ERROR_KINDS},
+            "rating_hist": {str(k): t["ratings"][k] for k in range(1, 6)},
+            "p95_text_length": _nearest_rank(t["lengths"], rank) if rank >= 0 else 0,
+            "empty_text_count": t["empty"]}
+
+
+# ---- schema ----------------------------------------------------------------------------------------------
+
+TAG_WEIGHTS = [1 / (k + 1) ** 0.7 for k in range(len(TAGS))]
+
+
+def _tags(rng):
+    return list(dict.fromkeys(rng.choices(TAGS, TAG_WEIGHTS, k=rng.randint(1, 4))))
+
+
+def _schema_records(rng, i, start, n, seed, opts, t):
+    pool = max(1, int(opts["total_rows"] * opts["id_reuse"] / 2))
+    for r in range(n):
+        if rng.random() < opts["id_reuse"]:
+            j = rng.randrange(pool); rid = f"r_dup{j}"; t["pool"][j] += 1
+        else:
+            rid = f"r{i}_{r}"; t["own_ids"] += 1
+        rec = {"id": rid, "source": rng.choice(ZOO_SOURCES), "timestamp": _ts(rng)}
+        mark = _marker(start + r, "u"); shape = rng.random(); tags = []
+        if shape < 0.21:
+            tags = _tags(rng)
+            rec["title"] = f"{_words(rng, ZOO_WORDS, 3, 7)} {mark}"
+            rec["meta"] = [{"k": "tag", "v": tg} for tg in tags] + [{"k": "owner", "v": rng.choice(ZOO_SOURCES)}]
+        elif shape < 0.41:
+            rec["title"] = _words(rng, ZOO_WORDS, 3, 7)
+            rec["text"] = f"{_words(rng, ZOO_WORDS, 10, 60)} {mark}"
+        elif shape < 0.61:
+            rec["docs"] = [{"t": "H1", "v": f"{_words(rng, ZOO_WORDS, 3, 6)} {mark}"}] + \
+                          [{"t": "P", "v": _words(rng, TAGS, 5, 12)} for _ in range(rng.randint(1, 4))]
+        elif shape < 0.80:
+            tags = _tags(rng)
+            rec["content"] = {"header": _words(rng, ZOO_WORDS, 3, 5), "body": f"{_words(rng, ZOO_WORDS, 20, 80)} {mark}"}
+            rec["meta"] = {"tags": tags, "lang": rng.choice(("en", "de"))}
+        else:
+            rec["text"] = f"{_words(rng, ZOO_WORDS, 10, 60)} {mark}"
+        t["rows"] += 1; t["tags"].update(tags); t["profile"].update(rec)
+        yield rec
+
+
+def _schema_tally():
+    return {"rows": 0, "files": 0, "pool": Counter(), "own_ids": 0, "tags": Counter(), "profile": SchemaProfile()}
+
+
+def _schema_answers(t):
+    return {"pack": "schema_zoo", "rows": t["rows"],
+            "unique_ids": t["own_ids"] + len(t["pool"]),
+            "id_collision_count": sum(c > 1 for c in t["pool"].values()),
+            "top_tag_counts": dict(t["tags"].most_common(5)),
+            "keys_present_top10": t["profile"].top_present(10),
+            "keys_multi_type_count": len(t["profile"].multi_type())}
+
+
+KINDS = {
+    "chat": (_chat_records, _chat_tally, _chat_answers),
+    "instructions": (_instruction_records, _instruction_tally, _instruction_answers),
+    "code": (_code_records, _code_tally, _code_answers),
+    "anomaly": (_anomaly_records, _anomaly_tally, _anomaly_answers),
+    "schema": (_schema_records, _schema_tally, _schema_answers),
+}
+
+
+# ---- files -----------------------------------------------------------------------------------------------
+
+def _open(path, gz):
+    if not gz: return open(path, "wb")
+    return gzip.GzipFile(path, "wb", mtime=0)  # fixed header: same bytes on every run
+
+
+def _write_file(kind, out, i, start, n, seed, opts, width):
+    rng = random.Random(f"{seed}:{kind}:{i}")
+    records_fn, tally, _ = KINDS[kind]
+    t = tally()
+    t["files"] = int(n > 0)
+    x = rng.random(); jsonl, array_ = LAYOUTS[kind]
+    layout = "jsonl" if x < jsonl else "array" if x < jsonl + array_ else "results"
+    gz = rng.random() < 0.05
+    ext = ".jsonl" if layout == "jsonl" else ".json"
+    path = Path(out) / f"{PREFIX[kind]}_{i:0{width}d}{ext}{'.gz' if gz else ''}"
+    records = records_fn(rng, i, start, n, seed, opts, t)
+    if kind == "anomaly": lines = _anomaly_lines(rng, records, layout == "jsonl", t)
+    else: lines = (json.dumps(rec).encode() for rec in records)
+    with _open(path, gz) as f:
+        if layout == "jsonl":
+            for line in lines: f.write(line + b"\n")
+        elif layout == "array":
+            f.write(b"[")
+            for k, line in enumerate(lines): f.write((b", " if k else b"") + line)
+            f.write(b"]")
+        else:
+            f.write(b'{\n  "results": [\n')
+            for k, line in enumerate(lines): f.write((b",\n    " if k else b"    ") + line)
+            f.write(b"\n  ]\n}\n")
+    return t
+
+
+def _write_batch(jobs):
+    # one tally for the batch, so only that crosses back to the parent
+    total = KINDS[jobs[0][0]][1]()
+    for job in jobs: _merge(total, _write_file(*job))
+    return total
+
+
+def _merge(into, part):
+    for k, v in part.items():
+        if isinstance(v, set): into[k] |= v
+        elif isinstance(v, Counter): into[k].update(v)
+        elif isinstance(v, SchemaProfile): into[k].merge(v)
+        else: into[k] += v
+    return into
+
+
+def generate(kind, out, files=1000, rows=3000, seed=0, workers=None, chunk_files=16, dup_share=0.08,
+             id_reuse=0.04):
+    """Write ``files`` shards holding ``rows`` records of ``kind`` under ``out``, plus answers.json; returns the answers."""
+    out = Path(out); out.mkdir(parents=True, exist_ok=True)
+    opts = {"total_rows": rows, "dup_share": dup_share, "id_reuse": id_reuse}
+    width = max(4, len(str(files - 1)))
+    jobs, start = [], 0
+    for i in range(files):
+        n = rows // files + (i < rows % files)
+        jobs.append((kind, str(out), i, start, n, seed, opts, width)); start += n
+    _, tally, answers = KINDS[kind]
+    total = tally()
+    for part in imap_chunks(_write_batch, jobs, chunk_files, workers):
+        _merge(total, part)
+    result = answers(total)
+    (out / "answers.json").write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write a seeded synthetic pack and its answers.json.")
+    ap.add_argument("kind", choices=sorted(KINDS))
+    ap.add_argument("out")
+    ap.add_argument("--files", type=int, default=1000)
+    ap.add_argument("--rows", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int)
+    args = ap.parse_args()
+    print(json.dumps(generate(args.kind, args.out, args.files, args.rows, args.seed, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Token counts for whole text columns: deduplicated, cached by digest, threaded.
+
+``TokenCounter.count`` hashes every text to an 8-byte digest, tokenizes each
+distinct text at most once, and only texts whose digest is not already in
+the persistent cache (``<cache_dir>/tokens-<encoding>.npz``). The misses are
+cut into batches and encoded on a thread pool (tiktoken releases the GIL);
+only ``len()`` of each token list is kept. Counts come back as an int64
+array aligned with the input.
+
+When tiktoken is not installed the counter falls back to the notebooks'
+``(len + 3) // 4`` estimate, warns once, and says so in ``method``; that
+estimate is cheap and is never cached. Any other tiktoken failure (the
+encoding file cannot be fetched, an unknown encoding) is raised.
+``token_fields`` keeps the estimate out of the ``TOKEN_KEYS`` result keys,
+so it cannot pass for a tokenizer count.
+"""
+import hashlib
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .loader import default_workers
+from .quantiles import ExactQuantiles
+
+CHARS_PER_TOKEN = 4
+TOKEN_KEYS = ("token_total_est", "token_p95_est", "token_top5_share")
+_warned = False
+
+
+def _encoding(name):
+    global _warned
+    try:
+        import tiktoken
+    except ImportError:
+        if not _warned:
+            warnings.warn(f"tiktoken is not installed; token counts are chars/{CHARS_PER_TOKEN} estimates "
+                          "reported under token_estimate", RuntimeWarning, stacklevel=3)
+            _warned = True
+        return None
+    return tiktoken.get_encoding(name)
+
+
+def _digests(texts):
+    return np.frombuffer(b"".join(hashlib.blake2b(t.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+                                  for t in texts), np.uint64)
+
+
+class TokenCounter:
+    """Counts tokens of text batches with ``encoding``; see the module docstring."""
+
+    def __init__(self, encoding="cl100k_base", workers=None, batch_size=512, cache_dir=None):
+        self.enc = _encoding(encoding)
+        self.method = encoding if self.enc is not None else f"chars/{CHARS_PER_TOKEN}"
+        self.workers = workers or default_workers()
+        self.batch_size = batch_size
+        self.cache_path = Path(cache_dir) / f"tokens-{encoding}.npz" if cache_dir else None
+        self.stats = {"texts": 0, "distinct": 0, "cached": 0, "encoded": 0}
+        self._keys = np.zeros(0, np.uint64); self._counts = np.zeros(0, np.int64)
+        if self.enc is not None and self.cache_path and self.cache_path.exists():
+            with np.load(self.cache_path) as z:
+                self._keys, self._counts = z["keys"], z["counts"].astype(np.int64)
+
+    def _encode(self, batch):
+        return [len(toks) for toks in self.enc.encode_ordinary_batch(batch, num_threads=1)]
+
+    def count(self, texts):
+        texts = ["" if t is None else t for t in texts]
+        if self.enc is None:
+            lens = np.fromiter(map(len, texts), np.int64, len(texts))
+            return (lens + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        keys, first, inverse = np.unique(_digests(texts), return_index=True, return_inverse=True)
+        counts = np.full(len(keys), -1, np.int64)
+        if len(self._keys):
+            pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            hit = self._keys[pos] == keys
+            counts[hit] = self._counts[pos[hit]]
+        miss = np.flatnonzero(counts < 0)
+        todo = [texts[i] for i in first[miss]]
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=self.workers) as ex:
+                counts[miss] = np.fromiter((n for part in ex.map(self._encode, batches) for n in part),
+                                           np.int64, len(todo))
+            self._remember(keys[miss], counts[miss])
+        self.stats = {"texts": len(texts), "distinct": len(keys), "cached": len(keys) - len(miss),
+                      "encoded": len(miss)}
+        return counts[inverse.ravel()]
+
+    def _remember(self, keys, counts):
+        allk = np.concatenate([self._keys, keys]); allc = np.concatenate([self._counts, counts])
+        order = np.argsort(allk, kind="stable")
+        self._keys, self._counts = allk[order], allc[order]
+        if self.cache_path is None: return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp.npz")
+        np.savez(tmp, keys=self._keys, counts=self._counts.astype(np.int32))
+        os.replace(tmp, self.cache_path)
+
+
+def token_stats(counts):
+    """``token_total_est``, ``token_p95_est`` and ``token_top5_share`` (tokens in rows at or above p95).
+
+    ``counts`` is an array of per-row counts or a ``quantiles`` summary of
+    them (a ``KLLSketch`` gives the sketch's estimates).
+    """
+    summary = counts if hasattr(counts, "top_mass") else ExactQuantiles().extend(counts)
+    if not summary.n:
+        return {"token_total_est": 0, "token_p95_est": 0, "token_top5_share": 0.0}
+    return {"token_total_est": int(summary.total), "token_p95_est": int(round(summary.quantile(0.95))),
+            "token_top5_share": round(summary.top_mass(0.95), 4)}
+
+
+def token_fields(counter, texts):
+    """``TOKEN_KEYS`` and ``token_estimate`` for ``texts``.
+
+    With a tokenizer the keys hold ``token_stats`` and ``token_estimate`` is
+    None. On the chars/4 fallback the keys are None and ``token_estimate``
+    holds the estimate's stats with its ``method``.
+    """
+    stats = token_stats(counter.count(texts))
+    if counter.enc is not None: return {**stats, "token_estimate": None}
+    return {**dict.fromkeys(TOKEN_KEYS), "token_estimate": {"method": counter.method, **stats}}
@@ -0,0 +1,108 @@
+"""Tolerant decoding with an error taxonomy (truncated / jsonerror / control_char / bom).
+
+Lines are handled as raw bytes: a leading BOM is counted and dropped, C0
+control bytes (other than tab / newline / CR) are deleted with one
+``bytes.translate`` and counted when the length changes, and JSON-escaped
+controls (``\\u0000``..) are counted and stripped from the decoded strings.
+A string that runs into the end of its input is ``truncated``, and so is a
+document whose input ends before its record closes; anything else
+malformed is ``jsonerror``. A JSONL line that stops short of its closing
+brace is a malformed line, not a truncated one. Documents are streamed, so every record before
+a truncation point is kept.
+"""
+import json
+import re
+
+from .jsonstream import RECORD_PATHS, iter_records, records_of
+from .sniff import BOM
+
+ERROR_KINDS = ("truncated", "jsonerror", "control_char", "bom")
+_CTRL = bytes(c for c in range(32) if c not in (9, 10, 13))
+_CTRL_STR = dict.fromkeys(_CTRL)
+_ESCAPED_CTRL = re.compile(rb"\\u00(?:0[0-8bBcCeEfF]|1[0-9a-fA-F])")
+_ESCAPED_CTRL_STR = re.compile(r"\\u00(?:0[0-8bBcCeEfF]|1[0-9a-fA-F])")
+
+
+def _bump(errors, kind):
+    errors[kind] = errors.get(kind, 0) + 1
+
+
+def classify_error(err, document=False):
+    """``"truncated"`` if a string (or, in a ``document``, a record) ran into the end of input, else ``"jsonerror"``."""
+    at_end = err.pos >= len(err.doc.rstrip())
+    # a string cut at a line end stops on the newline, which shows up as a control character
+    if err.msg.startswith("Unterminated string") or at_end and err.msg.startswith("Invalid control character"):
+        return "truncated"
+    return "truncated" if document and at_end else "jsonerror"
+
+
+def scrub(obj):
+    """``obj`` with control characters removed from every string in it."""
+    if isinstance(obj, str): return obj.translate(_CTRL_STR)
+    if isinstance(obj, dict): return {k: scrub(v) for k, v in obj.items()}
+    if isinstance(obj, list): return [scrub(v) for v in obj]
+    return obj
+
+
+def decode_line(line, errors):
+    """Decode one JSONL line (bytes); ``None`` (and a tally in ``errors``) if it is bad."""
+    if line.startswith(BOM):
+        _bump(errors, "bom")
+        line = line[len(BOM):]
+    clean = line.translate(None, _CTRL)
+    escaped = b"\\u00" in clean and _ESCAPED_CTRL.search(clean) is not None
+    if escaped or len(clean) != len(line):
+        _bump(errors, "control_char")
+    try:
+        obj = json.loads(clean)
+    except UnicodeDecodeError:
+        clean = clean.decode("utf-8", "ignore")
+        try:
+            obj = json.loads(clean)
+        except json.JSONDecodeError as e:
+            _bump(errors, classify_error(e)); return None
+    except json.JSONDecodeError as e:
+        _bump(errors, classify_error(e)); return None
+    return scrub(obj) if escaped else obj
+
+
+class _CleanText:
+    # text stream filter: deletes raw controls and notes escaped ones, chunk by chunk
+    def __init__(self, f):
+        self.f = f; self.dirty = False; self.tail = ""
+
+    def read(self, n=-1):
+        s = self.f.read(n)
+        t = s.translate(_CTRL_STR)
+        seam = self.tail + t  # an escape may straddle two chunks
+        if len(t) != len(s) or ("\\u00" in seam and _ESCAPED_CTRL_STR.search(seam)):
+            self.dirty = True
+        self.tail = t[-5:]
+        return t
+
+
+def decode_parsed(doc, raw, errors, record_path=RECORD_PATHS):
+    """``decode_document`` for a document ``json.loads`` already decoded from the bytes ``raw``."""
+    # a strict parse has no raw controls to delete; escaped ones are still counted and stripped
+    escaped = b"\\u00" in raw and _ESCAPED_CTRL.search(raw) is not None
+    if escaped: _bump(errors, "control_char")
+    for obj in records_of(doc, record_path):
+        yield scrub(obj) if escaped else obj
+
+
+def decode_document(f, errors, record_path=RECORD_PATHS):
+    """Stream the records of an array / object document from text stream ``f``.
+
+    A malformed record is classified and skipped; any other error ends the
+    document after the records before it. Control characters anywhere in the
+    file count once.
+    """
+    src = _CleanText(f)
+    report = lambda e: _bump(errors, classify_error(e, document=True))
+    try:
+        for obj in iter_records(src, record_path, on_error=report):
+            yield scrub(obj) if src.dirty else obj
+    except json.JSONDecodeError as e:
+        report(e)
+    if src.dirty:
+        _bump(errors, "control_char")
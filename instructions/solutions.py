@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+import pandas as pd
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from edaingaround.cache import PackCache
+from edaingaround.dag import Graph, run_pack
+from edaingaround.dedup import ExactDedup, dup_rates
+from edaingaround.tokens import TOKEN_KEYS, TokenCounter, token_fields
+
+ROOT = Path(__file__).parent
+graph = Graph()
+
+@graph.node
+def batch():
+    # category dictionary-encoded, rating as its string form; cached in .eda_cache/
+    return PackCache(ROOT, "instr_*.json*", extra=("category", "rating")).batch()
+
+@graph.node
+def responses(batch):
+    return batch["response"].tolist()
+
+@graph.node
+def by_rating(batch, responses):
+    # response length (characters) and emptiness against the numeric rating
+    return pd.DataFrame({"rating": pd.to_numeric(batch["rating"].to_pandas(), errors="coerce"),
+                         "length": pd.Series(responses).str.len(), "empty": pd.Series(responses) == ""})
+
+@graph.node
+def counter():
+    # each distinct text encoded once, remembered in .eda_cache/
+    return TokenCounter(cache_dir=ROOT/".eda_cache")
+
+@graph.node
+def tokens(counter, responses):
+    # token length of the response
+    return token_fields(counter, responses)
+
+@graph.metric
+def pack():
+    return "instructions"
+
+@graph.metric
+def rows(batch):
+    return len(batch)
+
+@graph.metric
+def exact_dup_rate(batch, responses):
+    # exact dupes of the (prompt, response) pair
+    dedup = ExactDedup()
+    for pair in zip(batch["prompt"].tolist(), responses): dedup.add(pair)
+    return round(dup_rates(dedup.result())[0], 4)
+
+graph.fields("tokens", TOKEN_KEYS + ("token_estimate",))
+
+@graph.metric
+def category_counts(batch):
+    category = batch["category"]
+    return dict(zip(category.categories.tolist(), category.counts().tolist()))
+
+@graph.metric
+def avg_response_length_by_rating(by_rating):
+    means = by_rating.groupby("rating")["length"].mean()
+    return {str(k): round(float(means[k]), 2) for k in range(1, 6) if k in means.index}
+
+@graph.metric
+def empty_high_rating_count(by_rating):
+    return int((by_rating["empty"] & (by_rating["rating"] >= 4)).sum())
+
+@graph.metric
+def token_method(counter):
+    return counter.method
+
+def main():
+    run_pack(graph, ROOT)
+
+if __name__=="__main__":
+    main()
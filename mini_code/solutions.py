@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+import numpy as np
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from edaingaround.cache import PackCache
+from edaingaround.codescan import LONG_LINE, CodeAnalyzer
+from edaingaround.dag import Graph, run_pack
+from edaingaround.dedup import ExactDedup, dup_rates
+from edaingaround.pyast import shape_clusters, structural_dup_rate
+
+ROOT = Path(__file__).parent
+RISKY = ["eval(", "exec(", "open("]
+graph = Graph()
+
+@graph.node
+def batch():
+    # normalized columns from .eda_cache/; only new or changed shards are decoded
+    return PackCache(ROOT, "code_*.json*", extra=("lang",)).batch()
+
+@graph.node
+def responses(batch):
+    return batch["response"].tolist()
+
+@graph.node
+def analyzer():
+    return CodeAnalyzer(patterns=RISKY, cache_dir=ROOT/".eda_cache")
+
+@graph.node
+def scanned(analyzer, batch, responses):
+    # the code is the response: one scan per distinct snippet, python parsed once (remembered in .eda_cache/)
+    return analyzer.analyze(responses, batch["lang"].tolist())
+
+@graph.metric
+def pack():
+    return "code_mini"
+
+@graph.metric
+def rows(batch):
+    return len(batch)
+
+@graph.metric
+def exact_dup_rate(batch, responses):
+    # exact dupes of the (prompt, response) pair; the responses alone are a handful of templates
+    dedup = ExactDedup()
+    for pair in zip(batch["prompt"].tolist(), responses): dedup.add(pair)
+    return round(dup_rates(dedup.result())[0], 4)
+
+@graph.metric
+def py_parse_rate(scanned):
+    py = scanned[0]["parsed"][scanned[0]["parsed"] >= 0]
+    return round(int((py == 1).sum()) / max(1, len(py)), 4)
+
+@graph.metric
+def eval_exec_open_count(analyzer, scanned):
+    return int(np.logical_or.reduce([analyzer.hits(scanned[0], p) for p in RISKY]).sum())
+
+@graph.metric
+def longline_over_200_count(analyzer, scanned):
+    return int(analyzer.hits(scanned[0], LONG_LINE).sum())
+
+# renamed copies: same structural hash over the parsed snippets / their functions
+@graph.metric(name="structural_dup_rate")
+def shape_dup_rate(scanned):
+    return round(structural_dup_rate([m["shape"] if m else None for m in scanned[1]]), 4)
+
+@graph.metric
+def clone_func_clusters(scanned):
+    return len(shape_clusters([s for m in scanned[1] if m for s in m["func_shapes"]]))
+
+def main():
+    run_pack(graph, ROOT)
+
+if __name__=="__main__":
+    main()
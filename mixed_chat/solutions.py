@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from edaingaround.cache import PackCache
+from edaingaround.dag import Graph, run_pack
+from edaingaround.dedup import DIGEST_KEY, ExactDedup, dup_rates
+from edaingaround.neardup import dup_rate, near_dup_clusters
+from edaingaround.scan import AIISH_PHRASES, PII_EMAIL, PII_PHONE, Scanner
+from edaingaround.spam import score_batch, spam_flags
+from edaingaround.tokens import TOKEN_KEYS, TokenCounter, token_fields
+
+ROOT = Path(__file__).parent
+graph = Graph()
+
+# shared columns, each computed once and only when a requested key needs it
+@graph.node
+def batch():
+    # normalized columns from .eda_cache/; only new or changed shards are decoded
+    return PackCache(ROOT, "chat_*.json*", digest=True).batch()
+
+@graph.node
+def texts(batch):
+    # main text: first user + last assistant turn joined by "\n", or response/prompt
+    return batch["text"].tolist()
+
+@graph.node
+def dedup(batch):
+    # one 8-byte digest per row, hashed from its text_parts (the turns, never joined) in the loader's workers
+    d = ExactDedup(); source = batch["source"]
+    d.add_digests(batch[DIGEST_KEY], source.codes, source.categories.tolist())
+    return dup_rates(d.result())
+
+@graph.node
+def near_dups(texts):
+    # MinHash + banded LSH over 3-word shingles, clusters at estimated Jaccard >= 0.7 (exact copies included)
+    return near_dup_clusters(texts, threshold=0.7)
+
+@graph.node
+def hits(texts):
+    # PII / AI-ish boilerplate: one scan per text, one bit per detector
+    scanner = Scanner({"pii_email": PII_EMAIL, "pii_phone": PII_PHONE, "aiish": AIISH_PHRASES})
+    return scanner.totals(scanner.scan(texts))
+
+@graph.node
+def spam(texts):
+    # repetition scores for the whole column at once: interned word ids, NumPy over the batch
+    return score_batch(texts)
+
+@graph.node
+def counter():
+    # each distinct text encoded once, remembered in .eda_cache/ across runs
+    return TokenCounter(cache_dir=ROOT/".eda_cache")
+
+@graph.node
+def tokens(counter, texts):
+    return token_fields(counter, texts)
+
+# result keys
+@graph.metric
+def pack():
+    return "mixed_chat"
+
+@graph.metric
+def rows(batch):
+    return len(batch)
+
+@graph.metric
+def files(batch):
+    return int((batch.file_rows() > 0).sum())
+
+@graph.metric
+def exact_dup_rate(dedup):
+    return round(dedup[0], 4)
+
+@graph.metric
+def dup_rate_by_source(dedup):
+    return {k: round(v, 4) for k, v in dedup[1].items()}
+
+@graph.metric
+def near_dup_rate(near_dups):
+    return round(dup_rate(near_dups), 4)
+
+@graph.metric
+def source_file_counts(batch):
+    # rows per source, in first-seen order
+    source = batch["source"]
+    return dict(zip(source.categories.tolist(), source.counts().tolist()))
+
+for name in ("pii_email", "pii_phone", "aiish"):
+    graph.metric(lambda hits, name=name: hits[name], name=f"{name}_count")
+
+@graph.metric
+def spam_count(spam):
+    # the same word 11 or more times in a row
+    return int((spam["max_run"] >= 11).sum())
+
+@graph.metric
+def repetition_spam_count(spam):
+    # practice_dedup.is_spam's rule: unique-word ratio < 0.3 or distinct-bigram ratio < 0.4
+    return int(spam_flags(spam).sum())
+graph.fields("tokens", TOKEN_KEYS + ("token_estimate",))
+
+@graph.metric
+def token_method(counter):
+    return counter.method
+
+def main():
+    run_pack(graph, ROOT)
+
+if __name__=="__main__":
+    main()
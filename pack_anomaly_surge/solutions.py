@@ -1,72 +1,81 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import json, gzip
+import sys
 from pathlib import Path
 import pandas as pd
-import plotly.express as px
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from edaingaround.cache import PackCache
+from edaingaround.dag import Graph, run_pack
+from edaingaround.plots import Report, bar, histogram
+from edaingaround.normalize import text_length
+from edaingaround.quantiles import KLLSketch
+from edaingaround.tolerant import ERROR_KINDS
 
-def robust_iter(root):
-    errors = {"truncated":0,"jsonerror":0,"control_char":0,"bom":0}
-    def gen():
-        for fp in Path(root).rglob("*.json*"):
-            if fp.suffix == ".gz":
-                f = gzip.open(fp, "rt", encoding="utf-8", errors="ignore")
-            else:
-                f = open(fp, "r", encoding="utf-8", errors="ignore")
-            head = f.read(2048); f.seek(0)
-            if head.strip().startswith("["):
-                try:
-                    arr = json.load(f)
-                    for o in arr:
-                        yield o
-                except Exception:
-                    errors["jsonerror"] += 1
-            else:
-                for line in f:
-                    if not line.strip(): continue
-                    # count BOM/control char heuristically
-                    if line.startswith("\ufeff"): errors["bom"] += 1
-                    if "\x00" in line: errors["control_char"] += 1
-                    try:
-                        yield json.loads(line.lstrip("\ufeff"))
-                    except json.JSONDecodeError:
-                        # guess truncated vs generic
-                        errors["jsonerror"] += 1
-            f.close()
-    return gen(), errors
+ROOT = Path(__file__).parent
+graph = Graph()
+
+@graph.node
+def cache():
+    # normalized columns come from .eda_cache/; only new or changed shards are decoded. Text lengths
+    # are sketched per file in the load workers (exact up to k rows, then within rank_error(k))
+    return PackCache(ROOT, "an_*.json*", extra=("rating",), observers=(KLLSketch(k=4096, value=text_length),))
+
+@graph.node
+def frame(cache):
+    return cache.to_frame()
+
+@graph.node
+def text(frame):
+    return frame["text"].fillna("")
+
+@graph.node
+def lens(cache, frame):
+    return cache.observed[0]
+
+@graph.node
+def rating_norm(frame):
+    val = pd.to_numeric(frame["rating"], errors="coerce")
+    return val.where(val.between(1, 5) & (val % 1 == 0))
+
+@graph.node
+def report(text, rating_hist):
+    # plots: bin counts only, one report.html sharing plotly.min.js
+    report = Report(ROOT, "Anomaly surge")
+    report.add(histogram(text.str.len().to_numpy(), bins=60, title="Text length", x_title="chars"), "length_hist.html")
+    report.add(bar(rating_hist, title="Rating histogram", x_title="rating"), "rating_bar.html")
+    report.save()
+    return report
+
+@graph.metric
+def rows_parsed(frame):
+    return len(frame)
+
+@graph.metric
+def error_counts(cache, frame):
+    # tallied while the frame is loaded
+    err = dict.fromkeys(ERROR_KINDS, 0)
+    err.update(cache.errors)
+    return {k: int(v) for k, v in err.items()}
+
+@graph.metric
+def rating_hist(rating_norm):
+    return {str(k): int((rating_norm==k).sum()) for k in range(1,6)}
+
+@graph.metric
+def p95_text_length(lens):
+    # nearest rank off the merged sketch
+    return int(lens.value_at(int(0.95*lens.n)-1)) if lens.n else 0
+
+@graph.metric
+def empty_text_count(text):
+    return int((text.str.strip()=="").sum())
+
+@graph.metric
+def required_artifacts(report):
+    return report.artifacts
 
 def main():
-    root = Path(__file__).parent
-    it, err = robust_iter(root)
-    rows = list(it)
-    rows_parsed = len(rows)
-    # normalize
-    for r in rows:
-        r["text"] = str(r.get("text","") or "")
-        try:
-            val = int(r.get("rating", None))
-        except Exception:
-            val = None
-        r["rating_norm"] = val if (val is not None and 1 <= val <= 5) else None
-    import pandas as pd
-    df = pd.DataFrame(rows)
-    empty_text_count = int((df["text"].str.strip()=="").sum())
-    rating_hist = {str(k): int((df["rating_norm"]==k).sum()) for k in range(1,6)}
-    lens = df["text"].str.len().sort_values().tolist()
-    p95 = int(lens[int(0.95*len(lens))-1]) if lens else 0
-    # plots
-    px.histogram(df, x=df["text"].str.len(), nbins=60, title="Text length").write_html(str(root/"length_hist.html"))
-    px.bar(pd.Series(rating_hist).reset_index().rename(columns={"index":"rating",0:"count"}),
-           x="rating", y="count", title="Rating histogram").write_html(str(root/"rating_bar.html"))
-    out = {
-      "rows_parsed": int(rows_parsed),
-      "error_counts": {k:int(v) for k,v in err.items()},
-      "rating_hist": rating_hist,
-      "p95_text_length": int(p95),
-      "empty_text_count": int(empty_text_count)
-    }
-    (root/"result.json").write_text(json.dumps(out, indent=2), encoding="utf-8")
-    print(json.dumps(out, indent=2))
+    run_pack(graph, ROOT)
 
 if __name__=="__main__":
     main()
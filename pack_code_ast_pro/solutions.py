@@ -1,122 +1,108 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import json, gzip, ast
+import sys
+from collections import Counter
 from pathlib import Path
-import pandas as pd
-import plotly.express as px
-
-def iter_records(root):
-    for pat in ("*.json","*.jsonl","*.json.gz","*.jsonl.gz"):
-        for fp in Path(root).rglob(pat):
-            if fp.suffix==".gz":
-                f=gzip.open(fp,"rt",encoding="utf-8",errors="ignore")
-                head=f.read(1024); f.seek(0)
-                if head.strip().startswith("["):
-                    try:
-                        arr=json.load(f)
-                        for o in arr: 
-                            if isinstance(o,dict): yield o
-                    except Exception: pass
-                else:
-                    for line in f:
-                        line=line.strip()
-                        if not line: continue
-                        try:
-                            o=json.loads(line); 
-                            if isinstance(o,dict): yield o
-                        except Exception: pass
-                f.close()
-            else:
-                with open(fp,"r",encoding="utf-8",errors="ignore") as f:
-                    head=f.read(1024); f.seek(0)
-                    if head.strip().startswith("["):
-                        try:
-                            arr=json.load(f)
-                            for o in arr: 
-                                if isinstance(o,dict): yield o
-                        except Exception: pass
-                    else:
-                        for line in f:
-                            line=line.strip()
-                            if not line: continue
-                            try:
-                                o=json.loads(line); 
-                                if isinstance(o,dict): yield o
-                            except Exception: pass
-
-def py_metrics(code:str):
-    try:
-        tree=ast.parse(code)
-    except Exception:
-        return None
-    class C(ast.NodeVisitor):
-        def __init__(self):
-            self.fn=0; self.br=0; self.calls=[]
-        def visit_FunctionDef(self,n):
-            self.fn+=1; self.generic_visit(n)
-        def visit_AsyncFunctionDef(self,n):
-            self.fn+=1; self.generic_visit(n)
-        def visit_If(self,n): self.br+=1; self.generic_visit(n)
-        def visit_For(self,n): self.br+=1; self.generic_visit(n)
-        def visit_While(self,n): self.br+=1; self.generic_visit(n)
-        def visit_Try(self,n): self.br+=1; self.generic_visit(n)
-        def visit_Call(self,n):
-            name=None
-            if isinstance(n.func, ast.Name): name=n.func.id
-            elif isinstance(n.func, ast.Attribute): name=n.func.attr
-            self.calls.append((name or "").lower())
-            self.generic_visit(n)
-    c=C(); c.visit(tree)
-    return {"funcs":c.fn, "branches":c.br, "calls":c.calls}
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from edaingaround.cache import PackCache
+from edaingaround.clike import clike_metrics_batch
+from edaingaround.codescan import LONG_LINE, CodeAnalyzer
+from edaingaround.dag import Graph, run_pack
+from edaingaround.plots import Report, bar, histogram
+from edaingaround.pyast import shape_clusters, structural_dup_rate
+
+ROOT=Path(__file__).parent
+DANGER=["eval","exec","open(","subprocess","pickle.loads","yaml.load("]
+graph=Graph()
+
+@graph.node
+def df():
+    # typed columns, cached in .eda_cache/: the code is the normalized response, lang dictionary-encoded
+    return PackCache(ROOT, "codepro_*.json*", extra=("lang",)).batch().to_pandas()
+
+@graph.node
+def analyzer():
+    return CodeAnalyzer(patterns=DANGER, cache_dir=ROOT/".eda_cache")
+
+@graph.node
+def scanned(analyzer, df):
+    # every code metric in one scan per distinct snippet; python rows also parsed (once, cached)
+    return analyzer.analyze(df["response"], df["lang"])
+
+@graph.node
+def stats(scanned):
+    return scanned[0]
+
+@graph.node
+def metrics(scanned):
+    return scanned[1]
+
+@graph.node
+def counts(analyzer, stats):
+    return analyzer.counts(stats)
+
+@graph.node
+def report(stats, df):
+    report=Report(ROOT, "Code AST pro")
+    cyclo=stats["branches"][stats["parsed"]==1]+1
+    report.add(histogram(cyclo, bins=30, title="Cyclomatic approx (py)", x_title="branches + 1"), "cyclomatic_hist_py.html")
+    report.add(bar(df["lang"].value_counts(), title="Rows by lang", x_title="lang"), "lang_breakdown.html")
+    report.save()
+    return report
+
+@graph.metric
+def rows(df):
+    return int(len(df))
+
+@graph.metric
+def py_parse_rate(stats):
+    total_py=int((stats["parsed"]>=0).sum())
+    return float(round(int((stats["parsed"]==1).sum())/max(1,total_py), 6))
+
+@graph.metric
+def py_total_funcs(stats):
+    return int(stats["funcs"].sum())
+
+@graph.metric
+def py_branch_nodes(stats):
+    return int(stats["branches"].sum())
+
+@graph.metric
+def danger_counts(counts):
+    return {k:int(counts[k]) for k in DANGER}
+
+@graph.metric
+def js_eval_count(df):
+    # eval call sites from the lexer, not "eval(" inside strings or comments
+    js=clike_metrics_batch(df.loc[df["lang"]=="js","response"])
+    return sum("eval" in m["calls"] for m in js)
+
+@graph.metric
+def long_lines_over_200(counts):
+    return int(counts[LONG_LINE])
+
+@graph.metric
+def top_calls(metrics):
+    cc=Counter()
+    for m in metrics:
+        if m: cc.update(m["calls"])
+    return {k:int(v) for k,v in cc.most_common(5)}
+
+# renamed copies: whole snippets and functions with the same structural hash
+@graph.metric(name="structural_dup_rate")
+def shape_dup_rate(metrics):
+    return round(structural_dup_rate([m["shape"] if m else None for m in metrics]), 4)
+
+@graph.metric
+def clone_func_clusters(metrics):
+    return len(shape_clusters([s for m in metrics if m for s in m["func_shapes"]]))
+
+@graph.metric
+def required_artifacts(report):
+    return report.artifacts
 
 def main():
-    root=Path(__file__).parent
-    rows=list(iter_records(root))
-    import pandas as pd
-    df=pd.DataFrame(rows)
-    # danger counts
-    danger=["eval","exec","open(","subprocess","pickle.loads","yaml.load("]
-    danger_counts={k:int(df["code"].fillna("").str.contains(k, regex=False).sum()) for k in danger}
-    # py parse metrics
-    is_py=df["lang"]=="py"
-    py_codes=df.loc[is_py,"code"].fillna("")
-    parsed = [py_metrics(c) for c in py_codes]
-    total_py = len(parsed)
-    parsed_ok = sum(1 for p in parsed if p is not None)
-    py_parse_rate = round(parsed_ok/max(1,total_py), 6)
-    py_funcs = sum(p["funcs"] for p in parsed if p)
-    py_branches = sum(p["branches"] for p in parsed if p)
-    # top calls
-    from collections import Counter
-    cc = Counter()
-    for p in parsed:
-        if not p: continue
-        cc.update(p["calls"])
-    top_calls = dict(cc.most_common(5))
-    # js eval count
-    js_eval = int((df["lang"]=="js") & df["code"].fillna("").str.contains("eval(", regex=False)).sum()
-    # long lines > 200
-    def has_long_line(s):
-        return any(len(line)>200 for line in s.splitlines())
-    long_lines = int(df["code"].fillna("").map(has_long_line).sum())
-    # plots
-    import numpy as np
-    cyclo = [p["branches"]+1 for p in parsed if p]
-    px.histogram(x=cyclo, nbins=30, title="Cyclomatic approx (py)").write_html(str(root/"cyclomatic_hist_py.html"))
-    px.bar(df["lang"].value_counts().reset_index().rename(columns={"index":"lang","lang":"count"}),
-           x="lang", y="count", title="Rows by lang").write_html(str(root/"lang_breakdown.html"))
-    out={
-        "rows": int(len(df)),
-        "py_parse_rate": float(py_parse_rate),
-        "py_total_funcs": int(py_funcs),
-        "py_branch_nodes": int(py_branches),
-        "danger_counts": {k:int(v) for k,v in danger_counts.items()},
-        "js_eval_count": int(js_eval),
-        "long_lines_over_200": int(long_lines),
-        "top_calls": {k:int(v) for k,v in top_calls.items()}
-    }
-    (root/"result.json").write_text(json.dumps(out, indent=2), encoding="utf-8")
-    print(json.dumps(out, indent=2))
+    run_pack(graph, ROOT)
 
 if __name__=="__main__":
     main()
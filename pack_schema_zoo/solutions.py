@@ -1,44 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import json, gzip, glob, os
+import sys
 from pathlib import Path
 import pandas as pd
-import plotly.express as px
-import hashlib
-
-def md5(s): return hashlib.md5(s.encode("utf-8","ignore")).hexdigest()
-
-def iter_json_records(root):
-    exts = ("*.json","*.jsonl","*.json.gz","*.jsonl.gz")
-    for pat in exts:
-        for fp in Path(root).rglob(pat):
-            try:
-                if fp.suffix == ".gz":
-                    import gzip
-                    f = gzip.open(fp, "rt", encoding="utf-8", errors="ignore")
-                    close = True
-                else:
-                    f = open(fp, "r", encoding="utf-8", errors="ignore")
-                    close = True
-                head = f.read(2048); f.seek(0)
-                if head.strip().startswith("["):
-                    arr = json.load(f)
-                    for obj in arr:
-                        if isinstance(obj, dict):
-                            obj["_file"]=fp.name; yield obj
-                else:
-                    for line in f:
-                        line=line.strip()
-                        if not line: continue
-                        try:
-                            obj=json.loads(line)
-                            if isinstance(obj, dict):
-                                obj["_file"]=fp.name; yield obj
-                        except json.JSONDecodeError:
-                            continue
-                if close: f.close()
-            except Exception:
-                continue
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from edaingaround.dag import Graph, run_pack
+from edaingaround.fingerprint import id_collisions
+from edaingaround.loader import load_batch
+from edaingaround.plots import Report, bar
+from edaingaround.profile import SchemaProfile
+
+ROOT = Path(__file__).parent
+graph = Graph()
 
 def flatten_tags(obj):
     tags = []
@@ -52,49 +25,82 @@ def flatten_tags(obj):
                 tags.append(kv["v"])
     return tags
 
+class TagCounts:
+    """Tag counts in first-seen order; an observer, so the nested records stay in the workers."""
+    def __init__(self):
+        self.counts = {}
+    def fresh(self):
+        return TagCounts()
+    def update(self, rec):
+        for t in flatten_tags(rec): self.counts[t] = self.counts.get(t, 0) + 1
+    def merge(self, other):
+        for t, n in other.counts.items(): self.counts[t] = self.counts.get(t, 0) + n
+        return self
+
+@graph.node
+def loaded():
+    # typed columns only (id, _fp: canonical payload hash); the schema profile (presence / JSON types
+    # per nested path) and the tag counts are built from the full records in the workers
+    profile, tags = SchemaProfile(), TagCounts()
+    batch = load_batch(ROOT, "schema_*.json*", fingerprint=True, observers=(profile, tags))
+    return batch, profile, tags
+
+@graph.node
+def profile(loaded):
+    return loaded[1]
+
+@graph.node
+def collisions(loaded):
+    batch = loaded[0]
+    return id_collisions(batch["id"].tolist(), batch["_fp"])
+
+@graph.node
+def tag_counts(loaded):
+    return pd.Series(loaded[2].counts, dtype="int64").sort_values(ascending=False, kind="stable").head(10)
+
+@graph.node
+def report(profile, tag_counts):
+    # missingness / presence and tags, one report.html sharing plotly.min.js
+    report = Report(ROOT, "Schema zoo")
+    present = profile.top_present(15)
+    rate = {k: v / max(1, profile.rows) for k, v in present.items()}
+    report.add(bar(rate, title="Top-15 key presence rate", x_title="key", y_title="rate",
+                   hover=("present", present)), "schema_missingness.html")
+    report.add(bar(tag_counts, title="Top tags", x_title="tag"), "top_tags.html")
+    report.save()
+    return report
+
+@graph.metric
+def rows(loaded):
+    return len(loaded[0])
+
+@graph.metric
+def unique_ids(collisions):
+    return int(collisions["unique_ids"])
+
+@graph.metric
+def id_collision_count(collisions):
+    return int(collisions["colliding_ids"])
+
+@graph.metric
+def top_tag_counts(tag_counts):
+    return {k:int(v) for k,v in tag_counts.head(5).items()}
+
+@graph.metric
+def keys_present_top10(profile):
+    return profile.top_present(10)
+
+@graph.metric
+def keys_multi_type_count(profile):
+    # multi-type keys: JSON types over every row and nested path (null aside)
+    return len(profile.multi_type())
+
+@graph.metric
+def required_artifacts(report):
+    return report.artifacts
+
 def main():
-    root = Path(__file__).parent
-    rows = []
-    for rec in iter_json_records(root):
-        rows.append(rec)
-    import pandas as pd
-    df = pd.DataFrame(rows)
-    rows_n = len(df)
-    unique_ids = df["id"].nunique()
-    # id collisions
-    df["_hash"]=df.apply(lambda r: md5(json.dumps({k:r[k] for k in r.index if not str(k).startswith("_")}, sort_keys=True, ensure_ascii=False)), axis=1)
-    colls = df.groupby("id")["_hash"].nunique()
-    id_collision_count = int((colls>1).sum())
-    # missingness / presence
-    pres = df.notna().sum().sort_values(ascending=False).head(15).reset_index()
-    pres.columns=["key","present"]
-    fig1 = px.bar(pres, x="key", y="present", title="Top-15 key presence")
-    fig1.write_html(str(root/"schema_missingness.html"))
-    # tags
-    df["__tags__"]=df.apply(flatten_tags, axis=1)
-    import itertools
-    all_tags = list(itertools.chain.from_iterable(df["__tags__"].tolist()))
-    tag_counts = pd.Series(all_tags).value_counts().head(10)
-    top5 = tag_counts.head(5).to_dict()
-    fig2 = px.bar(tag_counts.reset_index().rename(columns={"index":"tag",0:"count"}), x="tag", y="count", title="Top tags")
-    fig2.write_html(str(root/"top_tags.html"))
-    # multi-type keys (approx: check types on row sample)
-    key_types = {}
-    for _, row in df.head(min(5000, len(df))).iterrows():
-        for k,v in row.items():
-            if str(k).startswith("_"): continue
-            key_types.setdefault(k,set()).add(type(v).__name__)
-    multi = sum(1 for k,s in key_types.items() if len(s)>1)
-    out = {
-        "rows": int(rows_n),
-        "unique_ids": int(unique_ids),
-        "id_collision_count": int(id_collision_count),
-        "top_tag_counts": {k:int(v) for k,v in top5.items()},
-        "keys_present_top10": {k:int(v) for k,v in pres.set_index("key")["present"].to_dict().items()},
-        "keys_multi_type_count": int(multi)
-    }
-    (root/"result.json").write_text(json.dumps(out, indent=2), encoding="utf-8")
-    print(json.dumps(out, indent=2))
+    run_pack(graph, ROOT)
 
 if __name__=="__main__":
     main()
@@ -0,0 +1,55 @@
+import json
+import os
+
+import numpy as np
+
+from edaingaround.cache import PackCache
+from edaingaround.normalize import text_length
+from edaingaround.quantiles import ExactQuantiles, KLLSketch
+
+
+def _write(fp, texts):
+    fp.write_text("".join(json.dumps({"id": t, "text": t}) + "\n" for t in texts), encoding="utf-8")
+
+
+def _cache(root):
+    return PackCache(root, "*.jsonl", observers=(KLLSketch(k=4096, value=text_length),
+                                                 ExactQuantiles(value=text_length)))
+
+
+def _check(cache, root):
+    lens = [len(t) for t in cache.to_frame(workers=1)["text"]]
+    assert sorted(lens) == sorted(len(json.loads(l)["text"]) for fp in sorted(root.glob("*.jsonl"))
+                                  for l in fp.read_text().splitlines())
+    sketch, exact = cache.observed
+    assert sketch.n == exact.n == len(lens)
+    assert np.array_equal(np.sort(exact.values()), np.sort(lens))
+    assert sketch.value_at(int(0.95 * len(lens)) - 1) == np.sort(lens)[int(0.95 * len(lens)) - 1]
+
+
+def test_cold_warm_and_partial(tmp_path):
+    for i in range(4):
+        _write(tmp_path / f"p{i}.jsonl", ["w" * ((i * 37 + k * 11) % 300) for k in range(50)])
+    cache = _cache(tmp_path)
+    _check(cache, tmp_path)
+    assert cache.stats == {"reused": 0, "decoded": 4}
+
+    cache = _cache(tmp_path)
+    _check(cache, tmp_path)
+    assert cache.stats == {"reused": 4, "decoded": 0}
+
+    _write(tmp_path / "p2.jsonl", ["z" * 999] * 5)
+    st = os.stat(tmp_path / "p2.jsonl"); os.utime(tmp_path / "p2.jsonl", ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    (tmp_path / "p3.jsonl").unlink()
+    cache = _cache(tmp_path)
+    _check(cache, tmp_path)
+    assert cache.stats == {"reused": 2, "decoded": 1}
+
+
+def test_touched_file_is_not_decoded(tmp_path):
+    _write(tmp_path / "a.jsonl", ["x", "yy"])
+    _cache(tmp_path).load(workers=1)
+    st = os.stat(tmp_path / "a.jsonl"); os.utime(tmp_path / "a.jsonl", ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    cache = _cache(tmp_path)
+    cache.load(workers=1)
+    assert cache.stats == {"reused": 1, "decoded": 0} and cache.observed[1].n == 2
@@ -0,0 +1,52 @@
+import pytest
+
+from edaingaround.dag import Graph
+
+
+def _graph(calls):
+    g = Graph()
+
+    @g.node
+    def rows():
+        calls.append("rows"); return [1, 2, 3, 4]
+
+    @g.node
+    def doubled(rows):
+        calls.append("doubled"); return [2 * r for r in rows]
+
+    @g.metric
+    def total(rows, doubled, scale=10):
+        calls.append("total"); return (sum(rows) + sum(doubled)) * scale
+
+    @g.metric
+    def count(rows):
+        calls.append("count"); return len(rows)
+
+    @g.node
+    def stats(rows):
+        return {"lo": min(rows), "hi": max(rows)}
+
+    g.fields("stats", ("lo", "hi"))
+    return g
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_runs_each_needed_node_once(workers):
+    calls = []
+    res = _graph(calls).run(workers=workers)
+    assert res == {"total": 300, "count": 4, "lo": 1, "hi": 4}
+    assert sorted(calls) == ["count", "doubled", "rows", "total"]
+
+
+def test_computes_only_ancestors():
+    calls = []
+    assert _graph(calls).run(["count"], workers=1) == {"count": 4}
+    assert calls == ["rows", "count"]
+
+
+def test_plan_errors():
+    g = _graph([])
+    with pytest.raises(KeyError, match="unknown metric 'nope'"): g.plan(["nope"])
+    with pytest.raises(ValueError, match="registered twice"): g.node(lambda: 0, name="rows")
+    g.node(lambda b: 0, name="a"); g.node(lambda a: 0, name="b")
+    with pytest.raises(ValueError, match="cycle: a -> b -> a"): g.plan(["a"])
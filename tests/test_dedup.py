@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+
+from edaingaround.dedup import ExactDedup, dup_rates, record_digest
+
+
+def _rows(n, seed=0):
+    rnd = random.Random(seed)
+    return [(f"text {rnd.randrange(n // 3)}", rnd.choice(["a", "b", None])) for _ in range(n)]
+
+
+def _expected(rows):
+    seen, groups = set(), {}
+    dups = 0
+    for text, g in rows:
+        dups += text in seen; seen.add(text)
+        if g is None: continue
+        n, d, s = groups.get(g, (0, 0, set()))
+        groups[g] = (n + 1, d + (text in s), s | {text})
+    return {"rows": len(rows), "dups": dups, "groups": {g: (n, d) for g, (n, d, _) in groups.items()}}
+
+
+def _run(rows, **kw):
+    dd = ExactDedup(**kw)
+    for text, g in rows: dd.add([text], g)
+    return dd.result()
+
+
+def test_counts_match_a_set():
+    rows = _rows(3000)
+    assert _run(rows) == _expected(rows)
+
+
+def test_spilled_runs_match_in_memory(tmp_path):
+    # a budget of a few hundred rows forces many sorted runs, merged in small blocks
+    rows = _rows(5000, seed=1)
+    res = _run(rows, memory_budget=3000, block=64, spill_dir=tmp_path)
+    assert res == _run(rows) == _expected(rows)
+    assert not list(tmp_path.iterdir())
+
+
+def test_add_digests_maps_group_codes():
+    recs = [{"text": t} for t in ["x", "y", "x", "x", "z"]]
+    dd = ExactDedup()
+    dd.add_digests(np.array([record_digest(r) for r in recs], np.uint64), [1, 0, 1, -1, 0], names=["p", "q"])
+    res = dd.result()
+    assert res == {"rows": 5, "dups": 2, "groups": {"q": (2, 1), "p": (2, 0)}}
+    assert dup_rates(res) == (0.4, {"q": 0.5, "p": 0.0})
@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from edaingaround.jsonstream import iter_records, parse_path
+from edaingaround.tolerant import decode_document
+
+
+def _doc(n, bad=()):
+    recs = [json.dumps({"id": i, "text": "x" * 50}) for i in range(n)]
+    for i in bad:
+        recs[i] = '{"id": %d, "text": oops, "nested": [1, {"a": "]"}]}' % i
+    return "[" + ",\n".join(recs) + "]"
+
+
+def test_parse_path():
+    assert parse_path("[*]") == ("*",)
+    assert parse_path("data.items[*]") == ("data", "items", "*")
+    with pytest.raises(ValueError):
+        parse_path("a[0]")
+
+
+@pytest.mark.parametrize("chunk", [3, 17, 1 << 16])
+def test_records_across_chunk_edges(chunk):
+    doc = _doc(40)
+    assert [r["id"] for r in iter_records(io.StringIO(doc), chunk_size=chunk)] == list(range(40))
+    wrapped = '{"meta": {"n": 2}, "results": %s}' % doc
+    assert len(list(iter_records(io.StringIO(wrapped), chunk_size=chunk))) == 40
+
+
+def test_unmatched_object_is_one_record():
+    assert list(iter_records(io.StringIO('{"a": [1, 2], "b": "c"}'))) == [{"a": [1, 2], "b": "c"}]
+
+
+@pytest.mark.parametrize("chunk", [5, 64, 1 << 16])
+def test_bad_element_is_skipped(chunk):
+    errors = []
+    ids = [r["id"] for r in iter_records(io.StringIO(_doc(30, bad=(3, 17))), chunk_size=chunk, on_error=errors.append)]
+    assert ids == [i for i in range(30) if i not in (3, 17)]
+    assert [e.msg for e in errors] == ["Expecting value"] * 2
+
+
+def test_bad_element_raises_without_reading_on():
+    # the error comes from the first buffer, not after the rest of the file was pulled in
+    with pytest.raises(json.JSONDecodeError) as info:
+        list(iter_records(io.StringIO(_doc(5000, bad=(1,))), chunk_size=4096))
+    assert len(info.value.doc) < 3 * 4096
+
+
+def test_decode_document_counts():
+    errors = {}
+    recs = list(decode_document(io.StringIO(_doc(10, bad=(4,))[:-40]), errors))
+    assert [r["id"] for r in recs] == [0, 1, 2, 3, 5, 6, 7, 8]
+    assert errors == {"jsonerror": 1, "truncated": 1}
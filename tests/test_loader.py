@@ -0,0 +1,75 @@
+import gzip
+import json
+import threading
+
+import pytest
+
+from edaingaround import loader
+from edaingaround.loader import iter_pack, read_records
+
+
+def _lines(n):
+    return b"".join(json.dumps({"i": i, "text": "w%d " % i * 20}).encode() + b"\n" for i in range(n))
+
+
+def _cut(data, keep):
+    blob = gzip.compress(data)
+    return blob[:int(len(blob) * keep)]
+
+
+def test_cut_off_jsonl_gz_keeps_rows(tmp_path):
+    (tmp_path / "a.jsonl").write_bytes(_lines(10))
+    (tmp_path / "b.jsonl.gz").write_bytes(_cut(_lines(2000), 0.5))
+    errors = {}
+    rows = list(iter_pack(tmp_path, workers=1, errors=errors))
+    b = [r["i"] for r in rows if r["_file"] == "b.jsonl.gz"]
+    assert len([r for r in rows if r["_file"] == "a.jsonl"]) == 10
+    assert 0 < len(b) < 2000 and b == list(range(len(b)))
+    assert errors == {"truncated": 1}
+
+
+def test_corrupt_gzip_counts_truncated(tmp_path):
+    blob = bytearray(gzip.compress(_lines(2000)))
+    blob[len(blob) // 2:len(blob) // 2 + 16] = b"\xff" * 16
+    (tmp_path / "c.jsonl.gz").write_bytes(bytes(blob))
+    errors = {}
+    rows = list(read_records(tmp_path / "c.jsonl.gz", errors))
+    assert 0 < len(rows) < 2000
+    assert errors.get("truncated") == 1
+
+
+def test_cut_off_array_gz_counts_once(tmp_path):
+    doc = json.dumps([{"i": i, "text": "v%d " % i * 20} for i in range(2000)]).encode()
+    (tmp_path / "d.json.gz").write_bytes(_cut(doc, 0.6))
+    errors = {}
+    rows = list(read_records(tmp_path / "d.json.gz", errors))
+    assert 0 < len(rows) < 2000
+    assert errors == {"truncated": 1}
+
+
+def test_cut_off_split_gz(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "SPLIT_GZ_BYTES", 1024)
+    monkeypatch.setattr(loader, "PIECE_BYTES", 8192)
+    (tmp_path / "e.jsonl.gz").write_bytes(_cut(_lines(3000), 0.7))
+    errors = {}
+    ids = [r["i"] for r in iter_pack(tmp_path, workers=1, errors=errors)]
+    assert ids == list(range(len(ids))) and len(ids) > 1000
+    assert errors == {"truncated": 1}
+
+
+@pytest.mark.parametrize("name", ["f.jsonl", "f.json"])
+def test_plain_file_without_final_newline(tmp_path, name):
+    (tmp_path / name).write_bytes(_lines(3).rstrip(b"\n"))
+    errors = {}
+    assert len(list(read_records(tmp_path / name, errors))) == 3 and errors == {}
+
+
+def test_abandoned_pool_does_not_block_others():
+    # a consumer that stops early leaves its pool open; another thread still gets a pool of its own
+    it = loader.imap_chunks(sum, range(40), 4, workers=2)
+    assert next(it) == sum(range(4))
+    out = []
+    t = threading.Thread(target=lambda: out.append(loader.map_chunks(sum, range(8), 4, workers=2)))
+    t.start(); t.join(60)
+    assert not t.is_alive() and out == [[6, 22]]
+    it.close()
@@ -0,0 +1,57 @@
+import itertools
+import random
+from collections import defaultdict
+
+import numpy as np
+
+from edaingaround.neardup import MinHasher, UnionFind, candidate_pairs, clusters, dup_rate, near_dup_clusters
+
+
+def _jaccard(a, b, k=3):
+    sa, sb = (set(zip(*[w[i:] for i in range(k)])) for w in (a.lower().split(), b.lower().split()))
+    return len(sa & sb) / len(sa | sb) if sa and sb else 0.0
+
+
+def _corpus(seed=0):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(400)]
+    texts = [" ".join(rng.choices(vocab, k=40)) for _ in range(150)]
+    for base in rng.sample(range(150), 50):
+        words = texts[base].split()
+        for _ in range(rng.randint(1, 2)):
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+        texts.append(" ".join(words))
+    texts += [texts[3]] * 4 + ["too short", ""]
+    return texts
+
+
+def test_candidate_pairs_are_every_pair_in_a_bucket():
+    sigs = MinHasher(32, seed=2).signatures(_corpus())
+    bands, rows = 8, 4
+    buckets = defaultdict(list)
+    for n, sig in enumerate(sigs):
+        if sig[0] == np.iinfo(np.uint32).max: continue
+        for b in range(bands):
+            buckets[b, sig[b * rows:(b + 1) * rows].tobytes()].append(n)
+    brute = {p for members in buckets.values() for p in itertools.combinations(members, 2)}
+    assert set(zip(*(x.tolist() for x in candidate_pairs(sigs, bands, rows)))) == brute
+
+
+def test_clusters_against_brute_force_jaccard():
+    texts = _corpus()
+    labels = near_dup_clusters(texts, threshold=0.7)
+    sims = {(a, b): _jaccard(texts[a], texts[b]) for a, b in itertools.combinations(range(len(texts)), 2)}
+    # every clearly similar pair ends up together
+    assert all(labels[a] == labels[b] for (a, b), s in sims.items() if s >= 0.85)
+    # and every member of a cluster is similar to some other member
+    for group in clusters(labels):
+        for a in group:
+            assert max(sims[min(a, b), max(a, b)] for b in group if b != a) >= 0.5
+    assert labels[-1] == len(texts) - 1 and labels[-2] == len(texts) - 2
+    assert 0 < dup_rate(labels) < 0.5
+
+
+def test_union_find():
+    uf = UnionFind(6)
+    uf.union_pairs(np.array([4, 1, 2]), np.array([5, 2, 5]))
+    assert uf.labels().tolist() == [0, 1, 1, 3, 1, 1]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from edaingaround.quantiles import ExactQuantiles, KLLSketch, rank_error
+
+
+def _pareto(n, seed=0, a=1.2):
+    return np.random.default_rng(seed).pareto(a, n) + 1
+
+
+def test_exact_matches_numpy():
+    xs = _pareto(10001)
+    ex = ExactQuantiles().extend(xs)
+    assert ex.quantile(0.95) == pytest.approx(np.percentile(xs, 95))
+    assert ex.value_at(17) == np.sort(xs)[17]
+    assert ex.top_mass(0.95) == pytest.approx(xs[xs >= np.percentile(xs, 95)].sum() / xs.sum())
+
+
+def test_kll_is_exact_up_to_k():
+    xs = np.random.default_rng(1).integers(0, 5000, 3000)
+    sk = KLLSketch(k=4096)
+    for part in np.array_split(xs, 7): sk.merge(KLLSketch(k=4096).extend(part))
+    assert sk.n == 3000 and sk.top_mass_error(0.95) == 0
+    rank = int(0.95 * len(xs)) - 1
+    assert sk.value_at(rank) == np.sort(xs)[rank]
+
+
+def test_kll_rank_error_and_memory():
+    xs = _pareto(200_000)
+    sk = KLLSketch(k=200)
+    for part in np.array_split(xs, 20): sk.merge(KLLSketch(k=200).extend(part))
+    assert sk.n == len(xs) and sk.total == pytest.approx(xs.sum())
+    assert sum(map(len, sk.levels)) < 4 * sk.k
+    srt = np.sort(xs)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        rank = np.searchsorted(srt, sk.quantile(q)) / len(xs)
+        assert abs(rank - q) <= rank_error(sk.k)
+
+
+@pytest.mark.parametrize("a", [1.2, 2.0])
+def test_kll_top_mass_within_bound(a):
+    xs = _pareto(200_000, seed=3, a=a)
+    sk = KLLSketch().extend(xs)
+    exact = ExactQuantiles().extend(xs).top_mass(0.95)
+    assert 0 <= sk.top_mass(0.95) <= 1
+    assert abs(sk.top_mass(0.95) - exact) <= sk.top_mass_error(0.95)
+
+
+@pytest.mark.parametrize("cls", [ExactQuantiles, KLLSketch])
+def test_dump_restore_round_trip(cls):
+    summary = cls().extend(_pareto(5000))
+    back = summary.fresh().restore(summary.dump())
+    assert back.n == summary.n and back.total == pytest.approx(summary.total)
+    assert back.quantile(0.95) == summary.quantile(0.95)
+
+
+def test_update_from_records():
+    sk = KLLSketch(value=len)
+    for s in ("a", "bb", "ccc"): sk.update(s)
+    assert sk.n == 3 and sk.value_at(2) == 3
@@ -0,0 +1,32 @@
+import re
+
+import numpy as np
+
+from edaingaround.scan import AIISH_PHRASES, PII_EMAIL, PII_PHONE, Scanner, phrase_pattern, repeat_run
+
+TEXTS = [
+    "", "plain text", "mail me at a.b@example.com", "call +1 555-123-4567 now",
+    "As an AI language model, I cannot browse the internet.", "spam spam spam spam spam",
+    "my knowledge   cutoff is near; write a.b@example.org", "I'm an AIR pilot", "as an ai",
+]
+DETECTORS = {"email": PII_EMAIL, "phone": PII_PHONE, "aiish": list(AIISH_PHRASES),
+             "cutoff": ["my knowledge cutoff"], "repeat": repeat_run(4)}
+
+
+def _reference(name, text):
+    pat = DETECTORS[name]
+    return bool(re.search(pat if isinstance(pat, str) else phrase_pattern(pat), text))
+
+
+def test_masks_match_one_search_per_detector():
+    sc = Scanner(DETECTORS)
+    masks = sc.scan(TEXTS, workers=1)
+    for name in DETECTORS:
+        assert sc.hits(masks, name).tolist() == [_reference(name, t) for t in TEXTS], name
+    assert sc.totals(masks) == {"email": 2, "phone": 1, "aiish": 2, "cutoff": 1, "repeat": 1}
+
+
+def test_parallel_scan_matches_serial():
+    sc = Scanner(DETECTORS)
+    texts = TEXTS * 50
+    assert np.array_equal(sc.scan(texts, workers=2, chunk=64), sc.scan(texts, workers=1))
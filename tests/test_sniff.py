@@ -0,0 +1,52 @@
+import gzip
+import json
+
+import pytest
+
+from edaingaround.loader import read_records
+from edaingaround.sniff import ARRAY, EMPTY, JSONL, OBJECT, Source, classify
+
+
+@pytest.mark.parametrize("head, eof, kind", [
+    (b"", True, EMPTY),
+    (b"  [\n{\"a\": 1}]", True, ARRAY),
+    (b'{"a": 1}\n{"a": 2}\n', True, JSONL),
+    (b'{\n  "results": [\n', False, OBJECT),
+    (b'{"results": [{"a": 1}]}', True, OBJECT),
+    (b'{"results": [{"a": 1}]}\n{"results": []}\n', True, JSONL),
+    (b'{"other": [{"a": 1}]}', True, JSONL),
+])
+def test_classify(head, eof, kind):
+    assert classify(head, eof)[0] == kind
+
+
+def test_bom():
+    assert classify(b"\xef\xbb\xbf[]", True) == (ARRAY, True)
+
+
+def test_gzip_head_is_not_read_twice(tmp_path):
+    fp = tmp_path / "a.json.gz"
+    lines = [json.dumps({"i": i, "t": "y" * 90}).encode() for i in range(300)]
+    fp.write_bytes(gzip.compress(b"\n".join(lines)))
+    with Source(fp) as src:
+        assert src.info.kind == JSONL and len(src.head) == 4096
+        assert [line.rstrip(b"\n") for line in src.lines()] == lines
+        assert src.inflate_seconds > 0
+
+
+def test_sniffed_document_is_reused(tmp_path):
+    fp = tmp_path / "w.json"
+    fp.write_bytes(b'{"results": [{"a": 1}, 2, {"a": "x\\u0001"}]}')
+    with Source(fp) as src:
+        assert src.info.kind == OBJECT and src.document is not None
+    errors = {}
+    assert list(read_records(fp, errors)) == [{"a": 1}, {"a": "x"}]
+    assert errors == {"control_char": 1}
+
+
+def test_jsonl_name_wins(tmp_path):
+    fp = tmp_path / "w.jsonl"
+    fp.write_bytes(b'{"results": [{"a": 1}]}')
+    with Source(fp) as src:
+        assert src.info.kind == JSONL and src.document is None
+    assert list(read_records(fp, {})) == [{"results": [{"a": 1}]}]
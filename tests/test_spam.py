@@ -0,0 +1,60 @@
+import random
+import re
+
+import numpy as np
+
+from edaingaround.scan import repeat_run
+from edaingaround.spam import is_spam_batch, repetition_scores, score_batch, spam_flags
+
+
+def is_spam(text):
+    # the reference: mixed_chat/practice_dedup.py, solutions(), verbatim
+    if not text or len(text) < 20:
+        return False
+    words = text.lower().split()
+    if len(words) < 5:
+        return False
+    unique_ratio = len(set(words)) / len(words)
+    if unique_ratio < 0.3:
+        return True
+    if len(words) >= 2:
+        bigrams = [(words[i], words[i+1]) for i in range(len(words)-1)]
+        bigram_ratio = len(set(bigrams)) / len(bigrams)
+        if bigram_ratio < 0.4:
+            return True
+    return False
+
+
+def _texts(n, seed=0):
+    rng = random.Random(seed)
+    vocab = ["buy", "Buy", "free", "click", "now!", "the", "a", "data", "ümlaut", "日本", "x"]
+    out = ["", None, "short text", "a a a a a a a a a a a a", "one two three four five six"]
+    for _ in range(n):
+        k = rng.choice([1, 4, 5, 8, 30, 120])
+        words = rng.choices(vocab[:rng.randint(1, len(vocab))], k=k)
+        if rng.random() < 0.3: words += [rng.choice(vocab)] * rng.randint(2, 20)
+        out.append(rng.choice([" ", "  ", "\n", "\t"]).join(words))
+    return out
+
+
+def test_is_spam_batch_matches_is_spam():
+    texts = _texts(4000)
+    flags = is_spam_batch(texts, workers=1)
+    assert flags.tolist() == [is_spam(t) for t in texts]
+    assert 0 < flags.sum() < len(texts)
+
+
+def test_chunks_and_pool_give_the_same_flags():
+    texts = _texts(600, seed=1)
+    assert np.array_equal(is_spam_batch(texts, workers=2, chunk=100), is_spam_batch(texts, workers=1))
+    scores = score_batch(texts, workers=2, chunk=100)
+    assert np.array_equal(spam_flags(scores), is_spam_batch(texts, workers=1))
+
+
+def test_max_run():
+    scores = repetition_scores(["a b b b c", "", "x", "Go go GO stop", "b b\nb b"])
+    assert scores["max_run"].tolist() == [3, 0, 1, 3, 4]
+    # runs are of whitespace-split words; on words without punctuation that is the scanner's repeat_run
+    rx = re.compile(repeat_run(11))
+    texts = [t.lower() for t in _texts(2000, seed=2) if t and "!" not in t]
+    assert [bool(rx.search(t)) for t in texts] == (repetition_scores(texts)["max_run"] >= 11).tolist()
@@ -0,0 +1,27 @@
+import numpy as np
+
+from edaingaround.loader import iter_pack
+from edaingaround.normalize import text_length
+from edaingaround.synth import _nearest_rank, generate
+
+
+def test_nearest_rank():
+    hist = {5: 2, 1: 3, 9: 1}
+    assert [_nearest_rank(hist, r) for r in range(6)] == [1, 1, 1, 5, 5, 9]
+
+
+def test_anomaly_answers_match_the_corpus(tmp_path):
+    answers = generate("anomaly", tmp_path, files=12, rows=600, seed=3, workers=1)
+    errors = {}
+    lens = np.sort([text_length(rec) for rec in iter_pack(tmp_path, "an_*", workers=1, errors=errors)])
+    assert answers["rows_parsed"] == len(lens)
+    assert answers["p95_text_length"] == lens[int(0.95 * len(lens)) - 1]
+    assert {k: errors.get(k, 0) for k in answers["error_counts"]} == answers["error_counts"]
+
+
+def test_same_bytes_for_any_batching(tmp_path):
+    a = generate("schema", tmp_path / "a", files=9, rows=200, seed=1, workers=1, chunk_files=2)
+    b = generate("schema", tmp_path / "b", files=9, rows=200, seed=1, workers=1, chunk_files=5)
+    assert a == b
+    for fp in (tmp_path / "a").iterdir():
+        assert fp.read_bytes() == (tmp_path / "b" / fp.name).read_bytes()
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sys, json, pathlib
+import sys, json, os, pathlib, subprocess, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
 
 USAGE = """\
 Usage:
   python universal_grader.py /path/to/pack_dir /path/to/result.json
+  python universal_grader.py --all [root] [--workers N] [--report grade_report.json]
 
 Notes:
 - The script compares your result.json against the pack's answers.json.
@@ -14,6 +16,10 @@ Notes:
     * nested dup_rate_by_source: 3 decimals
     * avg_response_length_by_rating: 1 decimal
 - All other numeric keys are compared exactly.
+- --all finds every pack under root (answers.json + solutions.py), runs the
+  solutions concurrently within a total worker budget (split across packs via
+  EDA_WORKERS), grades them and writes a JSON report with status, diffs, wall
+  time, CPU time and peak RSS per pack.
 
 # example for Mixed Chat
 python universal_grader.py /path/to/pack_mixed_chat /path/to/pack_mixed_chat/result.json
@@ -98,23 +104,8 @@ def _compare_dict(key, got, want, diffs):
             ok = False
     return ok
 
-def main():
-    if len(sys.argv) != 3:
-        print(USAGE)
-        sys.exit(2)
-    pack_dir = pathlib.Path(sys.argv[1])
-    result_path = pathlib.Path(sys.argv[2])
-    ans_path = pack_dir / "answers.json"
-    if not ans_path.exists():
-        print(f"ERROR: answers.json not found in {pack_dir}")
-        sys.exit(2)
-    if not result_path.exists():
-        print(f"ERROR: result.json not found at {result_path}")
-        sys.exit(2)
-
-    answers = json.load(open(ans_path, "r", encoding="utf-8"))
-    result  = json.load(open(result_path, "r", encoding="utf-8"))
-
+def grade(answers, result):
+    """``(ok, diffs)`` for a result dict against a pack's answers dict."""
     required_keys = [k for k in answers.keys() if k not in OPTIONAL_KEYS and k not in ("pack",)]
     diffs = []
     ok = True
@@ -142,7 +133,117 @@ def main():
             if got != want:
                 diffs.append(f"DIFF {k}: got {got}, want {want}")
                 ok = False
+    return ok, diffs
+
+def discover_packs(root):
+    """Pack dirs directly under ``root``: those with both ``answers.json`` and ``solutions.py``."""
+    return sorted(d for d in pathlib.Path(root).iterdir()
+                  if (d / "answers.json").is_file() and (d / "solutions.py").is_file())
+
+def run_and_grade(pack_dir, workers=1, answers=None):
+    """Run ``pack_dir/solutions.py`` in its own process and grade its result.json.
+
+    ``answers`` defaults to the pack's answers.json. Wall / CPU / peak RSS
+    cover the process and the pools it waits on.
+    """
+    pack_dir = pathlib.Path(pack_dir)
+    env = dict(os.environ, EDA_WORKERS=str(workers))
+    result_path = pack_dir / "result.json"
+    if result_path.exists():
+        result_path.unlink()  # a stale result must not grade as this run's
+    t0 = time.perf_counter()
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen([sys.executable, "solutions.py"], cwd=pack_dir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=err)
+        cpu = rss = None
+        if hasattr(os, "wait4"):
+            _, status, ru = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            cpu = round(ru.ru_utime + ru.ru_stime, 3)
+            rss = round(ru.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+        else:
+            proc.wait()
+        wall = round(time.perf_counter() - t0, 3)
+        err.seek(0)
+        stderr = err.read()[-2000:].decode("utf-8", "replace")
+    out = {"status": "ERROR", "diffs": [], "returncode": proc.returncode,
+           "wall_s": wall, "cpu_s": cpu, "peak_rss_mb": rss}
+    if proc.returncode != 0 or not result_path.exists():
+        out["stderr_tail"] = stderr
+        return out
+    if answers is None:
+        answers = json.load(open(pack_dir / "answers.json", "r", encoding="utf-8"))
+    result = json.load(open(result_path, "r", encoding="utf-8"))
+    ok, out["diffs"] = grade(answers, result)
+    out["status"] = "PASS" if ok else "FAIL"
+    return out
+
+def grade_all(root, workers=None, report=None):
+    """Run and grade every pack under ``root`` concurrently; returns the report (also written as JSON).
+
+    ``workers`` (default: CPU count) is the total budget: up to that many packs
+    run at once, and each gets an equal share through ``EDA_WORKERS`` for its
+    own process pools.
+    """
+    root = pathlib.Path(root)
+    packs = discover_packs(root)
+    workers = workers or os.cpu_count() or 1
+    concurrent = max(1, min(workers, len(packs)))
+    share = max(1, workers // concurrent)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrent) as ex:
+        runs = dict(zip((d.name for d in packs), ex.map(run_and_grade, packs, [share] * len(packs))))
+    out = {
+        "root": str(root.resolve()),
+        "workers": workers,
+        "concurrent_packs": concurrent,
+        "workers_per_pack": share,
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "passed": sum(r["status"] == "PASS" for r in runs.values()),
+        "packs": runs,
+    }
+    report = pathlib.Path(report) if report else root / "grade_report.json"
+    report.write_text(json.dumps(out, indent=2), encoding="utf-8")
+    return out
+
+def main_all(args):
+    root, workers, report = ".", None, None
+    while args:
+        a = args.pop(0)
+        if a == "--workers":
+            workers = int(args.pop(0))
+        elif a == "--report":
+            report = args.pop(0)
+        else:
+            root = a
+    out = grade_all(root, workers, report)
+    for name, r in out["packs"].items():
+        print(f"{r['status']:5} {name:24} {r['wall_s']:8.2f}s  cpu {r['cpu_s']}s  rss {r['peak_rss_mb']} MB")
+        for d in r["diffs"]:
+            print(f"      {d}")
+    print(f"{out['passed']}/{len(out['packs'])} passed in {out['wall_s']:.2f}s")
+    sys.exit(0 if out["passed"] == len(out["packs"]) else 1)
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "--all":
+        main_all(sys.argv[2:])
+    if len(sys.argv) != 3:
+        print(USAGE)
+        sys.exit(2)
+    pack_dir = pathlib.Path(sys.argv[1])
+    result_path = pathlib.Path(sys.argv[2])
+    ans_path = pack_dir / "answers.json"
+    if not ans_path.exists():
+        print(f"ERROR: answers.json not found in {pack_dir}")
+        sys.exit(2)
+    if not result_path.exists():
+        print(f"ERROR: result.json not found at {result_path}")
+        sys.exit(2)
+
+    answers = json.load(open(ans_path, "r", encoding="utf-8"))
+    result  = json.load(open(result_path, "r", encoding="utf-8"))
 
+    ok, diffs = grade(answers, result)
     if ok:
         print("PASS")
         sys.exit(0)